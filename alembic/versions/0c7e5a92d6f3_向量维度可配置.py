@@ -0,0 +1,60 @@
+"""向量维度可配置
+
+Revision ID: 0c7e5a92d6f3
+Revises: f3a6d9b0c418
+Create Date: 2026-10-19 18:14:52.406139
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c7e5a92d6f3'
+down_revision: Union[str, None] = 'f3a6d9b0c418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 迁移只把向量列统一到固定的基线维度，结果与运行环境的 .env 无关；
+# 修改 EMBED_DIMENSIONS 后用 python -m app.scripts.vector_storage --resize 调整列类型
+BASE_DIMENSIONS = 1024
+
+# (表名, 向量列, 签名列)
+VECTOR_COLUMNS = [
+    ('characters', 'embedding', 'embedding_signature'),
+    ('character_relationships', 'embedding', 'embedding_signature'),
+    ('setting_elements', 'embedding', 'embedding_signature'),
+    ('volumes', 'embedding', 'embedding_signature'),
+    ('chapters', 'embedding', 'embedding_signature'),
+    ('scenes', 'goal_embedding', 'goal_embedding_signature'),
+    ('scenes', 'summary_embedding', 'summary_embedding_signature'),
+    ('scene_passages', 'embedding', 'embedding_signature'),
+    ('chapter_passages', 'embedding', 'embedding_signature'),
+]
+
+
+def _resize(dimensions: int) -> None:
+    """把维度不一致的向量列改成 vector(dimensions)。旧向量无法转换，清空后由重建任务重新 embedding。"""
+    connection = op.get_bind()
+    for table_name, column_name, signature_name in VECTOR_COLUMNS:
+        current = connection.execute(sa.text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = CAST(:table_name AS regclass) AND attname = :column_name"
+        ), {"table_name": table_name, "column_name": column_name}).scalar()
+        if current == dimensions:
+            continue
+        op.execute(f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE vector({dimensions}) USING NULL')
+        op.execute(f'UPDATE {table_name} SET {signature_name} = NULL')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 由之前的迁移创建的列已经是 1024 维，通常不做任何修改
+    _resize(BASE_DIMENSIONS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass  # 升级前后都是基线维度，没有需要撤销的修改
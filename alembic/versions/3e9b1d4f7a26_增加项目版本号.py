@@ -0,0 +1,28 @@
+"""增加项目版本号
+
+Revision ID: 3e9b1d4f7a26
+Revises: 0c7e5a92d6f3
+Create Date: 2026-10-19 19:03:27.851640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e9b1d4f7a26'
+down_revision: Union[str, None] = '0c7e5a92d6f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('projects', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('projects', 'version')
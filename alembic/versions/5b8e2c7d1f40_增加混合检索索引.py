@@ -0,0 +1,47 @@
+"""增加混合检索索引
+
+Revision ID: 5b8e2c7d1f40
+Revises: cb9f60967868
+Create Date: 2026-10-19 10:12:31.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2c7d1f40'
+down_revision: Union[str, None] = 'cb9f60967868'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_TEXT = "coalesce(name, '') || ' ' || coalesce(description, '')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm 按字符三元组建索引，不依赖分词，可用于中文名称
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for table in ('characters', 'setting_elements'):
+        op.add_column(table, sa.Column('search_text', sa.Text(),
+                                       sa.Computed(SEARCH_TEXT, persisted=True), nullable=True))
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(),
+                                       sa.Computed(f"to_tsvector('simple'::regconfig, {SEARCH_TEXT})", persisted=True),
+                                       nullable=True))
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False,
+                        postgresql_using='gin')
+        op.create_index(f'ix_{table}_search_text_trgm', table, ['search_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('characters', 'setting_elements'):
+        op.drop_index(f'ix_{table}_search_text_trgm', table_name=table)
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
+        op.drop_column(table, 'search_text')
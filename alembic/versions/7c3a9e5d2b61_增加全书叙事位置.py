@@ -0,0 +1,61 @@
+"""增加全书叙事位置
+
+Revision ID: 7c3a9e5d2b61
+Revises: 5b8e2c7d1f40
+Create Date: 2026-10-19 14:36:08.217493
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3a9e5d2b61'
+down_revision: Union[str, None] = '5b8e2c7d1f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chapters', sa.Column('narrative_position', sa.Integer(), nullable=True))
+    op.add_column('scenes', sa.Column('narrative_position', sa.Integer(), nullable=True))
+
+    # 回填：与 position_service.renumber_project 的排序规则一致
+    op.execute("""
+        UPDATE chapters
+        SET narrative_position = positions.position
+        FROM (
+            SELECT chapters.id AS chapter_id,
+                   row_number() OVER (PARTITION BY chapters.project_id
+                                      ORDER BY volumes."order", volumes.id, chapters."order", chapters.id) AS position
+            FROM chapters JOIN volumes ON chapters.volume_id = volumes.id
+        ) AS positions
+        WHERE chapters.id = positions.chapter_id
+    """)
+    op.execute("""
+        UPDATE scenes
+        SET narrative_position = positions.position
+        FROM (
+            SELECT scenes.id AS scene_id,
+                   row_number() OVER (PARTITION BY scenes.project_id
+                                      ORDER BY chapters.narrative_position, scenes.order_in_chapter, scenes.id) AS position
+            FROM scenes JOIN chapters ON scenes.chapter_id = chapters.id
+        ) AS positions
+        WHERE scenes.id = positions.scene_id
+    """)
+
+    op.create_index('ix_chapters_project_narrative_position', 'chapters', ['project_id', 'narrative_position'],
+                    unique=False)
+    op.create_index('ix_scenes_project_narrative_position', 'scenes', ['project_id', 'narrative_position'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scenes_project_narrative_position', table_name='scenes')
+    op.drop_index('ix_chapters_project_narrative_position', table_name='chapters')
+    op.drop_column('scenes', 'narrative_position')
+    op.drop_column('chapters', 'narrative_position')
@@ -0,0 +1,47 @@
+"""增加游标分页索引
+
+Revision ID: 9d4b2f6a1c83
+Revises: 3e9b1d4f7a26
+Create Date: 2026-10-19 20:12:44.360918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4b2f6a1c83'
+down_revision: Union[str, None] = '3e9b1d4f7a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (过滤列, 排序键...)，与 app/utils/pagination.py 的游标条件对应
+    op.create_index('ix_volumes_project_order_id', 'volumes', ['project_id', 'order', 'id'], unique=False)
+    op.create_index('ix_chapters_project_order_id', 'chapters', ['project_id', 'order', 'id'], unique=False)
+    op.create_index('ix_chapters_volume_order_id', 'chapters', ['volume_id', 'order', 'id'], unique=False)
+    op.create_index('ix_scenes_chapter_order_id', 'scenes', ['chapter_id', 'order_in_chapter', 'id'], unique=False)
+    op.create_index('ix_scenes_project_created_id', 'scenes', ['project_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_scenes_project_unassigned_created_id', 'scenes', ['project_id', 'created_at', 'id'],
+                    unique=False, postgresql_where=sa.text('chapter_id IS NULL'))
+    op.create_index('ix_characters_project_id_id', 'characters', ['project_id', 'id'], unique=False)
+    op.create_index('ix_setting_elements_project_id_id', 'setting_elements', ['project_id', 'id'], unique=False)
+    op.create_index('ix_character_relationships_project_id_id', 'character_relationships', ['project_id', 'id'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_character_relationships_project_id_id', table_name='character_relationships')
+    op.drop_index('ix_setting_elements_project_id_id', table_name='setting_elements')
+    op.drop_index('ix_characters_project_id_id', table_name='characters')
+    op.drop_index('ix_scenes_project_unassigned_created_id', table_name='scenes')
+    op.drop_index('ix_scenes_project_created_id', table_name='scenes')
+    op.drop_index('ix_scenes_chapter_order_id', table_name='scenes')
+    op.drop_index('ix_chapters_volume_order_id', table_name='chapters')
+    op.drop_index('ix_chapters_project_order_id', table_name='chapters')
+    op.drop_index('ix_volumes_project_order_id', table_name='volumes')
@@ -0,0 +1,30 @@
+"""增加滚动摘要
+
+Revision ID: a4d1f8c6e2b7
+Revises: 7c3a9e5d2b61
+Create Date: 2026-10-19 16:05:47.903126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d1f8c6e2b7'
+down_revision: Union[str, None] = '7c3a9e5d2b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chapters', sa.Column('rolling_summary', sa.Text(), nullable=True))
+    op.add_column('volumes', sa.Column('rolling_summary', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('volumes', 'rolling_summary')
+    op.drop_column('chapters', 'rolling_summary')
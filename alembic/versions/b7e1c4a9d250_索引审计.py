@@ -0,0 +1,45 @@
+"""索引审计
+
+Revision ID: b7e1c4a9d250
+Revises: 9d4b2f6a1c83
+Create Date: 2026-10-19 21:03:17.582406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1c4a9d250'
+down_revision: Union[str, None] = '9d4b2f6a1c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 对照各 service 的查询补齐索引，可用 app/scripts/check_query_plans.py 检查执行计划
+    # rag_service._retrieve_past_scenes：project_id = ? AND status IN (...)
+    op.create_index('ix_scenes_project_status', 'scenes', ['project_id', 'status'], unique=False)
+    # summary_service.build_story_so_far：卷内叙事位置在当前章之前的章节
+    op.create_index('ix_chapters_volume_narrative_position', 'chapters', ['volume_id', 'narrative_position'],
+                    unique=False)
+    # relationship_service.get_relationships_for_character 的 character2_id = ? 分支（character1_id 由唯一约束覆盖）
+    op.create_index('ix_character_relationships_character2_id', 'character_relationships', ['character2_id'],
+                    unique=False)
+    # 关联表主键以 scene_id 开头，按角色/设定反查和级联删除需要另一列的索引
+    op.create_index('ix_scene_character_association_character_id', 'scene_character_association',
+                    ['character_id'], unique=False)
+    op.create_index('ix_scene_setting_association_setting_element_id', 'scene_setting_association',
+                    ['setting_element_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scene_setting_association_setting_element_id', table_name='scene_setting_association')
+    op.drop_index('ix_scene_character_association_character_id', table_name='scene_character_association')
+    op.drop_index('ix_character_relationships_character2_id', table_name='character_relationships')
+    op.drop_index('ix_chapters_volume_narrative_position', table_name='chapters')
+    op.drop_index('ix_scenes_project_status', table_name='scenes')
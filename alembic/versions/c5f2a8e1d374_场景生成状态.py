@@ -0,0 +1,35 @@
+"""场景生成状态
+
+Revision ID: c5f2a8e1d374
+Revises: b7e1c4a9d250
+Create Date: 2026-10-19 22:14:08.317529
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f2a8e1d374'
+down_revision: Union[str, None] = 'b7e1c4a9d250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# rag_service.generate_scene_content 写入的场景状态
+NEW_STATUSES = ['GENERATING', 'GENERATION_FAILED']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 新增的枚举值在同一个事务中不能使用，放在独立的提交里
+    with op.get_context().autocommit_block():
+        for value in NEW_STATUSES:
+            op.execute(f"ALTER TYPE scenestatus ADD VALUE IF NOT EXISTS '{value}'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres 不能删除枚举值；只把处于这些状态的场景改回 PLANNED，枚举值保留
+    op.execute("UPDATE scenes SET status = 'PLANNED' WHERE status IN ('GENERATING', 'GENERATION_FAILED')")
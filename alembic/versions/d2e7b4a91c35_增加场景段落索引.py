@@ -0,0 +1,52 @@
+"""增加场景段落索引
+
+Revision ID: d2e7b4a91c35
+Revises: a4d1f8c6e2b7
+Create Date: 2026-10-19 17:21:14.640382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e7b4a91c35'
+down_revision: Union[str, None] = 'a4d1f8c6e2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scene_passages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('scene_id', sa.Integer(), nullable=False),
+    sa.Column('passage_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', sqlalchemy.vector.VECTOR(dim=1024), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.ForeignKeyConstraint(['scene_id'], ['scenes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scene_passages_id'), 'scene_passages', ['id'], unique=False)
+    op.create_index(op.f('ix_scene_passages_scene_id'), 'scene_passages', ['scene_id'], unique=False)
+    op.create_index('ix_scene_passages_project_id', 'scene_passages', ['project_id'], unique=False)
+    # HNSW 近似最近邻索引，检索时按余弦距离排序
+    op.create_index('ix_scene_passages_embedding_hnsw', 'scene_passages', ['embedding'], unique=False,
+                    postgresql_using='hnsw', postgresql_ops={'embedding': 'vector_cosine_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scene_passages_embedding_hnsw', table_name='scene_passages')
+    op.drop_index('ix_scene_passages_project_id', table_name='scene_passages')
+    op.drop_index(op.f('ix_scene_passages_scene_id'), table_name='scene_passages')
+    op.drop_index(op.f('ix_scene_passages_id'), table_name='scene_passages')
+    op.drop_table('scene_passages')
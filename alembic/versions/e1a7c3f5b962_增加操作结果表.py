@@ -0,0 +1,37 @@
+"""增加操作结果表
+
+Revision ID: e1a7c3f5b962
+Revises: c5f2a8e1d374
+Create Date: 2026-10-19 22:41:52.906184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7c3f5b962'
+down_revision: Union[str, None] = 'c5f2a8e1d374'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # app/utils/singleflight.py：跨 worker 等待方据此判断执行方的结果
+    op.create_table('operation_outcomes',
+    sa.Column('operation', sa.String(length=100), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('detail', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('operation', 'entity_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('operation_outcomes')
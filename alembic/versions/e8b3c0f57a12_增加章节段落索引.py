@@ -0,0 +1,51 @@
+"""增加章节段落索引
+
+Revision ID: e8b3c0f57a12
+Revises: d2e7b4a91c35
+Create Date: 2026-10-19 18:02:39.115274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c0f57a12'
+down_revision: Union[str, None] = 'd2e7b4a91c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chapter_passages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('passage_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', sqlalchemy.vector.VECTOR(dim=1024), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chapter_passages_id'), 'chapter_passages', ['id'], unique=False)
+    op.create_index(op.f('ix_chapter_passages_chapter_id'), 'chapter_passages', ['chapter_id'], unique=False)
+    op.create_index('ix_chapter_passages_project_id', 'chapter_passages', ['project_id'], unique=False)
+    op.create_index('ix_chapter_passages_embedding_hnsw', 'chapter_passages', ['embedding'], unique=False,
+                    postgresql_using='hnsw', postgresql_ops={'embedding': 'vector_cosine_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chapter_passages_embedding_hnsw', table_name='chapter_passages')
+    op.drop_index('ix_chapter_passages_project_id', table_name='chapter_passages')
+    op.drop_index(op.f('ix_chapter_passages_chapter_id'), table_name='chapter_passages')
+    op.drop_index(op.f('ix_chapter_passages_id'), table_name='chapter_passages')
+    op.drop_table('chapter_passages')
@@ -0,0 +1,43 @@
+"""增加向量签名
+
+Revision ID: f3a6d9b0c418
+Revises: e8b3c0f57a12
+Create Date: 2026-10-19 17:02:41.538216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6d9b0c418'
+down_revision: Union[str, None] = 'e8b3c0f57a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SIGNATURE_COLUMNS = [
+    ('characters', 'embedding_signature'),
+    ('character_relationships', 'embedding_signature'),
+    ('setting_elements', 'embedding_signature'),
+    ('volumes', 'embedding_signature'),
+    ('chapters', 'embedding_signature'),
+    ('scenes', 'goal_embedding_signature'),
+    ('scenes', 'summary_embedding_signature'),
+    ('scene_passages', 'embedding_signature'),
+    ('chapter_passages', 'embedding_signature'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 已有向量的签名保持为空，升级后运行 python -m app.scripts.reindex --adopt-existing 补写
+    for table_name, column_name in SIGNATURE_COLUMNS:
+        op.add_column(table_name, sa.Column(column_name, sa.String(length=200), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name, column_name in reversed(SIGNATURE_COLUMNS):
+        op.drop_column(table_name, column_name)
@@ -19,7 +19,67 @@ class Settings(BaseSettings):
     EMBED_API_BASE: str = os.getenv("EMBED_API_BASE", LLM_API_BASE)
     EMBED_API_KEY: str = os.getenv("EMBED_API_KEY", LLM_API_KEY)
     EMBED_MODEL: str = os.getenv("EMBED_MODEL", "")
+    # 向量维度（模型需支持 dimensions 参数）。修改后运行 python -m app.scripts.vector_storage --resize --reindex
+    # 调整维度变化的向量列并重新 embedding（迁移中的列固定为 1024 维）
+    EMBED_DIMENSIONS: int = int(os.getenv("EMBED_DIMENSIONS", "1024"))
     FRONTEND_ORIGIN: str = os.getenv("FRONTEND_ORIGIN", "http://localhost:3333")
+    # LLM 响应缓存（仅对显式开启 use_cache 的调用生效，如章节大纲、摘要）
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+    # 生成流程各阶段的时间预算（秒）
+    RETRIEVAL_TIMEOUT_SECONDS: float = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "60"))
+    GENERATION_TIMEOUT_SECONDS: float = float(os.getenv("GENERATION_TIMEOUT_SECONDS", "900"))
+    SUMMARY_TIMEOUT_SECONDS: float = float(os.getenv("SUMMARY_TIMEOUT_SECONDS", "300"))
+    # 混合检索 (向量 + 词法) 的 RRF 平滑常数
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    # MMR 多样性重排：λ 越大越偏向相关度，候选池为每类过量召回的条数
+    MMR_LAMBDA_PAST_SCENES: float = float(os.getenv("MMR_LAMBDA_PAST_SCENES", "0.7"))
+    MMR_POOL_PAST_SCENES: int = int(os.getenv("MMR_POOL_PAST_SCENES", "40"))
+    MMR_LAMBDA_RELATIONSHIPS: float = float(os.getenv("MMR_LAMBDA_RELATIONSHIPS", "0.7"))
+    MMR_POOL_RELATIONSHIPS: int = int(os.getenv("MMR_POOL_RELATIONSHIPS", "30"))
+    # 过往场景打分：向量相似度权重、叙事距离衰减（单位：场景数）、总是保留的紧邻前文场景数
+    PAST_SCENE_SIMILARITY_WEIGHT: float = float(os.getenv("PAST_SCENE_SIMILARITY_WEIGHT", "0.7"))
+    PAST_SCENE_DISTANCE_DECAY: float = float(os.getenv("PAST_SCENE_DISTANCE_DECAY", "10"))
+    PAST_SCENE_PRECEDING_COUNT: int = int(os.getenv("PAST_SCENE_PRECEDING_COUNT", "3"))
+    # 分层滚动摘要：防抖时间（秒）、章节/卷摘要的最大字数、前情提要的总字符预算
+    ROLLUP_DEBOUNCE_SECONDS: float = float(os.getenv("ROLLUP_DEBOUNCE_SECONDS", "10"))
+    ROLLUP_CHAPTER_MAX_CHARS: int = int(os.getenv("ROLLUP_CHAPTER_MAX_CHARS", "600"))
+    ROLLUP_VOLUME_MAX_CHARS: int = int(os.getenv("ROLLUP_VOLUME_MAX_CHARS", "1200"))
+    STORY_SO_FAR_MAX_CHARS: int = int(os.getenv("STORY_SO_FAR_MAX_CHARS", "3000"))
+    # 批量 embedding 每次请求的条数（部分服务商限制为 10）
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "10"))
+    # embedding 文本拼接方式变化时调高，已有向量会被重建任务视为过期
+    EMBED_VERSION: int = int(os.getenv("EMBED_VERSION", "1"))
+    # 向量重建任务：每批处理的行数、批次之间的间隔（秒）
+    REINDEX_BATCH_SIZE: int = int(os.getenv("REINDEX_BATCH_SIZE", "100"))
+    REINDEX_THROTTLE_SECONDS: float = float(os.getenv("REINDEX_THROTTLE_SECONDS", "0.5"))
+    # 后写 embedding：保存后等待多久（秒）再批量计算向量、单批最多处理的行数
+    EMBED_WRITE_BEHIND_DELAY_SECONDS: float = float(os.getenv("EMBED_WRITE_BEHIND_DELAY_SECONDS", "0.5"))
+    EMBED_WRITE_BEHIND_MAX_BATCH: int = int(os.getenv("EMBED_WRITE_BEHIND_MAX_BATCH", "64"))
+    # 向量索引模式：float / halfvec / binary；量化模式下召回 top_k * RESCORE_FACTOR 个候选再用 float32 重排
+    VECTOR_STORAGE_MODE: str = os.getenv("VECTOR_STORAGE_MODE", "float")
+    VECTOR_RESCORE_FACTOR: int = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+    # Matryoshka 粗排维度：ANN 召回只用向量的前 N 维，再用完整向量重排；0 表示使用完整维度
+    EMBED_SEARCH_DIMENSIONS: int = int(os.getenv("EMBED_SEARCH_DIMENSIONS", "0"))
+    # 正文段落索引：块的最大长度、独立成块的最小段落长度、相邻块重叠（字符），检索时返回的段落数
+    PASSAGE_SIZE_CHARS: int = int(os.getenv("PASSAGE_SIZE_CHARS", "500"))
+    PASSAGE_MIN_CHARS: int = int(os.getenv("PASSAGE_MIN_CHARS", "200"))
+    PASSAGE_OVERLAP_CHARS: int = int(os.getenv("PASSAGE_OVERLAP_CHARS", "100"))
+    PASSAGE_TOP_K: int = int(os.getenv("PASSAGE_TOP_K", "6"))
+    # 响应压缩：小于该字节数的响应不压缩；gzip 级别（1-9）、brotli 质量（0-11），数 MB 的响应上较低的级别端到端更快
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    GZIP_COMPRESSION_LEVEL: int = int(os.getenv("GZIP_COMPRESSION_LEVEL", "1"))
+    BROTLI_COMPRESSION_QUALITY: int = int(os.getenv("BROTLI_COMPRESSION_QUALITY", "4"))
+    # 项目快照流式输出：攒够该字节数再发送一块（压缩中间件每块 flush 一次，块太小压缩率会下降）
+    SNAPSHOT_CHUNK_BYTES: int = int(os.getenv("SNAPSHOT_CHUNK_BYTES", "65536"))
+    # 批量修改接口单次请求最多包含的操作数
+    BATCH_MAX_OPERATIONS: int = int(os.getenv("BATCH_MAX_OPERATIONS", "1000"))
+    # 批量导入：段落 embedding 同时进行的请求数，以及每次提交的场景数
+    IMPORT_EMBED_CONCURRENCY: int = int(os.getenv("IMPORT_EMBED_CONCURRENCY", "4"))
+    IMPORT_PASSAGE_BATCH_SCENES: int = int(os.getenv("IMPORT_PASSAGE_BATCH_SCENES", "200"))
+    # 全书导出（TXT / Markdown）流式输出：攒够该字节数再发送一块
+    EXPORT_CHUNK_BYTES: int = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
 
     @computed_field
     @property
@@ -2,10 +2,16 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.db import versioning
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+versioning.register(SessionLocal)  # 内容变化时递增 projects.version，用于 ETag
+# 长时间持有的会话级 advisory lock 使用独立的非池化连接（app/utils/singleflight.py），不占用连接池；
+# 关闭连接即结束会话，锁随之释放
+lock_engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
 
 # --- PGVector 相关 ---
 # 通常在模型定义或首次连接时确保扩展已启用
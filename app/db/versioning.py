@@ -0,0 +1,53 @@
+# backend/app/db/versioning.py
+"""
+项目版本号：项目下任何内容（卷、章、场景、角色、设定、关系及项目本身）变化时 projects.version 加一，
+读接口用它生成 ETag（见 app/utils/etag.py），一次主键查询就能判断客户端缓存是否还有效。
+
+在 Session 的 after_flush 事件中统一处理，服务层不需要关心。以下变化不计入：
+- 只改了向量和向量签名（embedding 重建、后写 embedding），接口不返回这些字段；
+- 段落索引表（由正文派生，接口不返回）。
+通过 Core 直接执行的批量 UPDATE（重排叙事位置、向量重建）不经过 ORM 事件，本来也不影响接口返回的数据。
+"""
+from typing import Optional, Set
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+IGNORED_ATTRIBUTES = {
+    "embedding", "embedding_signature",
+    "goal_embedding", "goal_embedding_signature",
+    "summary_embedding", "summary_embedding_signature",
+    "updated_at",
+}
+IGNORED_TABLES = {"scene_passages", "chapter_passages"}
+
+
+def _project_id(obj) -> Optional[int]:
+    if getattr(obj, "__tablename__", None) == "projects":
+        return obj.id
+    return getattr(obj, "project_id", None)
+
+
+def _has_visible_changes(obj) -> bool:
+    for attr in inspect(obj).attrs:
+        if attr.key not in IGNORED_ATTRIBUTES and attr.history.has_changes():
+            return True
+    return False
+
+
+def bump_project_versions(session: Session, flush_context) -> None:
+    project_ids: Set[int] = set()
+    for obj in list(session.new) + list(session.deleted):
+        if getattr(obj, "__tablename__", None) not in IGNORED_TABLES:
+            project_ids.add(_project_id(obj))
+    for obj in session.dirty:
+        if getattr(obj, "__tablename__", None) not in IGNORED_TABLES and _has_visible_changes(obj):
+            project_ids.add(_project_id(obj))
+    project_ids.discard(None)
+    if project_ids:
+        session.connection().execute(text("UPDATE projects SET version = version + 1 WHERE id = ANY(:ids)"),
+                                     {"ids": sorted(project_ids)})
+
+
+def register(session_factory) -> None:
+    event.listen(session_factory, "after_flush", bump_project_versions)
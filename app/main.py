@@ -1,8 +1,15 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.routers import all_routers
+from app.services import summary_service, embedding_worker
+from app.utils.compression import CompressionMiddleware
+from app.utils.etag import ETagMiddleware
+from app.utils.serialization import OrjsonResponse
 
 # from app.db.session import engine # 如果需要创建表
 # from app.models.story_element import Base # 如果需要创建表
@@ -13,7 +20,31 @@ from app.routers import all_routers
 # create_tables()
 # --------------------------------------------------
 
-app = FastAPI(title="Novel Writer AI Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 同步路由在线程池中执行，滚动摘要和后写 embedding 的调度需要知道主事件循环
+    loop = asyncio.get_running_loop()
+    summary_service.rollup_scheduler.start(loop)
+    embedding_worker.embedding_worker.start(loop)
+    try:
+        yield
+    finally:
+        # 关闭时取消尚未执行的批次和正在运行的任务，避免事件循环关闭后任务仍持有数据库会话
+        await summary_service.rollup_scheduler.stop()
+        await embedding_worker.embedding_worker.stop()
+
+app = FastAPI(title="Novel Writer AI Backend", default_response_class=OrjsonResponse, lifespan=lifespan)
+
+# 读接口的 ETag（由 app.utils.etag 中的依赖计算，这里写进响应头）
+app.add_middleware(ETagMiddleware)
+
+# 按 Accept-Encoding 压缩响应（brotli / gzip），流式响应逐块压缩并 flush
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_COMPRESSION_LEVEL,
+    brotli_quality=settings.BROTLI_COMPRESSION_QUALITY,
+)
 
 # 配置 CORS
 app.add_middleware(
@@ -22,6 +53,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # 允许所有方法
     allow_headers=["*"], # 允许所有头部
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 @app.get("/")
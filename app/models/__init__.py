@@ -5,4 +5,6 @@ from .project import Project
 from .character import Character, CharacterRelationship
 from .setting import SettingElement
 from .structure import Chapter, Scene
-from .associations import scene_character_association, scene_setting_association
\ No newline at end of file
+from .associations import scene_character_association, scene_setting_association
+from .passage import ScenePassage, ChapterPassage
+from .operation import OperationOutcome
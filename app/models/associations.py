@@ -1,5 +1,5 @@
 # backend/app/models/associations.py
-from sqlalchemy import Table, Column, Integer, ForeignKey, String
+from sqlalchemy import Table, Column, Integer, ForeignKey, String, Index
 from .base import Base
 
 # Association table for Scene <-> Character
@@ -10,6 +10,8 @@ scene_character_association = Table(
     Column("character_id", Integer, ForeignKey("characters.id", ondelete="CASCADE"), primary_key=True),
     # Optional: Add role if needed, e.g., Point-of-view, Antagonist for the scene
     # Column("role_in_scene", String, nullable=True)
+    # 主键以 scene_id 开头；按角色反查场景、删除角色时的级联删除需要 character_id 上的索引
+    Index("ix_scene_character_association_character_id", "character_id"),
 )
 
 # Association table for Scene <-> SettingElement (e.g., locations for the scene)
@@ -18,4 +20,5 @@ scene_setting_association = Table(
     Base.metadata,
     Column("scene_id", Integer, ForeignKey("scenes.id", ondelete="CASCADE"), primary_key=True),
     Column("setting_element_id", Integer, ForeignKey("setting_elements.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_scene_setting_association_setting_element_id", "setting_element_id"),
 )
\ No newline at end of file
@@ -1,9 +1,15 @@
 # backend/app/models/character.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, UniqueConstraint, Computed, \
+    Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector # Import Vector type
+from app.core.config import settings
 from .base import Base
 
+CHARACTER_SEARCH_TEXT = "coalesce(name, '') || ' ' || coalesce(description, '')"
+
+
 class Character(Base):
     __tablename__ = "characters"
 
@@ -15,7 +21,11 @@ class Character(Base):
     goals = Column(Text, nullable=True) # Motivations, objectives
     arc_summary = Column(Text, nullable=True) # Planned character development
     current_status = Column(Text, nullable=True) # Dynamic field: e.g., "Injured", "In hiding at Location X" - Needs careful management
-    embedding = Column(Vector(1024), nullable=True) # Embedding of description, backstory, goals? Needs strategy.
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of description, backstory, goals? Needs strategy.
+    embedding_signature = Column(String(200), nullable=True) # "<模型>/v<版本>/d<维度>:<源文本 md5>"，用于发现缺失或过期的向量
+    # 词法检索用的存储生成列：名称精确提及时，向量相似度经常召回不到
+    search_text = Column(Text, Computed(CHARACTER_SEARCH_TEXT, persisted=True))
+    search_vector = Column(TSVECTOR, Computed(f"to_tsvector('simple'::regconfig, {CHARACTER_SEARCH_TEXT})", persisted=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -25,7 +35,13 @@ class Character(Base):
     relationships1 = relationship("CharacterRelationship", foreign_keys="[CharacterRelationship.character1_id]", back_populates="character1", cascade="all, delete-orphan")
     relationships2 = relationship("CharacterRelationship", foreign_keys="[CharacterRelationship.character2_id]", back_populates="character2", cascade="all, delete-orphan")
 
-    __table_args__ = (UniqueConstraint('project_id', 'name', name='_project_character_name_uc'),)
+    __table_args__ = (
+        UniqueConstraint('project_id', 'name', name='_project_character_name_uc'),
+        Index('ix_characters_project_id_id', 'project_id', 'id'),  # 游标分页
+        Index('ix_characters_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_characters_search_text_trgm', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
+    )
 
 
 class CharacterRelationship(Base):
@@ -37,7 +53,8 @@ class CharacterRelationship(Base):
     character2_id = Column(Integer, ForeignKey("characters.id"), nullable=False)
     relationship_type = Column(String, nullable=False) # e.g., "Friend", "Enemy", "Family", "Mentor", "Romantic Interest"
     description = Column(Text, nullable=True) # Details about their dynamic
-    embedding = Column(Vector(1024), nullable=True) # Embedding of the description
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of the description
+    embedding_signature = Column(String(200), nullable=True) # 向量的模型/版本/源文本签名
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -48,6 +65,9 @@ class CharacterRelationship(Base):
 
     __table_args__ = (
         UniqueConstraint('character1_id', 'character2_id', 'relationship_type', name='_character_relationship_uc'),
+        Index('ix_character_relationships_project_id_id', 'project_id', 'id'),  # 游标分页
+        # 唯一约束以 character1_id 开头，按角色查关系（character1_id = x OR character2_id = x）还需要 character2_id
+        Index('ix_character_relationships_character2_id', 'character2_id'),
         # Optional: Check constraint to prevent self-relation if needed
         # CheckConstraint('character1_id != character2_id', name='_check_no_self_relation')
     )
\ No newline at end of file
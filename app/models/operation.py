@@ -0,0 +1,20 @@
+# backend/app/models/operation.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from .base import Base
+
+
+class OperationOutcome(Base):
+    """
+    single-flight 调用最近一次执行的结果（app/utils/singleflight.py 维护）。
+
+    执行方持有 advisory lock 期间写入；其他 worker 等到锁释放后据此判断执行是否成功，
+    而不是假定成功后返回未变化的实体。
+    """
+    __tablename__ = "operation_outcomes"
+
+    operation = Column(String(100), primary_key=True) # 如 "generate_rag"
+    entity_id = Column(Integer, primary_key=True)
+    status = Column(String(20), nullable=False) # running / succeeded / failed / cancelled
+    status_code = Column(Integer, nullable=True) # 失败时的 HTTP 状态码（如 504），未知时为空
+    detail = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,56 @@
+# backend/app/models/passage.py
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, Index
+from sqlalchemy.orm import relationship
+from pgvector.sqlalchemy import Vector
+from app.core.config import settings
+from .base import Base
+
+
+class ScenePassage(Base):
+    """场景正文切分出的段落块，用于细粒度检索（正文中出现但概要里没有的细节）。"""
+    __tablename__ = "scene_passages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    scene_id = Column(Integer, ForeignKey("scenes.id", ondelete="CASCADE"), nullable=False, index=True)
+    passage_index = Column(Integer, nullable=False) # 在场景正文中的顺序
+    start_offset = Column(Integer, nullable=False) # 在正文中的起始字符位置（含重叠前缀）
+    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=False) # sha256(content)，正文修改时据此复用未变化块的向量
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True)
+    embedding_signature = Column(String(200), nullable=True) # 向量的模型/版本/源文本签名
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    scene = relationship("Scene", back_populates="passages")
+
+    __table_args__ = (
+        Index('ix_scene_passages_project_id', 'project_id'),
+        Index('ix_scene_passages_embedding_hnsw', 'embedding', postgresql_using='hnsw',
+              postgresql_ops={'embedding': 'vector_cosine_ops'}),
+    )
+
+
+class ChapterPassage(Base):
+    """章节全文（Chapter.content）切分出的段落块。"""
+    __tablename__ = "chapter_passages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False, index=True)
+    passage_index = Column(Integer, nullable=False) # 在章节全文中的顺序
+    start_offset = Column(Integer, nullable=False) # 在全文中的起始字符位置（含重叠前缀）
+    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=False) # sha256(content)
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True)
+    embedding_signature = Column(String(200), nullable=True) # 向量的模型/版本/源文本签名
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    chapter = relationship("Chapter", back_populates="passages")
+
+    __table_args__ = (
+        Index('ix_chapter_passages_project_id', 'project_id'),
+        Index('ix_chapter_passages_embedding_hnsw', 'embedding', postgresql_using='hnsw',
+              postgresql_ops={'embedding': 'vector_cosine_ops'}),
+    )
@@ -11,6 +11,7 @@ class Project(Base):
     logline = Column(Text, nullable=True) # Short pitch/summary
     global_synopsis = Column(Text, nullable=True) # Overall story summary
     style = Column(Text, nullable=True) # 风格描述
+    version = Column(Integer, nullable=False, default=0, server_default='0') # 项目内容版本号，见 app/db/versioning.py
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,9 +1,15 @@
 # backend/app/models/setting.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, UniqueConstraint, Computed, \
+    Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
+from app.core.config import settings
 from .base import Base
 
+SETTING_SEARCH_TEXT = "coalesce(name, '') || ' ' || coalesce(description, '')"
+
+
 class SettingElement(Base):
     __tablename__ = "setting_elements"
 
@@ -12,7 +18,11 @@ class SettingElement(Base):
     name = Column(String, index=True, nullable=False)
     element_type = Column(String, index=True, nullable=False) # e.g., 'Location', 'Item', 'Concept', 'Lore', 'Rule'
     description = Column(Text, nullable=True)
-    embedding = Column(Vector(1024), nullable=True) # Embedding of the description
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of the description
+    embedding_signature = Column(String(200), nullable=True) # 向量的模型/版本/源文本签名
+    # 词法检索用的存储生成列（名称 + 描述）
+    search_text = Column(Text, Computed(SETTING_SEARCH_TEXT, persisted=True))
+    search_vector = Column(TSVECTOR, Computed(f"to_tsvector('simple'::regconfig, {SETTING_SEARCH_TEXT})", persisted=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -20,4 +30,10 @@ class SettingElement(Base):
     project = relationship("Project", back_populates="setting_elements")
     scenes = relationship("Scene", secondary="scene_setting_association", back_populates="setting_elements")
 
-    __table_args__ = (UniqueConstraint('project_id', 'name', 'element_type', name='_project_setting_name_type_uc'),)
\ No newline at end of file
+    __table_args__ = (
+        UniqueConstraint('project_id', 'name', 'element_type', name='_project_setting_name_type_uc'),
+        Index('ix_setting_elements_project_id_id', 'project_id', 'id'),  # 游标分页
+        Index('ix_setting_elements_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_setting_elements_search_text_trgm', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
+    )
\ No newline at end of file
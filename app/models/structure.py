@@ -1,8 +1,9 @@
 # backend/app/models/structure.py
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, Enum as SQLAlchemyEnum, \
-    UniqueConstraint
+    UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
+from app.core.config import settings
 from .base import Base
 import enum
 
@@ -22,8 +23,10 @@ class Volume(Base):
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     title = Column(String, nullable=False)
     summary = Column(Text, nullable=True) # What happens in this chapter overall
+    rolling_summary = Column(Text, nullable=True) # 由各章滚动摘要汇总而来，summary_service 维护
     order = Column(Integer, nullable=False, default=0) # Order within the project
-    embedding = Column(Vector(1024), nullable=True) # Embedding of the summary for high-level context
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of the summary for high-level context
+    embedding_signature = Column(String(200), nullable=True) # 向量的模型/版本/源文本签名
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -32,7 +35,10 @@ class Volume(Base):
     chapters = relationship("Chapter", back_populates="volume", order_by="Chapter.order", cascade="all, delete-orphan")
     # scenes = relationship("Scene", back_populates="chapter", order_by="Scene.order_in_chapter", cascade="all, delete-orphan")
 
-    __table_args__ = (UniqueConstraint('project_id', 'title', name='_project_volume_title_uc'),)
+    __table_args__ = (
+        UniqueConstraint('project_id', 'title', name='_project_volume_title_uc'),
+        Index('ix_volumes_project_order_id', 'project_id', 'order', 'id'),  # 游标分页
+    )
 
 class Chapter(Base):
     __tablename__ = "chapters"
@@ -43,8 +49,11 @@ class Chapter(Base):
     title = Column(String, nullable=False)
     summary = Column(Text, nullable=True) # What happens in this chapter overall
     content = Column(Text, nullable=True) # 完整小说内容
+    rolling_summary = Column(Text, nullable=True) # 由场景概要汇总而来，summary_service 维护
     order = Column(Integer, nullable=False, default=0) # Order within the volume
-    embedding = Column(Vector(1024), nullable=True) # Embedding of the summary for high-level context
+    narrative_position = Column(Integer, nullable=True) # 全书顺序号，由 position_service 维护
+    embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of the summary for high-level context
+    embedding_signature = Column(String(200), nullable=True) # 向量的模型/版本/源文本签名
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -52,8 +61,17 @@ class Chapter(Base):
     project = relationship("Project", back_populates="chapters")
     volume = relationship("Volume", back_populates="chapters")
     scenes = relationship("Scene", back_populates="chapter", order_by="Scene.order_in_chapter", cascade="all, delete-orphan")
+    passages = relationship("ChapterPassage", back_populates="chapter", order_by="ChapterPassage.passage_index",
+                            cascade="all, delete-orphan", passive_deletes=True)
 
-    __table_args__ = (UniqueConstraint('project_id', 'title', name='_project_chapter_title_uc'),)
+    __table_args__ = (
+        UniqueConstraint('project_id', 'title', name='_project_chapter_title_uc'),
+        Index('ix_chapters_project_narrative_position', 'project_id', 'narrative_position'),
+        # 游标分页：(过滤列, 排序键...)
+        Index('ix_chapters_project_order_id', 'project_id', 'order', 'id'),
+        Index('ix_chapters_volume_order_id', 'volume_id', 'order', 'id'),
+        Index('ix_chapters_volume_narrative_position', 'volume_id', 'narrative_position'),  # 前情提要：卷内前面的章节
+    )
 
 
 class Scene(Base):
@@ -67,9 +85,12 @@ class Scene(Base):
     summary = Column(Text, nullable=True) # Summary of what *actually* happens (can be generated post-draft)
     generated_content = Column(Text, nullable=True) # The actual prose generated by the LLM
     order_in_chapter = Column(Integer, nullable=False, default=0) # Order within the chapter
+    narrative_position = Column(Integer, nullable=True) # 全书顺序号，未归属章节时为 NULL
     status = Column(SQLAlchemyEnum(SceneStatus), default=SceneStatus.PLANNED, nullable=False)
-    goal_embedding = Column(Vector(1024), nullable=True) # Embedding of the scene's goal for finding relevant context
-    summary_embedding = Column(Vector(1024), nullable=True) # Embedding of the scene's summary for future context retrieval
+    goal_embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of the scene's goal for finding relevant context
+    goal_embedding_signature = Column(String(200), nullable=True)
+    summary_embedding = Column(Vector(settings.EMBED_DIMENSIONS), nullable=True) # Embedding of the scene's summary for future context retrieval
+    summary_embedding_signature = Column(String(200), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -77,4 +98,16 @@ class Scene(Base):
     # project = relationship("Project", back_populates="scenes")
     chapter = relationship("Chapter", back_populates="scenes")
     characters = relationship("Character", secondary="scene_character_association", back_populates="scenes")
-    setting_elements = relationship("SettingElement", secondary="scene_setting_association", back_populates="scenes") # Locations, key items used etc.
\ No newline at end of file
+    setting_elements = relationship("SettingElement", secondary="scene_setting_association", back_populates="scenes") # Locations, key items used etc.
+    passages = relationship("ScenePassage", back_populates="scene", order_by="ScenePassage.passage_index",
+                            cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        Index('ix_scenes_project_narrative_position', 'project_id', 'narrative_position'),
+        Index('ix_scenes_project_status', 'project_id', 'status'),  # rag_service 过往场景检索的状态过滤
+        # 游标分页：(过滤列, 排序键...)
+        Index('ix_scenes_chapter_order_id', 'chapter_id', 'order_in_chapter', 'id'),
+        Index('ix_scenes_project_created_id', 'project_id', 'created_at', 'id'),
+        Index('ix_scenes_project_unassigned_created_id', 'project_id', 'created_at', 'id',
+              postgresql_where=text('chapter_id IS NULL')),
+    )
@@ -1,13 +1,17 @@
 # backend/app/routers/chapters.py
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
+from app.models import Project, Chapter
+from app.models.structure import Volume
 from app.schemas import ChapterCreate, ChapterRead, ChapterUpdate  # Make sure ChapterReadMinimal is imported if used
 from app.services import chapter_service
+from app.utils import etag, fieldsets, pagination
+from app.utils.serialization import orm_response
 
 router = APIRouter()
 
@@ -43,50 +47,69 @@ async def create_new_chapter(
                             detail=f"Could not create chapter. Possible duplicate title or invalid data: {e}")
 
 
-@router.get("/projects/{project_id}/chapters", response_model=List[ChapterRead])  # Use ChapterRead to include scenes
+@router.get("/projects/{project_id}/chapters", response_model=List[ChapterRead],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])  # Use ChapterRead to include scenes
 async def read_project_chapters(
         project_id: int,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(ChapterRead)),
         db: Session = Depends(get_db)
 ):
     """
-    Retrieve all chapters for a specific project, ordered by their 'order' field.
+    Retrieve chapters for a specific project, ordered by their 'order' field.
     Includes minimal scene information nested within each chapter.
+    Use `fields` (e.g. `title,order,scenes.title,scenes.status`) to return only those fields.
+    The next page's cursor is returned in the `X-Next-Cursor` header.
     """
     try:
-        chapters = chapter_service.get_chapters_by_project(db=db, project_id=project_id, skip=skip, limit=limit)
-        return chapters
+        page = chapter_service.get_chapters_by_project(db=db, project_id=project_id, skip=skip, limit=limit,
+                                                       cursor=cursor, fields=fields)
+        return pagination.page_response(page, ChapterRead, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:  # Project not found from service
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/volumes/{volume_id}/chapters", response_model=List[ChapterRead])  # Use ChapterRead to include scenes
+@router.get("/volumes/{volume_id}/chapters", response_model=List[ChapterRead],
+            dependencies=[Depends(etag.for_entity(Volume, "volume_id"))])  # Use ChapterRead to include scenes
 async def read_volume_chapters(
         volume_id: int,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(ChapterRead)),
         db: Session = Depends(get_db)
 ):
     """
-    Retrieve all chapters for a specific project, ordered by their 'order' field.
+    Retrieve chapters for a specific volume, ordered by their 'order' field.
     Includes minimal scene information nested within each chapter.
+    Use `fields` (e.g. `title,order,scenes.title,scenes.status`) to return only those fields.
+    The next page's cursor is returned in the `X-Next-Cursor` header.
     """
     try:
-        chapters = chapter_service.get_chapters_by_volume(db=db, volume_id=volume_id, skip=skip, limit=limit)
-        for chapter in chapters:
-            if chapter.content is None:
-                chapter.content = ""  # 确保 content 字段不为 None
-                if chapter.scenes:
-                    for scene in chapter.scenes:
-                        if scene.generated_content:
-                            chapter.content += scene.generated_content
-        return chapters
+        page = chapter_service.get_chapters_by_volume(db=db, volume_id=volume_id, skip=skip, limit=limit,
+                                                      cursor=cursor, fields=fields)
+        # 稀疏字段不含 content 时不拼接正文；含 content 时 service 已一并加载 scenes.generated_content
+        if fields is None or "content" in fields:
+            for chapter in page.items:
+                if chapter.content is None:
+                    chapter.content = ""  # 确保 content 字段不为 None
+                    if chapter.scenes:
+                        for scene in chapter.scenes:
+                            if scene.generated_content:
+                                chapter.content += scene.generated_content
+        return pagination.page_response(page, ChapterRead, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:  # Project not found from service
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/chapters/{chapter_id}", response_model=ChapterRead)
+@router.get("/chapters/{chapter_id}", response_model=ChapterRead,
+            dependencies=[Depends(etag.for_entity(Chapter, "chapter_id"))])
 async def read_single_chapter(
         chapter_id: int = Path(..., description="The ID of the chapter to retrieve"),
         db: Session = Depends(get_db)
@@ -97,7 +120,7 @@ async def read_single_chapter(
     db_chapter = chapter_service.get_chapter(db=db, chapter_id=chapter_id)
     if db_chapter is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
-    return db_chapter
+    return orm_response(db_chapter, ChapterRead)
 
 
 @router.patch("/chapters/{chapter_id}", response_model=ChapterRead)
@@ -1,12 +1,14 @@
 # backend/app/api/routers/characters.py
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app import schemas
 from app.db.session import get_db
+from app.models import Project, Character
 from app.services import project_service, character_service
+from app.utils import etag, fieldsets, pagination
 
 router = APIRouter()
 
@@ -46,25 +48,34 @@ async def create_character_for_project(
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
 
 
-@router.get("/projects/{project_id}/characters/", response_model=List[schemas.CharacterRead], tags=["Characters"])
+@router.get("/projects/{project_id}/characters/", response_model=List[schemas.CharacterRead], tags=["Characters"],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
 def read_characters_for_project(
     project_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+    fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(schemas.CharacterRead)),
     db: Session = Depends(get_db)
 ):
     """
-    获取指定项目下的角色列表。
+    获取指定项目下的角色列表。fields 可以只返回部分字段，如 fields=name,current_status。
+    按 id 游标分页，下一页的游标在响应头 X-Next-Cursor 中。
     """
     # 验证项目是否存在 (可选，如果确信 project_id 有效)
     db_project = project_service.get_project(db, project_id=project_id)
     if db_project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Project with id {project_id} not found")
 
-    characters = character_service.get_characters_by_project(db, project_id=project_id, skip=skip, limit=limit)
-    return characters
+    try:
+        page = character_service.get_characters_by_project(db, project_id=project_id, skip=skip, limit=limit,
+                                                           cursor=cursor, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return pagination.page_response(page, schemas.CharacterRead, fields=fields)
 
-@router.get("/characters/{character_id}", response_model=schemas.CharacterRead, tags=["Characters"])
+@router.get("/characters/{character_id}", response_model=schemas.CharacterRead, tags=["Characters"],
+            dependencies=[Depends(etag.for_entity(Character, "character_id"))])
 def read_character(
     character_id: int,
     db: Session = Depends(get_db)
@@ -1,14 +1,74 @@
 # backend/app/routers/generation.py
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Request
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.schemas import SceneRead, ChapterRead  # Use the detailed read schema
+from app.services import scene_service, chapter_service
 from app.services.rag_service import generate_scene_content, generate_chapter_content, \
     generate_scenes  # Import the core function
+from app.utils import singleflight
 
 router = APIRouter()
 
+DISCONNECT_POLL_INTERVAL_SECONDS = 1.0
+CLIENT_CLOSED_REQUEST = 499  # nginx 约定的非标准状态码
+
+
+async def _run_generation(
+        request: Request,
+        operation: str,
+        entity_id: int,
+        generate: Callable[[Session, int], Awaitable[Any]],
+) -> None:
+    """
+    以 single-flight 方式执行生成任务，并在客户端断开时放弃等待。
+
+    生成任务使用自己的数据库会话，不依赖发起请求的会话：发起方断开后，
+    其他仍在等待的请求可以继续拿到结果。所有等待方都断开时任务会被取消。
+    调用方在返回后应使用自己的会话重新读取实体。
+    """
+
+    async def run_with_own_session():
+        task_db = SessionLocal()
+        try:
+            return await generate(task_db, entity_id)
+        finally:
+            task_db.close()
+
+    waiter = asyncio.ensure_future(singleflight.do(operation, entity_id, run_with_own_session))
+
+    async def watch_disconnect():
+        while not waiter.done():
+            if await request.is_disconnected():
+                print(f"Client disconnected while waiting for {operation}:{entity_id}.")
+                waiter.cancel()
+                return
+            await asyncio.sleep(DISCONNECT_POLL_INTERVAL_SECONDS)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await waiter
+    except asyncio.CancelledError:
+        current = asyncio.current_task()
+        if waiter.cancelled() and not (current and current.cancelling()):
+            # 客户端已断开，这个响应不会再被读取
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request.")
+        raise
+    except singleflight.OperationCancelled:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Generation was cancelled.")
+    except singleflight.RemoteOperationFailed as e:
+        # 由其他 worker 执行且没有成功：实体未被更新，不能当作成功返回
+        if e.status == singleflight.CANCELLED:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Generation was cancelled.")
+        raise HTTPException(status_code=e.status_code or status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=f"Generation failed in another worker: {e.detail}")
+    finally:
+        watcher.cancel()
+
 @router.post(
     "/chapter/{chapter_id}/generate_scenes",
     response_model=ChapterRead, # Return the updated scene data
@@ -18,15 +78,15 @@ router = APIRouter()
 )
 async def generate_scenes_endpoint(
     *, # Makes subsequent arguments keyword-only
+    request: Request,
     db: Session = Depends(get_db),
     chapter_id: int = Path(..., title="The ID of the chapter to generate scenes for", ge=1)
 ):
     try:
-        updated_chapter = await generate_scenes(
-            db=db,
-            chapter_id=chapter_id
-        )
-        return updated_chapter
+        # 同一章节的重复请求（双击、多标签页、代理重试）共享同一次生成
+        await _run_generation(request, "generate_scenes", chapter_id,
+                              lambda task_db, entity_id: generate_scenes(db=task_db, chapter_id=entity_id))
+        return chapter_service.get_chapter(db, chapter_id=chapter_id)
     except HTTPException as http_exc:
         # Re-raise known HTTP exceptions (e.g., 404 Not Found, 400 Bad Request from service)
         raise http_exc
@@ -51,6 +111,7 @@ async def generate_scenes_endpoint(
 )
 async def generate_scene_rag_endpoint(
     *, # Makes subsequent arguments keyword-only
+    request: Request,
     db: Session = Depends(get_db),
     scene_id: int = Path(..., title="The ID of the scene to generate content for", ge=1)
 ):
@@ -66,12 +127,17 @@ async def generate_scene_rag_endpoint(
 
     Requires a valid `scene_id` and that the scene has a defined `goal`.
     The LLM service must be configured correctly (e.g., OpenAI API key).
+
+    Concurrent requests for the same scene share one generation. If every waiting client
+    disconnects, or `/scenes/{scene_id}/generate_rag/cancel` is called, the upstream LLM
+    stream is aborted and the scene status is rolled back.
     """
     try:
-        updated_scene = await generate_scene_content(
-            db=db,
-            scene_id=scene_id
-        )
+        # 同一场景的并发请求只执行一次 RAG 流程，后到的请求等待并复用其结果
+        await _run_generation(request, "generate_rag", scene_id,
+                              lambda task_db, entity_id: generate_scene_content(db=task_db, scene_id=entity_id))
+        # 结果可能由其他请求（或其他 worker）写入，使用本请求的会话重新读取
+        updated_scene = scene_service.get_scene(db, scene_id=scene_id)
         # Pydantic will automatically validate and convert the ORM object
         # to the SceneRead schema based on the response_model
         return updated_scene
@@ -98,15 +164,14 @@ async def generate_scene_rag_endpoint(
 )
 async def generate_chapter_content_endpoint(
     *, # Makes subsequent arguments keyword-only
+    request: Request,
     db: Session = Depends(get_db),
     chapter_id: int = Path(..., title="The ID of the scene to generate content for", ge=1)
 ):
     try:
-        updated_chapter = await generate_chapter_content(
-            db=db,
-            chapter_id=chapter_id
-        )
-        return updated_chapter
+        await _run_generation(request, "generate_chapter", chapter_id,
+                              lambda task_db, entity_id: generate_chapter_content(db=task_db, chapter_id=entity_id))
+        return chapter_service.get_chapter(db, chapter_id=chapter_id)
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
@@ -117,3 +182,35 @@ async def generate_chapter_content_endpoint(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An internal server error occurred while generating chapter content."
         )
+
+
+def _cancel_generation(operation: str, entity_id: int) -> dict:
+    if not singleflight.cancel(operation, entity_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"No running {operation} for id {entity_id} in this worker.")
+    return {"cancelled": True, "operation": operation, "id": entity_id}
+
+
+@router.post("/scenes/{scene_id}/generate_rag/cancel", summary="Cancel Scene Generation", tags=["Generation"])
+async def cancel_scene_rag_endpoint(
+    scene_id: int = Path(..., title="The ID of the scene whose generation should be cancelled", ge=1)
+):
+    """
+    Cancels a running RAG generation for the scene: the upstream LLM stream is closed
+    and the scene status is rolled back to what it was before generation started.
+    """
+    return _cancel_generation("generate_rag", scene_id)
+
+
+@router.post("/chapter/{chapter_id}/generate_scenes/cancel", summary="Cancel Scene List Generation", tags=["Generation"])
+async def cancel_generate_scenes_endpoint(
+    chapter_id: int = Path(..., title="The ID of the chapter whose scene generation should be cancelled", ge=1)
+):
+    return _cancel_generation("generate_scenes", chapter_id)
+
+
+@router.post("/chapter/{chapter_id}/generate/cancel", summary="Cancel Chapter Generation", tags=["Generation"])
+async def cancel_chapter_content_endpoint(
+    chapter_id: int = Path(..., title="The ID of the chapter whose generation should be cancelled", ge=1)
+):
+    return _cancel_generation("generate_chapter", chapter_id)
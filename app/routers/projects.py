@@ -1,11 +1,17 @@
 # backend/app/api/routers/projects.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional
 
 from app import schemas  # 假设 __init__ 文件处理好了导入
 from app.db.session import get_db # 假设 get_db 在这里
-from app.services import project_service
+from app.models import Project
+from app.services import batch_service, export_service, import_service, project_service, reindex_service, \
+    snapshot_service, summary_service
+from app.utils import etag, fieldsets
+from app.utils.serialization import OrjsonResponse, orm_response
 
 router = APIRouter()
 
@@ -23,7 +29,8 @@ def create_project(
         raise HTTPException(status_code=400, detail="Project with this title already exists")
     return project_service.create_project(db=db, project=project_in)
 
-@router.get("/projects/", response_model=List[schemas.ProjectRead], tags=["Projects"])
+@router.get("/projects/", response_model=List[schemas.ProjectRead], tags=["Projects"],
+            dependencies=[Depends(etag.for_projects_list)])
 def read_projects(
     skip: int = 0,
     limit: int = 100,
@@ -33,9 +40,10 @@ def read_projects(
     获取项目列表。
     """
     projects = project_service.get_projects(db, skip=skip, limit=limit)
-    return projects
+    return orm_response(projects, schemas.ProjectRead)
 
-@router.get("/projects/{project_id}", response_model=schemas.ProjectRead, tags=["Projects"])
+@router.get("/projects/{project_id}", response_model=schemas.ProjectRead, tags=["Projects"],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
 def read_project(
     project_id: int,
     db: Session = Depends(get_db)
@@ -46,7 +54,45 @@ def read_project(
     db_project = project_service.get_project(db, project_id=project_id)
     if db_project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-    return db_project
+    return orm_response(db_project, schemas.ProjectRead)
+
+@router.get("/projects/{project_id}/snapshot", response_model=schemas.ProjectSnapshot, tags=["Projects"],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
+def read_project_snapshot(
+    project_id: int,
+    fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(schemas.ProjectSnapshot)),
+    db: Session = Depends(get_db)
+):
+    """
+    一次返回项目的完整结构（卷/章节/场景树、未归属的场景、角色、设定、人物关系），用于编辑器打开项目。
+    查询数量固定，结果以分块 JSON 流式返回；可用 fields 只取需要的部分，
+    例如 fields=title,volumes.title,volumes.chapters.title,volumes.chapters.scenes.status,characters.name。
+    """
+    if project_service.get_project(db, project_id=project_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return StreamingResponse(snapshot_service.stream_snapshot(project_id, fields), media_type="application/json")
+
+@router.get("/projects/{project_id}/export", tags=["Projects"],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
+def export_project(
+    project_id: int,
+    format: str = Query("txt", description="txt / md / epub"),
+    db: Session = Depends(get_db)
+):
+    """
+    按叙事顺序导出全书（卷 -> 章节 -> 场景正文），流式返回，适合任意长度的书稿。
+    章节有 content 时使用 content，否则拼接各场景的 generated_content。
+    """
+    db_project = project_service.get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    if format not in export_service.FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown export format '{format}'. "
+                                   f"Available formats: {', '.join(export_service.FORMATS)}")
+    media_type, _ = export_service.FORMATS[format]
+    return StreamingResponse(export_service.stream_export(project_id, format), media_type=media_type,
+                             headers={"Content-Disposition": export_service.content_disposition(db_project, format)})
 
 @router.patch("/projects/{project_id}", response_model=schemas.ProjectRead, tags=["Projects"])
 def update_project(
@@ -75,4 +121,84 @@ def delete_project(
     if deleted_project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
     # 注意：返回被删除的对象信息，前端可以确认
-    return deleted_project
\ No newline at end of file
+    return deleted_project
+
+@router.post("/projects/{project_id}/batch", response_model=schemas.BatchResult, tags=["Projects"])
+async def apply_project_batch(
+    project_id: int,
+    batch_in: schemas.BatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    在一个事务中按顺序执行一组创建/更新/删除操作（卷、章节、场景、角色、设定、人物关系），
+    用于拖动排序和批量编辑。任何一个操作失败时整批回滚并返回 400；成功时返回每个操作之后的状态。
+    """
+    if project_service.get_project(db, project_id=project_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    try:
+        results = await batch_service.apply_batch(db, project_id, batch_in.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return OrjsonResponse({"results": results})
+
+@router.post("/projects/{project_id}/import", response_model=schemas.ImportResult,
+             status_code=status.HTTP_202_ACCEPTED, tags=["Projects"])
+async def import_into_project(
+    project_id: int,
+    request: Request,
+    format: str = Query("jsonl", description="jsonl：每行一条记录；text：纯文本书稿，按卷/章标题和分隔行切分"),
+    db: Session = Depends(get_db)
+):
+    """
+    批量导入已有书稿和世界观设定（记录格式见 app/services/import_service.py）。请求体边接收边解析，
+    结构化数据用 COPY 一次写入并提交；向量和段落索引在后台补齐，进度见 GET /projects/{project_id}/reindex。
+    """
+    if project_service.get_project(db, project_id=project_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    try:
+        parser = import_service.ImportParser(format)
+        async for line in import_service.iter_lines(request.stream()):
+            parser.feed(line)
+        records = parser.close()
+        # COPY 和名称匹配是同步的数据库/CPU 操作，放到线程池里执行，不阻塞事件循环
+        outcome = await run_in_threadpool(import_service.import_records, db, project_id, records)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    for chapter_id in outcome.rollup_chapter_ids:
+        summary_service.schedule_chapter_rollup(chapter_id)
+    import_service.start_background_embedding(project_id, outcome.scene_ids)
+    return {**outcome.counts, "skipped": outcome.skipped, "embedding_started": True}
+
+@router.get("/projects/{project_id}/reindex", response_model=Dict[str, int], tags=["Projects"])
+def read_reindex_status(
+    project_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    统计项目中缺失或过期（源文本或 embedding 模型已变化）的向量数量。
+    """
+    if project_service.get_project(db, project_id=project_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return reindex_service.count_stale(db, project_id=project_id)
+
+@router.post("/projects/{project_id}/reindex", response_model=Dict[str, int], status_code=status.HTTP_202_ACCEPTED,
+             tags=["Projects"])
+async def start_reindex(
+    project_id: int,
+    force: bool = False,
+    target: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    在后台补齐/重建项目的向量，返回待处理的数量。force=true 时全部重新 embedding。
+    """
+    if project_service.get_project(db, project_id=project_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    try:
+        pending = reindex_service.count_stale(db, project_id=project_id, targets=target, force=force)
+        started = reindex_service.start_background_reindex(project_id, force=force, targets=target)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not started:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reindex already running for this project")
+    return pending
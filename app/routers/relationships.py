@@ -5,7 +5,9 @@ from typing import List, Optional
 
 from app import schemas
 from app.db.session import get_db
+from app.models import Project, CharacterRelationship
 from app.services import relationship_service, project_service, character_service
+from app.utils import etag, fieldsets, pagination
 
 router = APIRouter()
 
@@ -48,18 +50,22 @@ async def create_character_relationship_for_project(
 
 
 @router.get("/projects/{project_id}/relationships/", response_model=List[schemas.CharacterRelationshipRead],
-            tags=["Relationships"])
+            tags=["Relationships"],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
 def read_relationships_for_project(
         project_id: int,
         character_id: Optional[int] = Query(None, description="Filter relationships involving this character ID"),
         # 可选过滤
-        skip: int = 0,
-        limit: int = 100,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(schemas.CharacterRelationshipRead)),
         db: Session = Depends(get_db)
 ):
     """
     获取指定项目下的人物关系列表。
-    可以根据 character_id 进行过滤。
+    可以根据 character_id 进行过滤；fields 可以只返回部分字段，如 fields=character1_id,character2_id,relationship_type。
+    按 id 游标分页，下一页的游标在响应头 X-Next-Cursor 中。
     """
     db_project = project_service.get_project(db, project_id=project_id)
     if db_project is None:
@@ -71,18 +77,21 @@ def read_relationships_for_project(
         if not db_char or db_char.project_id != project_id:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f"Character with id {character_id} not found in project {project_id}")
-        relationships = relationship_service.get_relationships_for_character(db, character_id=character_id)
-        # 注意：分页逻辑需要调整，如果基于 character_id 过滤
-        # 这里简单返回所有，实际可能需要对结果进行分页
-        return relationships[skip: skip + limit]
-    else:
-        relationships = relationship_service.get_relationships_by_project(db, project_id=project_id, skip=skip,
-                                                                                   limit=limit)
-        return relationships
+    try:
+        if character_id:
+            page = relationship_service.get_relationships_for_character(db, character_id=character_id, skip=skip,
+                                                                        limit=limit, cursor=cursor, fields=fields)
+        else:
+            page = relationship_service.get_relationships_by_project(db, project_id=project_id, skip=skip,
+                                                                     limit=limit, cursor=cursor, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return pagination.page_response(page, schemas.CharacterRelationshipRead, fields=fields)
 
 
 @router.get("/relationships/{relationship_id}", response_model=schemas.CharacterRelationshipRead,
-            tags=["Relationships"])
+            tags=["Relationships"],
+            dependencies=[Depends(etag.for_entity(CharacterRelationship, "relationship_id"))])
 def read_character_relationship(
         relationship_id: int,
         db: Session = Depends(get_db)
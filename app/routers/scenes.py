@@ -1,13 +1,15 @@
 # backend/app/routers/scenes.py
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
+from app.models import Project, Chapter, Scene
 from app.schemas import SceneCreate, SceneRead, SceneUpdate, SceneReadMinimal
 from app.services import scene_service
+from app.utils import etag, fieldsets, pagination
 
 router = APIRouter()
 
@@ -34,11 +36,14 @@ async def create_new_scene(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not create scene: {e}")
 
 
-@router.get("/chapters/{chapter_id}/scenes", response_model=List[SceneReadMinimal])
+@router.get("/chapters/{chapter_id}/scenes", response_model=List[SceneReadMinimal],
+            dependencies=[Depends(etag.for_entity(Chapter, "chapter_id"))])
 async def read_chapter_scenes(
         chapter_id: int,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(SceneReadMinimal)),
         db: Session = Depends(get_db)
 ):
     """
@@ -46,49 +51,63 @@ async def read_chapter_scenes(
     Returns minimal scene details suitable for lists.
     """
     try:
-        scenes = scene_service.get_scenes_by_chapter(db=db, chapter_id=chapter_id, skip=skip, limit=limit)
-        return scenes
+        page = scene_service.get_scenes_by_chapter(db=db, chapter_id=chapter_id, skip=skip, limit=limit,
+                                                   cursor=cursor, fields=fields)
+        return pagination.page_response(page, SceneReadMinimal, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:  # Chapter not found
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/projects/{project_id}/scenes", response_model=List[SceneReadMinimal])
+@router.get("/projects/{project_id}/scenes", response_model=List[SceneReadMinimal],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
 async def read_project_scenes(
         project_id: int,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(SceneReadMinimal)),
         db: Session = Depends(get_db)
 ):
     """
     Retrieve scenes belonging to a project.
     """
     try:
-        scenes = scene_service.get_scenes_by_project(db=db, project_id=project_id, skip=skip,
-                                                     limit=limit)
-        return scenes
+        page = scene_service.get_scenes_by_project(db=db, project_id=project_id, skip=skip,
+                                                   limit=limit, cursor=cursor, fields=fields)
+        return pagination.page_response(page, SceneReadMinimal, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:  # Project not found
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/projects/{project_id}/scenes/unassigned", response_model=List[SceneReadMinimal])
+@router.get("/projects/{project_id}/scenes/unassigned", response_model=List[SceneReadMinimal],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
 async def read_unassigned_project_scenes(
         project_id: int,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(SceneReadMinimal)),
         db: Session = Depends(get_db)
 ):
     """
     Retrieve scenes belonging to a project that are not assigned to any chapter.
     """
     try:
-        scenes = scene_service.get_scenes_by_project_unassigned(db=db, project_id=project_id, skip=skip,
-                                                                limit=limit)
-        return scenes
+        page = scene_service.get_scenes_by_project_unassigned(db=db, project_id=project_id, skip=skip,
+                                                              limit=limit, cursor=cursor, fields=fields)
+        return pagination.page_response(page, SceneReadMinimal, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:  # Project not found
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/scenes/{scene_id}", response_model=SceneRead)
+@router.get("/scenes/{scene_id}", response_model=SceneRead,
+            dependencies=[Depends(etag.for_entity(Scene, "scene_id"))])
 async def read_single_scene(
         scene_id: int = Path(..., description="The ID of the scene to retrieve"),
         db: Session = Depends(get_db)
@@ -1,11 +1,13 @@
 # backend/app/api/routers/settings.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import schemas
 from app.db.session import get_db
+from app.models import Project, SettingElement
 from app.services import project_service, setting_service
+from app.utils import etag, fieldsets, pagination
 
 router = APIRouter()
 
@@ -42,26 +44,34 @@ async def create_setting_element_for_project(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
 
 
-@router.get("/projects/{project_id}/settings/", response_model=List[schemas.SettingElementRead], tags=["Settings"])
+@router.get("/projects/{project_id}/settings/", response_model=List[schemas.SettingElementRead], tags=["Settings"],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])
 def read_setting_elements_for_project(
         project_id: int,
-        skip: int = 0,
-        limit: int = 100,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
+        fields: Optional[fieldsets.FieldSet] = Depends(fieldsets.fields_param(schemas.SettingElementRead)),
         db: Session = Depends(get_db)
 ):
     """
-    获取指定项目下的设定元素列表。
+    获取指定项目下的设定元素列表。fields 可以只返回部分字段，如 fields=name,element_type。
+    按 id 游标分页，下一页的游标在响应头 X-Next-Cursor 中。
     """
     db_project = project_service.get_project(db, project_id=project_id)
     if db_project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Project with id {project_id} not found")
 
-    setting_elements = setting_service.get_setting_elements_by_project(db, project_id=project_id, skip=skip,
-                                                                                limit=limit)
-    return setting_elements
+    try:
+        page = setting_service.get_setting_elements_by_project(db, project_id=project_id, skip=skip, limit=limit,
+                                                               cursor=cursor, fields=fields)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return pagination.page_response(page, schemas.SettingElementRead, fields=fields)
 
 
-@router.get("/settings/{setting_element_id}", response_model=schemas.SettingElementRead, tags=["Settings"])
+@router.get("/settings/{setting_element_id}", response_model=schemas.SettingElementRead, tags=["Settings"],
+            dependencies=[Depends(etag.for_entity(SettingElement, "setting_element_id"))])
 def read_setting_element(
         setting_element_id: int,
         db: Session = Depends(get_db)
@@ -1,14 +1,18 @@
 # backend/app/routers/volumes.py
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
+from app.models import Project
+from app.models.structure import Volume
 from app.schemas import VolumeCreate, VolumeRead, VolumeUpdate, \
     VolumeReadMinimal  # Make sure VolumeReadMinimal is imported if used
 from app.services import volume_service
+from app.utils import etag, pagination
+from app.utils.serialization import orm_response
 
 router = APIRouter()
 
@@ -43,11 +47,13 @@ async def create_new_volume(
                             detail=f"Could not create volume. Possible duplicate title or invalid data: {e}")
 
 
-@router.get("/projects/{project_id}/volumes", response_model=List[VolumeReadMinimal])  # Use VolumeRead to include chapters
+@router.get("/projects/{project_id}/volumes", response_model=List[VolumeReadMinimal],
+            dependencies=[Depends(etag.for_entity(Project, "project_id"))])  # Use VolumeRead to include chapters
 async def read_project_volumes(
         project_id: int,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description=pagination.CURSOR_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -55,13 +61,17 @@ async def read_project_volumes(
     Includes minimal scene information nested within each volume.
     """
     try:
-        volumes = volume_service.get_volumes_by_project(db=db, project_id=project_id, skip=skip, limit=limit)
-        return volumes
+        page = volume_service.get_volumes_by_project(db=db, project_id=project_id, skip=skip, limit=limit,
+                                                     cursor=cursor)
+        return pagination.page_response(page, VolumeReadMinimal)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:  # Project not found from service
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/volumes/{volume_id}", response_model=VolumeRead)
+@router.get("/volumes/{volume_id}", response_model=VolumeRead,
+            dependencies=[Depends(etag.for_entity(Volume, "volume_id"))])
 async def read_single_volume(
         volume_id: int = Path(..., description="The ID of the volume to retrieve"),
         db: Session = Depends(get_db)
@@ -72,7 +82,7 @@ async def read_single_volume(
     db_volume = volume_service.get_volume(db=db, volume_id=volume_id)
     if db_volume is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Volume not found")
-    return db_volume
+    return orm_response(db_volume, VolumeRead)
 
 
 @router.patch("/volumes/{volume_id}", response_model=VolumeRead)
@@ -3,9 +3,10 @@
 from .volume import VolumeCreate, VolumeRead, VolumeUpdate, VolumeReadMinimal
 from .chapter import ChapterCreate, ChapterRead, ChapterUpdate, ChapterReadMinimal
 from .character import CharacterCreate, CharacterRead, CharacterUpdate
-from .project import ProjectCreate, ProjectRead, ProjectUpdate
+from .project import ProjectCreate, ProjectRead, ProjectUpdate, ProjectSnapshot
 from .relationship import CharacterRelationshipCreate, CharacterRelationshipRead, CharacterRelationshipUpdate, \
     RelationshipInfoForCharacterRead
 from .scene import SceneCreate, SceneRead, SceneUpdate, SceneReadMinimal
 from .setting import SettingElementCreate, SettingElementRead, SettingElementUpdate
-
+from .batch import BatchOperation, BatchOperationResult, BatchRequest, BatchResult
+from .bulk_import import ImportResult
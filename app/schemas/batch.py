@@ -0,0 +1,25 @@
+# backend/app/schemas/batch.py
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional, Union
+
+BatchEntity = Literal["volume", "chapter", "scene", "character", "setting", "relationship"]
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    entity: BatchEntity
+    id: Optional[Union[int, str]] = None # update / delete 的目标，可以是 "$<ref>"
+    ref: Optional[str] = None # create 时的引用名，之后的操作可以用 "$<ref>" 代替新建行的 id
+    data: Dict[str, Any] = {} # 按实体的 Create / Update schema 校验，create 时 project_id 可省略
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+
+class BatchOperationResult(BaseModel):
+    op: str
+    entity: str
+    id: int
+    data: Optional[Dict[str, Any]] = None # 操作后的状态（不含嵌套的关系），delete 时为 None
+
+class BatchResult(BaseModel):
+    results: List[BatchOperationResult]
@@ -0,0 +1,14 @@
+# backend/app/schemas/bulk_import.py
+from pydantic import BaseModel
+from typing import List
+
+
+class ImportResult(BaseModel):
+    volumes: int = 0
+    chapters: int = 0
+    scenes: int = 0
+    characters: int = 0
+    settings: int = 0
+    relationships: int = 0
+    skipped: List[str] = [] # 因重名或引用不存在的角色而跳过的记录
+    embedding_started: bool = False # 向量和段落索引在后台补齐
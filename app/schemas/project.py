@@ -3,10 +3,12 @@ from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 # 导入其他需要的 Read schemas 以便嵌套显示 (如果需要)
-from .character import CharacterReadMinimal # 示例
-from .setting import SettingElementReadMinimal   # 示例
+from .character import CharacterReadMinimal, CharacterRead # 示例
+from .setting import SettingElementReadMinimal, SettingElementRead   # 示例
 from .chapter import ChapterReadMinimal   # 示例
-from .volume import VolumeReadMinimal
+from .volume import VolumeReadMinimal, VolumeRead
+from .scene import SceneRead
+from .relationship import CharacterRelationshipRead
 
 
 class ProjectBase(BaseModel):
@@ -34,4 +36,18 @@ class ProjectRead(ProjectBase):
     volumes: List[VolumeReadMinimal] = []
     chapters: List[ChapterReadMinimal] = []
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+# 编辑器打开项目时一次性加载的完整结构，见 app/services/snapshot_service.py
+class ProjectSnapshot(ProjectBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    volumes: List[VolumeRead] = [] # 卷 -> 章节 -> 场景，均按顺序排列
+    unassigned_scenes: List[SceneRead] = [] # 未归属章节的场景
+    characters: List[CharacterRead] = []
+    setting_elements: List[SettingElementRead] = []
+    relationships: List[CharacterRelationshipRead] = []
+
+    model_config = ConfigDict(from_attributes=True)
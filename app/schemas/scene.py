@@ -74,7 +74,7 @@ class SceneRead(SceneBase):
 class SceneReadMinimal(BaseModel):
     id: int
     title: Optional[str]
-    chapter_id: int
+    chapter_id: Optional[int] # 未分配章节的场景为 None
     order_in_chapter: int
     status: SceneStatus
 
@@ -0,0 +1,132 @@
+# backend/app/scripts/benchmark_compression.py
+"""
+响应压缩的带宽/延迟测算（不需要数据库）。
+
+用法（在 backend 目录下）：
+    python -m app.scripts.benchmark_compression
+    python -m app.scripts.benchmark_compression --chapters 1 --chapters 30 --chapters 200 --bandwidth-mbps 20
+
+用 benchmark_serialization.build_book 在内存中构造卷的树形响应（VolumeRead），每章 8000 字左右。
+build_book 的正文是重复短语，压缩率会被严重高估，这里把正文换成按 Zipf 分布从常用字中抽样的文本，
+压缩率接近真实的中文小说。
+对每种编码/级别统计：压缩后大小、压缩率、服务端压缩耗时、客户端解压耗时，
+以及按 --bandwidth-mbps 估算的端到端时间（压缩 + 传输 + 解压）。
+最后模拟 SSE 流：把正文切成 --stream-chunk-chars 字一块逐块压缩并 flush，查看小分块对压缩率的影响。
+"""
+import argparse
+import random
+import statistics
+import time
+import zlib
+from typing import Callable, List, Tuple
+
+import brotli
+import orjson
+
+from app.core.config import settings
+from app.schemas import VolumeRead
+from app.scripts.benchmark_serialization import build_book
+from app.utils.compression import BROTLI, GZIP, StreamCompressor
+from app.utils.serialization import dump_orm, ORJSON_OPTIONS
+
+SCENES_PER_CHAPTER = 4
+CHAPTER_CHARS = 8000
+COMMON_CHARACTERS = (
+    "的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要她出也得里后自以会家可下而过天去能对小多然于心"
+    "学么之都好看起发当没成只如事把还用第样道想作种开美总从无情己面最女但现前些所同日手又行意动方期它头经长儿回位分爱"
+    "老因很给名法间斯知世什两次使身者被高已亲其进此话常与活正感见明问力理尔点文几定本公特做外孩相西果走将月十实向声车"
+    "全信重三机工物气每并别真打太新比才便夫再书部水像眼等体却加电主界门利海受听表德少克代员许今先口由死安写性马光白或"
+    "住难望教命花结乐色更拉东神记处让母父应直字场平报友关放至张认接告入笑内英军候民岁往何度山觉路带万男边风解叫任金快"
+)
+PUNCTUATION = "，，，，。。、？！"
+
+
+def _prose(length: int, rng: random.Random) -> str:
+    """按 Zipf 分布抽样常用字，每 8~20 个字插入一个标点。"""
+    weights = [1 / (rank + 1) for rank in range(len(COMMON_CHARACTERS))]
+    characters = rng.choices(COMMON_CHARACTERS, weights=weights, k=length)
+    position = 0
+    while position < length:
+        position += rng.randint(8, 20)
+        if position < length:
+            characters[position] = rng.choice(PUNCTUATION)
+    return "".join(characters)
+
+
+def build_volume(chapter_count: int):
+    rng = random.Random(chapter_count)
+    volume = build_book(chapter_count, SCENES_PER_CHAPTER, 0)
+    for chapter in volume.chapters:
+        chapter.summary = _prose(120, rng)
+        for scene in chapter.scenes:
+            scene.summary = _prose(160, rng)
+            scene.generated_content = _prose(CHAPTER_CHARS // SCENES_PER_CHAPTER, rng)
+    return volume
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="响应压缩的带宽/延迟测算")
+    parser.add_argument("--chapters", type=int, action="append", help="卷中的章节数，可重复；默认 1、30、200")
+    parser.add_argument("--bandwidth-mbps", type=float, default=10.0, help="估算传输时间使用的带宽")
+    parser.add_argument("--stream-chunk-chars", type=int, default=20, help="模拟 SSE 时每块的字数")
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def _median_ms(function: Callable[[], bytes], repeat: int) -> Tuple[float, bytes]:
+    timings, result = [], b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def _codecs() -> List[Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    codecs = [("identity", lambda data: data, lambda data: data)]
+    for level in (1, 6, 9):
+        codecs.append((f"gzip-{level}", lambda data, level=level: zlib.compress(data, level, wbits=31),
+                       lambda data: zlib.decompress(data, wbits=31)))
+    for quality in (1, 4, 6, 11):
+        codecs.append((f"br-{quality}",
+                       lambda data, quality=quality: brotli.compress(data, mode=brotli.MODE_TEXT, quality=quality),
+                       brotli.decompress))
+    return codecs
+
+
+def _stream(payload: bytes, encoding: str, chunk_chars: int) -> int:
+    text = payload.decode("utf-8")
+    compressor = StreamCompressor(encoding, settings.GZIP_COMPRESSION_LEVEL, settings.BROTLI_COMPRESSION_QUALITY)
+    size = 0
+    for start in range(0, len(text), chunk_chars):
+        size += len(compressor.compress(text[start:start + chunk_chars].encode("utf-8"), flush=True))
+    return size + len(compressor.finish())
+
+
+def main():
+    args = parse_args()
+    bytes_per_ms = args.bandwidth_mbps * 1000 * 1000 / 8 / 1000
+    for chapter_count in args.chapters or [1, 30, 200]:
+        volume = build_volume(chapter_count)
+        payload = orjson.dumps(dump_orm(volume, VolumeRead), option=ORJSON_OPTIONS)
+        print(f"\n{chapter_count} chapters, {len(payload) / 1024:.0f} KB JSON, {args.bandwidth_mbps:g} Mbps")
+        print(f"{'codec':<10} {'size KB':>9} {'ratio':>6} {'comp ms':>8} {'decomp ms':>10} {'total ms':>9}")
+        for name, compress, decompress in _codecs():
+            compress_ms, compressed = _median_ms(lambda: compress(payload), args.repeat)
+            decompress_ms, restored = _median_ms(lambda: decompress(compressed), args.repeat)
+            if restored != payload:
+                print(f"{name}: round trip mismatch!")
+            total_ms = compress_ms + len(compressed) / bytes_per_ms + decompress_ms
+            print(f"{name:<10} {len(compressed) / 1024:>9.1f} {len(payload) / len(compressed):>6.1f} "
+                  f"{compress_ms:>8.2f} {decompress_ms:>10.2f} {total_ms:>9.1f}")
+
+    volume = build_volume(1)
+    text = "".join(scene.generated_content for scene in volume.chapters[0].scenes).encode("utf-8")
+    print(f"\nSSE stream of {len(text) / 1024:.0f} KB in {args.stream_chunk_chars}-char chunks (flush per chunk):")
+    for encoding in (GZIP, BROTLI):
+        size = _stream(text, encoding, args.stream_chunk_chars)
+        print(f"{encoding:<10} {size / 1024:>9.1f} KB, ratio {len(text) / size:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# backend/app/scripts/benchmark_serialization.py
+"""
+章节/卷树形响应的序列化耗时对比（不需要数据库）。
+
+用法（在 backend 目录下）：
+    python -m app.scripts.benchmark_serialization --chapters 200 --scenes 8 --content-chars 3000
+
+在内存中构造一本书的 ORM 对象，比较两条路径：
+- pydantic：FastAPI 按 response_model 的默认处理（from_attributes 校验 → JSON 模式 dump → json.dumps）；
+- dump_orm：serialization.dump_orm + orjson（路由中 orm_response 的处理）。
+同时检查两条路径输出的 JSON 内容一致。
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.models.structure import Volume, Chapter, Scene, SceneStatus
+from app.schemas import ChapterRead, VolumeRead
+from app.utils.serialization import dump_orm, ORJSON_OPTIONS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="树形响应序列化耗时对比")
+    parser.add_argument("--chapters", type=int, default=200)
+    parser.add_argument("--scenes", type=int, default=8, help="每章的场景数")
+    parser.add_argument("--content-chars", type=int, default=3000, help="每个场景正文的字数")
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def build_book(chapter_count: int, scene_count: int, content_chars: int) -> Volume:
+    now = datetime.now(timezone.utc)
+    volume = Volume(id=1, project_id=1, title="第一卷", summary="卷概要" * 20, order=0, created_at=now, updated_at=now)
+    scene_id = 0
+    for chapter_index in range(chapter_count):
+        chapter = Chapter(id=chapter_index + 1, project_id=1, volume_id=1, title=f"第{chapter_index + 1}章",
+                          summary="章节概要" * 30, content="", order=chapter_index, created_at=now, updated_at=now)
+        for scene_index in range(scene_count):
+            scene_id += 1
+            chapter.scenes.append(Scene(
+                id=scene_id, project_id=1, chapter_id=chapter.id, title=f"场景{scene_index + 1}",
+                goal="场景目标" * 10, summary="场景概要" * 40, generated_content="正文。" * (content_chars // 3),
+                order_in_chapter=scene_index, status=SceneStatus.DRAFTED, created_at=now, updated_at=now))
+        volume.chapters.append(chapter)
+    return volume
+
+
+def _time(function, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    args = parse_args()
+    volume = build_book(args.chapters, args.scenes, args.content_chars)
+    cases = [
+        ("List[ChapterRead]", volume.chapters, TypeAdapter(List[ChapterRead]), ChapterRead),
+        ("VolumeRead", volume, TypeAdapter(VolumeRead), VolumeRead),
+    ]
+    for name, payload, adapter, schema in cases:
+        def pydantic_path():
+            validated = adapter.validate_python(payload, from_attributes=True)
+            return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False).encode("utf-8")
+
+        def dump_orm_path():
+            return orjson.dumps(dump_orm(payload, schema), option=ORJSON_OPTIONS)
+
+        if json.loads(pydantic_path()) != orjson.loads(dump_orm_path()):
+            print(f"{name}: outputs differ!")
+        size_mb = len(dump_orm_path()) / 1024 / 1024
+        baseline = statistics.median(_time(pydantic_path, args.repeat))
+        fast = statistics.median(_time(dump_orm_path, args.repeat))
+        print(f"{name} ({size_mb:.1f} MB): pydantic {baseline:.1f} ms, dump_orm {fast:.1f} ms, "
+              f"{baseline / fast:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
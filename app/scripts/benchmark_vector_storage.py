@@ -0,0 +1,108 @@
+# backend/app/scripts/benchmark_vector_storage.py
+"""
+比较不同向量索引模式的召回率和延迟。
+
+用法（在 backend 目录下）：
+    python -m app.scripts.benchmark_vector_storage --table scene_passages --queries 50 --k 6
+    python -m app.scripts.benchmark_vector_storage --table characters --project-id 1 --rescore-factor 8
+    python -m app.scripts.benchmark_vector_storage --dimensions 256 --dimensions 512   # 比较 Matryoshka 粗排维度
+
+从表中随机取 --queries 行的向量作为查询（结果中排除该行本身），
+以关闭索引扫描的精确 float32 排序作为标准答案，统计每种模式（和粗排维度）的 recall@k 与 p50/p95 延迟。
+对应的索引不存在时查询会退化为顺序扫描，延迟没有参考价值；输出开头会列出该表现有的 HNSW 索引。
+先用 python -m app.scripts.vector_storage --mode <mode> 建好要比较的索引。
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import func, text
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import Character, SettingElement, CharacterRelationship, ScenePassage, ChapterPassage
+from app.services import vector_search
+
+MODELS = {
+    "characters": Character,
+    "setting_elements": SettingElement,
+    "character_relationships": CharacterRelationship,
+    "scene_passages": ScenePassage,
+    "chapter_passages": ChapterPassage,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="向量索引模式的召回率/延迟对比")
+    parser.add_argument("--table", choices=sorted(MODELS), default="scene_passages")
+    parser.add_argument("--project-id", type=int, default=None)
+    parser.add_argument("--queries", type=int, default=50, help="查询次数")
+    parser.add_argument("--k", type=int, default=settings.PASSAGE_TOP_K)
+    parser.add_argument("--dimensions", type=int, action="append",
+                        help="粗排维度，可重复；默认 EMBED_SEARCH_DIMENSIONS")
+    parser.add_argument("--rescore-factor", type=int, default=None, help="覆盖 VECTOR_RESCORE_FACTOR")
+    return parser.parse_args()
+
+
+def _base_query(db, model, project_id, exclude_id):
+    query = db.query(model.id).filter(model.embedding != None, model.id != exclude_id)
+    if project_id is not None:
+        query = query.filter(model.project_id == project_id)
+    return query
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def main():
+    args = parse_args()
+    if args.rescore_factor:
+        settings.VECTOR_RESCORE_FACTOR = args.rescore_factor
+    model = MODELS[args.table]
+    db = SessionLocal()
+    try:
+        sample = db.query(model.id, model.embedding).filter(model.embedding != None)
+        if args.project_id is not None:
+            sample = sample.filter(model.project_id == args.project_id)
+        samples = sample.order_by(func.random()).limit(args.queries).all()
+        if not samples:
+            print(f"No embedded rows in {args.table}.")
+            return
+
+        # 标准答案：关闭索引扫描，按 float32 余弦距离精确排序
+        truth = {}
+        db.execute(text("SET LOCAL enable_indexscan = off"))
+        for row_id, embedding in samples:
+            query = _base_query(db, model, args.project_id, row_id)
+            truth[row_id] = {found for (found,) in query.order_by(model.embedding.cosine_distance(embedding))
+                             .limit(args.k).all()}
+        db.rollback()
+
+        indexes = {name: size for name, size in vector_search.index_sizes(db).items()
+                   if name.startswith(f"ix_{args.table}_")}
+        print(f"{args.table}: {len(samples)} queries, k={args.k}, rescore factor={settings.VECTOR_RESCORE_FACTOR}")
+        for name, size in sorted(indexes.items()):
+            print(f"  index {name}: {size / 1024 / 1024:.1f} MB")
+        print(f"{'mode':<8} {'dims':>5} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        cases = [(mode, vector_search.search_dimensions(dimensions))
+                 for dimensions in (args.dimensions or [None]) for mode in vector_search.STORAGE_MODES]
+        for mode, dimensions in cases:
+            recalls, latencies = [], []
+            for row_id, embedding in samples:
+                query = vector_search.nearest(_base_query(db, model, args.project_id, row_id), model.embedding,
+                                              embedding, args.k, mode=mode, dimensions=dimensions)
+                started = time.perf_counter()
+                found = {found_id for (found_id,) in query.all()}
+                latencies.append((time.perf_counter() - started) * 1000)
+                expected = truth[row_id]
+                recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+            print(f"{mode:<8} {dimensions:>5} {statistics.mean(recalls):>9.3f} {_percentile(latencies, 50):>8.2f} "
+                  f"{_percentile(latencies, 95):>8.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# backend/app/scripts/check_query_plans.py
+"""
+热点查询的执行计划检查：在大数据量下，列表、叙事位置和检索查询不应退化为顺序扫描。
+
+用法（在 backend 目录下，需要已执行 alembic upgrade head 的数据库）：
+    python -m app.scripts.check_query_plans
+    python -m app.scripts.check_query_plans --projects 100 --scenes-per-chapter 80 --verbose
+
+在一个事务中用 generate_series 生成 --projects 个项目的数据（默认约 10 万个场景、
+每个场景关联两个角色和一个设定），ANALYZE 后调用各 service 的真实查询函数，
+记录它们发出的 SELECT，再逐条 EXPLAIN (FORMAT JSON)。
+执行计划中出现行数不少于 --min-rows 的表上的 Seq Scan 即判为失败；小表上的顺序扫描是正常的，不计入。
+结束时回滚事务，不会留下任何数据。有失败时退出码为 1，可以放进 CI。
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models import Character, Project, Scene, SettingElement
+from app.models.structure import Chapter, Volume
+from app.services import (chapter_service, character_service, position_service, rag_service,
+                          relationship_service, scene_service, setting_service, summary_service, volume_service)
+
+TITLE_PREFIX = "plan-check "
+
+HOT_TABLES = (
+    "volumes", "chapters", "scenes", "characters", "setting_elements", "character_relationships",
+    "scene_character_association", "scene_setting_association",
+)
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO projects (title, version)
+    SELECT :prefix || g, 0 FROM generate_series(1, :projects) g
+    """,
+    """
+    INSERT INTO volumes (project_id, title, "order")
+    SELECT p.id, 'volume ' || g, g
+    FROM projects p, generate_series(0, :volumes - 1) g
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO chapters (project_id, volume_id, title, summary, "order", narrative_position)
+    SELECT v.project_id, v.id, 'chapter ' || g, 'summary ' || g, g, v."order" * :chapters + g
+    FROM volumes v JOIN projects p ON p.id = v.project_id, generate_series(0, :chapters - 1) g
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO scenes (project_id, chapter_id, title, summary, order_in_chapter, narrative_position, status,
+                        created_at)
+    SELECT c.project_id, c.id, 'scene ' || g, 'summary ' || g, g, c.narrative_position * :scenes + g,
+           (ARRAY['PLANNED', 'DRAFTED', 'REVISING', 'COMPLETED'])[1 + g % 4]::scenestatus,
+           now() - (c.narrative_position * :scenes + g) * interval '1 minute'
+    FROM chapters c JOIN projects p ON p.id = c.project_id, generate_series(0, :scenes - 1) g
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO scenes (project_id, title, goal, order_in_chapter, status)
+    SELECT p.id, 'unassigned ' || g, 'goal ' || g, 0, 'PLANNED'::scenestatus
+    FROM projects p, generate_series(1, :unassigned) g
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO characters (project_id, name, description)
+    SELECT p.id, 'character ' || g, 'description ' || g
+    FROM projects p, generate_series(1, :characters) g
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO setting_elements (project_id, name, element_type, description)
+    SELECT p.id, 'setting ' || g, 'Location', 'description ' || g
+    FROM projects p, generate_series(1, :characters) g
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO character_relationships (project_id, character1_id, character2_id, relationship_type)
+    SELECT project_id, id, next_id, 'Friend'
+    FROM (SELECT c.project_id, c.id, lead(c.id) OVER (PARTITION BY c.project_id ORDER BY c.id) AS next_id
+          FROM characters c JOIN projects p ON p.id = c.project_id
+          WHERE p.title LIKE :prefix || '%') pairs
+    WHERE next_id IS NOT NULL
+    """,
+    """
+    INSERT INTO scene_character_association (scene_id, character_id)
+    SELECT s.id, c.id
+    FROM scenes s
+    JOIN projects p ON p.id = s.project_id
+    JOIN (SELECT id, project_id, row_number() OVER (PARTITION BY project_id ORDER BY id) - 1 AS rn
+          FROM characters) c
+      ON c.project_id = s.project_id AND c.rn IN (s.id % :characters, (s.id + 1) % :characters)
+    WHERE p.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO scene_setting_association (scene_id, setting_element_id)
+    SELECT s.id, e.id
+    FROM scenes s
+    JOIN projects p ON p.id = s.project_id
+    JOIN (SELECT id, project_id, row_number() OVER (PARTITION BY project_id ORDER BY id) - 1 AS rn
+          FROM setting_elements) e
+      ON e.project_id = s.project_id AND e.rn = s.id % :characters
+    WHERE p.title LIKE :prefix || '%'
+    """,
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="检查热点查询在大数据量下是否退化为顺序扫描")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--volumes", type=int, default=4, help="每个项目的卷数")
+    parser.add_argument("--chapters", type=int, default=10, help="每卷的章节数")
+    parser.add_argument("--scenes-per-chapter", type=int, default=50)
+    parser.add_argument("--unassigned", type=int, default=100, help="每个项目未归属章节的场景数")
+    parser.add_argument("--characters", type=int, default=300, help="每个项目的角色数（设定元素数相同）")
+    parser.add_argument("--min-rows", type=int, default=10000, help="行数不少于该值的表上出现 Seq Scan 视为失败")
+    parser.add_argument("--verbose", action="store_true", help="打印每条查询的 SQL 和执行计划")
+    return parser.parse_args()
+
+
+def seed(db: Session, args) -> None:
+    params = {"prefix": TITLE_PREFIX, "projects": args.projects, "volumes": args.volumes,
+              "chapters": args.chapters, "scenes": args.scenes_per_chapter, "unassigned": args.unassigned,
+              "characters": args.characters}
+    for statement in SEED_STATEMENTS:
+        db.execute(text(statement), params)
+    for table in HOT_TABLES:
+        db.execute(text(f"ANALYZE {table}"))
+
+
+class QueryRecorder:
+    """记录带标签期间执行的 SELECT 语句（SQL 和驱动层参数）；准备数据时的查询不记录。"""
+
+    def __init__(self):
+        self.label = ""
+        self.queries: List[Tuple[str, str, Any]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            self.queries.append((self.label, statement, parameters))
+
+    @contextmanager
+    def labelled(self, label: str) -> Iterator[None]:
+        self.label = label
+        try:
+            yield
+        finally:
+            self.label = ""
+
+
+def run_hot_queries(db: Session, recorder: QueryRecorder, project_title: str) -> None:
+    """依次调用各 service 的查询函数；只关心发出的 SQL，不检查返回结果。"""
+    project = db.query(Project).filter(Project.title == project_title).one()
+    volume = db.query(Volume).filter(Volume.project_id == project.id).order_by(Volume.order.desc()).first()
+    chapter = db.query(Chapter).filter(Chapter.volume_id == volume.id).order_by(Chapter.order.desc()).first()
+    scene = db.query(Scene).filter(Scene.chapter_id == chapter.id).order_by(Scene.order_in_chapter.desc()).first()
+    character = db.query(Character).filter(Character.project_id == project.id).order_by(Character.id).first()
+    setting_element = db.query(SettingElement).filter(SettingElement.project_id == project.id).first()
+    db.expire_all()
+
+    with recorder.labelled("chapters by project"):
+        page = chapter_service.get_chapters_by_project(db, project.id, limit=20)
+        chapter_service.get_chapters_by_project(db, project.id, limit=20, cursor=page.next_cursor)
+    with recorder.labelled("chapters by volume"):
+        chapter_service.get_chapters_by_volume(db, volume.id, limit=5)
+    with recorder.labelled("volumes by project"):
+        volume_service.get_volumes_by_project(db, project.id, limit=2)
+    with recorder.labelled("scenes by chapter"):
+        scene_service.get_scenes_by_chapter(db, chapter.id, limit=20)
+    with recorder.labelled("scenes by project"):
+        page = scene_service.get_scenes_by_project(db, project.id, limit=50)
+        scene_service.get_scenes_by_project(db, project.id, limit=50, cursor=page.next_cursor)
+    with recorder.labelled("unassigned scenes"):
+        scene_service.get_scenes_by_project_unassigned(db, project.id, limit=50)
+    with recorder.labelled("characters by project"):
+        page = character_service.get_characters_by_project(db, project.id, limit=50)
+        character_service.get_characters_by_project(db, project.id, limit=50, cursor=page.next_cursor)
+    with recorder.labelled("settings by project"):
+        setting_service.get_setting_elements_by_project(db, project.id, limit=50)
+    with recorder.labelled("relationships by project"):
+        relationship_service.get_relationships_by_project(db, project.id, limit=50)
+    with recorder.labelled("relationships for character"):
+        relationship_service.get_relationships_for_character(db, character.id, limit=50)
+    with recorder.labelled("scenes of character"):
+        db.get(Character, character.id).scenes
+    with recorder.labelled("scenes of setting element"):
+        db.get(SettingElement, setting_element.id).scenes
+    with recorder.labelled("previous chapter"):
+        position_service.get_previous_chapter(db, chapter)
+    with recorder.labelled("previous scenes"):
+        position_service.get_previous_scenes(db, scene, 10)
+    with recorder.labelled("scenes in range"):
+        position_service.get_scenes_in_range(db, project.id, scene.narrative_position - 30, scene.narrative_position)
+    with recorder.labelled("chapter rollup"):
+        summary_service._chapter_rollup_items(db, chapter)
+    with recorder.labelled("volume rollup"):
+        summary_service._volume_rollup_items(db, volume)
+    with recorder.labelled("story so far"):
+        summary_service.build_story_so_far(db, chapter)
+    with recorder.labelled("past scenes"):
+        rag_service._retrieve_past_scenes(db, project.id, [1.0] * settings.EMBED_DIMENSIONS, 5,
+                                          current_scene_id=scene.id, anchor_chapter_id=chapter.id)
+
+
+def _seq_scans(plan: Dict[str, Any]) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def check_plans(db: Session, queries: List[Tuple[str, str, Any]], min_rows: int, verbose: bool) -> List[str]:
+    connection = db.connection()
+    row_counts = dict(connection.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relname = ANY(:tables) AND relkind = 'r'"),
+        {"tables": list(HOT_TABLES)}).all())
+    print("Rows: " + ", ".join(f"{table}={int(row_counts.get(table, 0))}" for table in HOT_TABLES))
+
+    failures = []
+    for label, statement, parameters in queries:
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()[0]["Plan"]
+        large = sorted({table for table in _seq_scans(plan) if row_counts.get(table, 0) >= min_rows})
+        print(f"{'FAIL' if large else 'ok':<5} {label:<28} cost={plan['Total Cost']:.0f}"
+              + (f"  Seq Scan on {', '.join(large)}" if large else ""))
+        if large:
+            failures.append(f"{label}: Seq Scan on {', '.join(large)}\n{statement}")
+        if verbose:
+            print(statement)
+            print("\n".join(connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).scalars()))
+    return failures
+
+
+def main():
+    args = parse_args()
+    db = SessionLocal()
+    recorder = QueryRecorder()
+    try:
+        print(f"Seeding {args.projects} projects "
+              f"({args.projects * args.volumes * args.chapters * args.scenes_per_chapter} chapter scenes)...")
+        seed(db, args)
+        event.listen(engine, "before_cursor_execute", recorder)
+        try:
+            run_hot_queries(db, recorder, f"{TITLE_PREFIX}{max(1, args.projects // 2)}")  # 取中间的项目
+        finally:
+            event.remove(engine, "before_cursor_execute", recorder)
+        failures = check_plans(db, recorder.queries, args.min_rows, args.verbose)
+    finally:
+        db.rollback()
+        db.close()
+
+    if failures:
+        print(f"\n{len(failures)} queries fall back to sequential scans:")
+        for failure in failures:
+            print(f"\n{failure}")
+        sys.exit(1)
+    print(f"\nAll {len(recorder.queries)} queries use indexes on large tables.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# backend/app/scripts/import_manuscript.py
+"""
+批量导入已有书稿和世界观设定（记录格式见 app/services/import_service.py）。
+
+用法（在 backend 目录下）：
+    python -m app.scripts.import_manuscript --title "旧稿" --manuscript novel.txt --world-bible bible.json
+    python -m app.scripts.import_manuscript --project-id 1 --jsonl export.jsonl
+    python -m app.scripts.import_manuscript --project-id 1 --manuscript novel.txt --skip-embedding
+
+世界观文件可以是 JSON 对象 {"characters": [...], "settings": [...], "relationships": [...]}，
+也可以是 .jsonl（每行一条带 type 的记录）。结构化数据一次提交；embedding 阶段中断后可用
+python -m app.scripts.reindex --project-id <id> 补齐（场景段落索引在正文下次保存时重建）。
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.db.session import SessionLocal
+from app.schemas import ProjectCreate
+from app.services import import_service, project_service, summary_service
+
+WORLD_BIBLE_SECTIONS = {"characters": "character", "settings": "setting", "relationships": "relationship"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="批量导入书稿和世界观设定")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--project-id", type=int, help="导入到已有项目")
+    target.add_argument("--title", help="新建项目并导入")
+    parser.add_argument("--jsonl", action="append", default=[], help="JSON Lines 记录文件，可重复")
+    parser.add_argument("--manuscript", action="append", default=[], help="纯文本书稿，可重复，按顺序导入")
+    parser.add_argument("--world-bible", help="世界观设定（.json 或 .jsonl）")
+    parser.add_argument("--encoding", default="utf-8", help="输入文件编码")
+    parser.add_argument("--skip-embedding", action="store_true", help="只写入结构化数据，向量稍后用 reindex 补齐")
+    return parser.parse_args()
+
+
+def feed_file(parser: import_service.ImportParser, path: str, encoding: str) -> None:
+    with open(path, encoding=encoding) as f:
+        for line in f:
+            parser.feed(line.rstrip("\n"))
+
+
+def read_records(args) -> list:
+    """世界观先于书稿读入，顺序不影响结果（关系和提及在全部记录写入后解析）。"""
+    records = []
+    if args.world_bible:
+        if args.world_bible.endswith(".jsonl"):
+            parser = import_service.ImportParser("jsonl")
+            feed_file(parser, args.world_bible, args.encoding)
+            records.extend(parser.close())
+        else:
+            with open(args.world_bible, encoding=args.encoding) as f:
+                bible = json.load(f)
+            parser = import_service.ImportParser("jsonl")
+            for section, record_type in WORLD_BIBLE_SECTIONS.items():
+                for index, item in enumerate(bible.get(section, [])):
+                    item = {**item, "type": record_type} if isinstance(item, dict) else item
+                    parser.feed_record(item, f"{args.world_bible}: {section}[{index}]")
+            records.extend(parser.close())
+    for path in args.jsonl:
+        parser = import_service.ImportParser("jsonl")
+        feed_file(parser, path, args.encoding)
+        records.extend(parser.close())
+    for path in args.manuscript:
+        parser = import_service.ImportParser("text")
+        feed_file(parser, path, args.encoding)
+        records.extend(parser.close())
+    return records
+
+
+async def main():
+    args = parse_args()
+    started = time.perf_counter()
+    records = read_records(args)
+    print(f"Parsed {len(records)} records in {time.perf_counter() - started:.1f}s.")
+
+    db = SessionLocal()
+    try:
+        project_id = args.project_id
+        if project_id is None:
+            project_id = project_service.create_project(db, ProjectCreate(title=args.title)).id
+            print(f"Created project {project_id}.")
+        elif project_service.get_project(db, project_id=project_id) is None:
+            raise SystemExit(f"Project {project_id} not found")
+
+        outcome = import_service.import_records(db, project_id, records)
+        for message in outcome.skipped:
+            print(f"Skipped: {message}")
+        print(f"Imported {outcome.counts} in {time.perf_counter() - started:.1f}s.")
+        if args.skip_embedding:
+            return
+        results = await import_service.embed_imported(db, project_id, outcome.scene_ids)
+        print(f"Embedded: {results} ({time.perf_counter() - started:.1f}s).")
+        if outcome.rollup_chapter_ids:
+            await summary_service.rollup_chapters(db, outcome.rollup_chapter_ids)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
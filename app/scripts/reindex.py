@@ -0,0 +1,52 @@
+# backend/app/scripts/reindex.py
+"""
+向量补齐/重建命令行工具。
+
+用法（在 backend 目录下）：
+    python -m app.scripts.reindex --dry-run                # 只统计缺失或过期的向量
+    python -m app.scripts.reindex --project-id 1           # 补齐项目 1 的缺失/过期向量
+    python -m app.scripts.reindex --adopt-existing         # 升级后首次运行：为已有向量补写签名，不重新 embedding
+    python -m app.scripts.reindex --target characters --force --throttle 2
+
+任务可以随时中断（Ctrl+C），重新运行会从未完成的行继续。
+"""
+import argparse
+import asyncio
+
+from app.db.session import SessionLocal
+from app.services import reindex_service
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="补齐或重建缺失/过期的向量")
+    parser.add_argument("--project-id", type=int, default=None, help="只处理该项目，默认处理全部项目")
+    parser.add_argument("--target", action="append", choices=sorted(reindex_service.TARGETS_BY_NAME),
+                        help="只处理指定目标，可重复；默认处理全部")
+    parser.add_argument("--force", action="store_true", help="忽略签名，全部重新 embedding")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不写入")
+    parser.add_argument("--adopt-existing", action="store_true",
+                        help="为已有向量但没有签名的行写入当前签名（不调用 embedding 接口）")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批处理的行数")
+    parser.add_argument("--throttle", type=float, default=None, help="批次之间的休眠秒数")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            print(reindex_service.count_stale(db, project_id=args.project_id, targets=args.target, force=args.force))
+            return
+        if args.adopt_existing:
+            print(f"Adopted: {reindex_service.adopt_existing(db, project_id=args.project_id, targets=args.target)}")
+        results = await reindex_service.run_reindex(db, project_id=args.project_id, targets=args.target,
+                                                    force=args.force, batch_size=args.batch_size,
+                                                    throttle_seconds=args.throttle)
+        print(f"Reindexed: {results}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+# backend/app/scripts/vector_storage.py
+"""
+切换向量索引模式（见 app/services/vector_search.py）。
+
+用法（在 backend 目录下）：
+    python -m app.scripts.vector_storage --mode binary                       # 创建 binary 索引，删除其它量化索引
+    python -m app.scripts.vector_storage --mode halfvec --drop-float-indexes # 同时删除段落表的 float 索引
+    python -m app.scripts.vector_storage --mode float --dimensions 256       # Matryoshka：用前 256 维建索引
+    python -m app.scripts.vector_storage --sizes                             # 查看现有 HNSW 索引的大小
+    python -m app.scripts.vector_storage --resize --reindex                  # 修改 EMBED_DIMENSIONS 之后
+
+索引建好后再把 .env 中的 VECTOR_STORAGE_MODE / EMBED_SEARCH_DIMENSIONS 改成对应的值并重启服务。
+向量列本身不变，随时可以切回 float。
+
+--resize 把维度与 .env 中 EMBED_DIMENSIONS 不一致的向量列改成新维度：只清空这些列的向量和签名，
+并按当前 VECTOR_STORAGE_MODE / EMBED_SEARCH_DIMENSIONS 重建它们的索引。维度超过 HNSW 索引上限
+（float 2000 / halfvec 4000 / binary 64000）时在修改任何数据之前报错，此时改用 halfvec / binary 模式
+或较小的 EMBED_SEARCH_DIMENSIONS，段落表的 float 索引可以加 --drop-float-indexes 不再重建。
+--reindex 随后只对被清空的列重新 embedding（也可以稍后用 app.scripts.reindex 补齐）。
+"""
+import argparse
+import asyncio
+
+from app.db.session import SessionLocal
+from app.services import reindex_service, vector_search
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="创建/删除向量 ANN 索引以切换存储模式")
+    parser.add_argument("--mode", choices=vector_search.STORAGE_MODES, help="目标模式")
+    parser.add_argument("--dimensions", type=int, default=None,
+                        help="粗排维度，默认 EMBED_SEARCH_DIMENSIONS（0 表示完整维度）")
+    parser.add_argument("--drop-float-indexes", action="store_true",
+                        help="量化模式下同时删除段落表在模型中声明的 float 索引")
+    parser.add_argument("--sizes", action="store_true", help="只打印现有 HNSW 索引的大小")
+    parser.add_argument("--resize", action="store_true",
+                        help="把维度与 EMBED_DIMENSIONS 不一致的向量列改成新维度（清空这些列）")
+    parser.add_argument("--reindex", action="store_true", help="与 --resize 一起使用：对被清空的列重新 embedding")
+    return parser.parse_args()
+
+
+def resize(drop_float_indexes: bool, reindex: bool) -> None:
+    columns = {(target.model.__tablename__, target.vector_attr): target for target in reindex_service.TARGETS}
+    try:
+        resized = vector_search.resize_vector_columns(
+            [(table_name, column_name, target.signature_attr) for (table_name, column_name), target in columns.items()],
+            drop_float_indexes=drop_float_indexes)
+    except ValueError as e:
+        raise SystemExit(f"Nothing changed: {e}")
+    if not resized:
+        print("All vector columns already match EMBED_DIMENSIONS.")
+        return
+    targets = [columns[column].name for column in resized]
+    print(f"Resized and cleared: {', '.join(targets)}")
+    if not reindex:
+        print(f"Run python -m app.scripts.reindex {' '.join(f'--target {name}' for name in targets)} to re-embed.")
+        return
+    db = SessionLocal()
+    try:
+        print(f"Reindexed: {asyncio.run(reindex_service.run_reindex(db, targets=targets))}")
+    finally:
+        db.close()
+
+
+def main():
+    args = parse_args()
+    if args.resize:
+        resize(args.drop_float_indexes, args.reindex)
+    if args.mode and not args.sizes:
+        vector_search.switch_storage_mode(args.mode, dimensions=args.dimensions,
+                                          drop_float_indexes=args.drop_float_indexes)
+    db = SessionLocal()
+    try:
+        for name, size in sorted(vector_search.index_sizes(db).items()):
+            print(f"{name}: {size / 1024 / 1024:.1f} MB")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
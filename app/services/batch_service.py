@@ -0,0 +1,305 @@
+# backend/app/services/batch_service.py
+"""
+批量修改：在一个事务中执行一组跨实体类型的创建/更新/删除，用于拖动排序和批量编辑。
+
+逐条调用 PATCH 时每一行都要单独查询、提交、refresh、重排叙事位置，改摘要时还可能单独调用一次 embedding。
+这里：
+- update/delete 的目标行按实体类型各用一条 IN 查询预先加载；
+- 所有修改只 flush 不提交（create 会立即 flush 以拿到 id），叙事位置最后只重排一次，整批只提交一次；
+  任何一个操作失败整批回滚，错误信息中带上操作的序号；
+- 场景目标向量（单条接口也是在提交前同步计算的）合并成一次 get_embeddings 请求；
+  其它向量和章节正文段落提交后交给后写队列（embedding_worker），由它按目标合并成批量请求；
+- 提交后每种实体类型用一条查询重新加载最终状态并返回（只含行本身的字段，不展开嵌套关系）。
+
+create 操作可以带 ref，之后的操作在 id 或 data 的取值中用 "$<ref>" 引用新建行的 id，
+例如先创建章节再把场景移进去。
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Character, CharacterRelationship, Scene, SettingElement
+from app.models.structure import Chapter, Volume
+from app.schemas import (BatchOperation, ChapterCreate, ChapterRead, ChapterUpdate, CharacterCreate, CharacterRead,
+                         CharacterRelationshipCreate, CharacterRelationshipRead, CharacterRelationshipUpdate,
+                         CharacterUpdate, SceneCreate, SceneRead, SceneUpdate, SettingElementCreate,
+                         SettingElementRead, SettingElementUpdate, VolumeCreate, VolumeRead, VolumeUpdate)
+from app.services import (embedding_worker, llm_service, mention_service, passage_service, position_service,
+                          reindex_service, summary_service)
+from app.utils import fieldsets
+from app.utils.serialization import dump_orm
+
+INLINE_EMBEDDING_TARGETS = ("scene_goals",)  # 提交前同步计算，与 scene_service 一致
+ORDERING_COLUMNS = {"order", "volume_id", "chapter_id", "order_in_chapter"}  # 修改后需要重排叙事位置
+
+
+@dataclass(frozen=True)
+class BatchEntity:
+    model: Any
+    create_schema: Type[BaseModel]
+    update_schema: Type[BaseModel]
+    read_schema: Type[BaseModel]
+    embedding_targets: Tuple[str, ...]  # reindex_service.TARGETS 中的名称
+    parents: Dict[str, Any] = field(default_factory=dict)  # 外键字段 -> 模型，必须属于同一项目
+    structural: bool = False  # 创建/删除会影响叙事位置
+    skip_none_updates: bool = False  # 与 scene_service.update_scene_metadata 一致，忽略值为 None 的字段
+
+
+ENTITIES: Dict[str, BatchEntity] = {
+    "volume": BatchEntity(Volume, VolumeCreate, VolumeUpdate, VolumeRead, ("volumes",), structural=True),
+    "chapter": BatchEntity(Chapter, ChapterCreate, ChapterUpdate, ChapterRead, ("chapters",),
+                           parents={"volume_id": Volume}, structural=True),
+    "scene": BatchEntity(Scene, SceneCreate, SceneUpdate, SceneRead, ("scene_goals", "scene_summaries"),
+                         parents={"chapter_id": Chapter}, structural=True, skip_none_updates=True),
+    "character": BatchEntity(Character, CharacterCreate, CharacterUpdate, CharacterRead, ("characters",)),
+    "setting": BatchEntity(SettingElement, SettingElementCreate, SettingElementUpdate, SettingElementRead,
+                           ("settings",)),
+    "relationship": BatchEntity(CharacterRelationship, CharacterRelationshipCreate, CharacterRelationshipUpdate,
+                                CharacterRelationshipRead, ("relationships",),
+                                parents={"character1_id": Character, "character2_id": Character}),
+}
+
+
+@dataclass
+class _BatchState:
+    project_id: int
+    refs: Dict[str, int] = field(default_factory=dict)
+    rows: Dict[str, Dict[int, Any]] = field(default_factory=dict)  # 预加载的目标行
+    results: List[Tuple[str, str, int]] = field(default_factory=list)  # (op, entity, id)
+    deleted: List[Tuple[str, Any]] = field(default_factory=list)
+    embed: Dict[str, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    changed_scenes: Dict[int, Set[str]] = field(default_factory=lambda: defaultdict(set))  # 场景 id -> 修改的列
+    chapter_contents: Set[int] = field(default_factory=set)
+    rollup_chapters: Set[Optional[int]] = field(default_factory=set)
+    renumber: bool = False
+
+
+def _resolve(value: Any, state: _BatchState, index: int) -> Any:
+    if isinstance(value, str) and value.startswith("$"):
+        if value[1:] not in state.refs:
+            raise ValueError(f"Operation {index}: unknown reference '{value}'")
+        return state.refs[value[1:]]
+    return value
+
+
+def _preload(db: Session, operations: Sequence[BatchOperation], state: _BatchState) -> None:
+    """每种实体类型用一条查询加载 update/delete 的目标行（只限本项目）。"""
+    ids: Dict[str, Set[int]] = defaultdict(set)
+    for operation in operations:
+        if operation.op != "create" and isinstance(operation.id, int):
+            ids[operation.entity].add(operation.id)
+    for name, row_ids in ids.items():
+        model = ENTITIES[name].model
+        rows = db.query(model).filter(model.id.in_(row_ids), model.project_id == state.project_id).all()
+        state.rows[name] = {row.id: row for row in rows}
+
+
+def _target(db: Session, operation: BatchOperation, state: _BatchState, index: int):
+    if operation.id is None:
+        raise ValueError(f"Operation {index}: id is required for {operation.op}")
+    row_id = _resolve(operation.id, state, index)
+    row = state.rows.get(operation.entity, {}).get(row_id)
+    if row is None:
+        model = ENTITIES[operation.entity].model
+        row = db.get(model, row_id)  # 本批新建的行已在会话中
+        if row is None or row.project_id != state.project_id:
+            raise ValueError(f"Operation {index}: {operation.entity} {row_id} not found in this project")
+    return row
+
+
+def _validated(schema: Type[BaseModel], data: Dict[str, Any], index: int) -> BaseModel:
+    try:
+        return schema.model_validate(data)
+    except ValueError as e:
+        raise ValueError(f"Operation {index}: {e}")
+
+
+def _check_parents(db: Session, entity: BatchEntity, values: Dict[str, Any], state: _BatchState,
+                   index: int) -> None:
+    for column, model in entity.parents.items():
+        parent_id = values.get(column)
+        if parent_id is None:
+            continue
+        parent = db.get(model, parent_id)
+        if parent is None or parent.project_id != state.project_id:
+            raise ValueError(f"Operation {index}: {column} {parent_id} not found in this project")
+
+
+def _mark_changed(name: str, row: Any, columns: Set[str], state: _BatchState, created: bool) -> None:
+    entity = ENTITIES[name]
+    for target_name in entity.embedding_targets:
+        if created or columns & set(reindex_service.TARGETS_BY_NAME[target_name].source_columns):
+            state.embed[target_name].add(row.id)
+    if name == "chapter" and "content" in columns:
+        state.chapter_contents.add(row.id)
+    if name == "scene":
+        state.changed_scenes[row.id] |= columns
+        if created or columns & {"summary", "chapter_id", "order_in_chapter"}:
+            state.rollup_chapters.add(row.chapter_id)
+    if (entity.structural and created) or columns & ORDERING_COLUMNS:
+        state.renumber = True
+
+
+def _constraint_error(prefix: str, e: IntegrityError) -> ValueError:
+    constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None)  # psycopg2 提供约束名
+    return ValueError(f"{prefix} violates a database constraint" + (f": {constraint}" if constraint else ""))
+
+
+def _flush(db: Session, index: int, operation: BatchOperation) -> None:
+    try:
+        db.flush()
+    except IntegrityError as e:
+        raise _constraint_error(f"Operation {index} ({operation.op} {operation.entity})", e)
+
+
+def _apply(db: Session, index: int, operation: BatchOperation, state: _BatchState) -> None:
+    entity = ENTITIES[operation.entity]
+    data = {key: _resolve(value, state, index) for key, value in operation.data.items()}
+
+    if operation.op == "create":
+        data.setdefault("project_id", state.project_id)
+        if data["project_id"] != state.project_id:
+            raise ValueError(f"Operation {index}: project_id must be {state.project_id}")
+        values = _validated(entity.create_schema, data, index).model_dump(exclude_unset=True)
+        values["project_id"] = state.project_id
+        _check_parents(db, entity, values, state, index)
+        row = entity.model(**values)
+        db.add(row)
+        _flush(db, index, operation)
+        if operation.ref:
+            state.refs[operation.ref] = row.id
+        _mark_changed(operation.entity, row, set(values), state, created=True)
+        state.results.append((operation.op, operation.entity, row.id))
+        return
+
+    row = _target(db, operation, state, index)
+    if operation.op == "delete":
+        if operation.entity == "scene" and row.summary:
+            state.rollup_chapters.add(row.chapter_id)
+        db.delete(row)
+        state.renumber = state.renumber or entity.structural
+        state.deleted.append((operation.entity, row))
+        state.results.append((operation.op, operation.entity, row.id))
+        return
+
+    values = _validated(entity.update_schema, data, index).model_dump(exclude_unset=True)
+    if entity.skip_none_updates:
+        values = {key: value for key, value in values.items() if value is not None}
+    _check_parents(db, entity, values, state, index)
+    if operation.entity == "scene" and values.keys() & {"chapter_id", "order_in_chapter", "summary"}:
+        state.rollup_chapters.add(row.chapter_id)  # 原来所在的章节；新章节在 _mark_changed 中加入
+    changed = {key for key, value in values.items() if getattr(row, key) != value}
+    for key, value in values.items():
+        setattr(row, key, value)
+    _mark_changed(operation.entity, row, changed, state, created=False)
+    state.results.append((operation.op, operation.entity, row.id))
+
+
+async def _embed_scene_goals(db: Session, state: _BatchState) -> None:
+    """把本批修改过目标的场景合并成一次 embedding 请求；失败时向量留空，由重建任务补齐。"""
+    for target_name in INLINE_EMBEDDING_TARGETS:
+        row_ids = state.embed.pop(target_name, set())
+        target = reindex_service.TARGETS_BY_NAME[target_name]
+        rows = [row for row in (db.get(target.model, row_id) for row_id in sorted(row_ids)) if row is not None]
+        texts = {row.id: target.build_text(row) for row in rows}
+        to_embed = [row for row in rows if texts[row.id]]
+        try:
+            embeddings = await llm_service.get_embeddings([texts[row.id] for row in to_embed]) if to_embed else []
+        except Exception as e:
+            print(f"Batch embedding of {target_name} {[row.id for row in to_embed]} failed: {e}")
+            embeddings = [None] * len(to_embed)
+        vectors = {row.id: embedding for row, embedding in zip(to_embed, embeddings)}
+        for row in rows:
+            vector = vectors.get(row.id)
+            setattr(row, target.vector_attr, vector)
+            setattr(row, target.signature_attr,
+                    llm_service.embedding_signature(texts[row.id]) if vector is not None else None)
+
+
+async def _sync_scenes(db: Session, state: _BatchState) -> None:
+    """与 scene_service 一致：标题/目标/正文变化时补充提及的关联，正文变化时更新段落索引。"""
+    for scene_id, columns in state.changed_scenes.items():
+        scene = db.get(Scene, scene_id)
+        if scene is None:
+            continue
+        if columns & {"title", "goal", "generated_content"}:
+            mention_service.sync_scene_associations(db, scene)
+        if "generated_content" in columns:
+            try:
+                await passage_service.sync_scene_passages(db, scene)
+            except Exception as e:
+                print(f"Error indexing passages for scene {scene.id}: {e}")  # 段落索引失败不影响正文保存
+
+
+def _reload(db: Session, state: _BatchState) -> List[Dict[str, Any]]:
+    """每种实体类型用一条查询加载最终状态，按操作顺序返回。"""
+    ids: Dict[str, Set[int]] = defaultdict(set)
+    for op, name, row_id in state.results:
+        if op != "delete":
+            ids[name].add(row_id)
+    loaded: Dict[str, Dict[int, Any]] = {}
+    for name, row_ids in ids.items():
+        entity = ENTITIES[name]
+        flat = fieldsets.scalar_fields(entity.read_schema)
+        rows = db.query(entity.model) \
+            .options(*fieldsets.load_options(entity.model, flat)) \
+            .filter(entity.model.id.in_(row_ids)) \
+            .all()
+        loaded[name] = {row.id: dump_orm(row, entity.read_schema, flat) for row in rows}
+        # 名称表的增量维护（与各服务提交后的钩子相同），此时行已经重新加载，不会再逐行查询
+        for row in rows:
+            if name == "character":
+                mention_service.on_character_saved(db, row)
+            elif name == "setting":
+                mention_service.on_setting_saved(db, row)
+    return [{"op": op, "entity": name, "id": row_id,
+             "data": None if op == "delete" else loaded[name].get(row_id)}
+            for op, name, row_id in state.results]
+
+
+async def apply_batch(db: Session, project_id: int, operations: Sequence[BatchOperation]) -> List[Dict[str, Any]]:
+    """
+    在一个事务中按顺序执行 operations，返回每个操作的结果 {op, entity, id, data}。
+
+    任何操作失败时整批回滚并抛出 ValueError。
+    """
+    if len(operations) > settings.BATCH_MAX_OPERATIONS:
+        raise ValueError(f"A batch may contain at most {settings.BATCH_MAX_OPERATIONS} operations")
+    state = _BatchState(project_id=project_id)
+    try:
+        _preload(db, operations, state)
+        for index, operation in enumerate(operations):
+            _apply(db, index, operation, state)
+        db.flush()
+        await _sync_scenes(db, state)
+        await _embed_scene_goals(db, state)
+        if state.renumber:
+            position_service.renumber_project(db, project_id)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise _constraint_error("Batch", e)
+    except Exception:
+        db.rollback()
+        raise
+
+    results = _reload(db, state)
+    for target_name, row_ids in state.embed.items():
+        for row_id in row_ids:
+            embedding_worker.enqueue(target_name, row_id)
+    for chapter_id in state.chapter_contents:
+        embedding_worker.enqueue(embedding_worker.CHAPTER_CONTENT, chapter_id)
+    for name, row in state.deleted:
+        if name == "character":
+            mention_service.on_character_deleted(db, row)
+        elif name == "setting":
+            mention_service.on_setting_deleted(db, row)
+    for chapter_id in state.rollup_chapters:
+        summary_service.schedule_chapter_rollup(chapter_id)
+    print(f"Batch on project {project_id}: {len(operations)} operations committed.")
+    return results
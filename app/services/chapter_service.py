@@ -1,29 +1,32 @@
 # backend/app/services/chapter_service.py
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import asc  # 用于排序
-from typing import List, Optional
+from typing import Optional
 
 from app.models.structure import Chapter
 from app.schemas.chapter import ChapterCreate, ChapterUpdate
-from app.services.llm_service import get_embedding, prepare_text_for_embedding
+from app.services import position_service, embedding_worker
+from app.services.llm_service import prepare_text_for_embedding
+from app.utils import fieldsets, pagination
+
+
+def embedding_text(chapter: Chapter) -> str:
+    """章节用于 Embedding 的文本（重建任务也使用这个函数）"""
+    return prepare_text_for_embedding(chapter.summary)
 
 
 async def create_chapter(db: Session, chapter: ChapterCreate) -> Chapter:
-    """创建新章节并生成摘要的 Embedding"""
-    embedding_vector = None
-    if chapter.summary:  # 只有在提供了摘要时才生成 embedding
-        text_for_embedding = prepare_text_for_embedding(chapter.summary)
-        embedding_vector = await get_embedding(text_for_embedding)
-
-    db_chapter = Chapter(
-        **chapter.model_dump(),
-        embedding=embedding_vector  # 添加 embedding (可能为 None)
-    )
+    """创建新章节，摘要的 Embedding 由后台队列生成"""
+    db_chapter = Chapter(**chapter.model_dump())
     db.add(db_chapter)
     try:
+        position_service.renumber_project(db, db_chapter.project_id)
         db.commit()
         db.refresh(db_chapter)
+        if db_chapter.summary:  # 只有在提供了摘要时才生成 embedding (否则为 None)
+            embedding_worker.enqueue("chapters", db_chapter.id)
+        if db_chapter.content:
+            embedding_worker.enqueue(embedding_worker.CHAPTER_CONTENT, db_chapter.id)
         return db_chapter
     except IntegrityError as e:
         db.rollback()
@@ -44,25 +47,45 @@ def get_chapter(db: Session, chapter_id: int) -> Optional[Chapter]:
     ).filter(Chapter.id == chapter_id).first()
 
 
-def get_chapters_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[Chapter]:
-    """获取指定项目下的章节列表，按 'order' 排序，并预加载场景"""
-    return db.query(Chapter).options(
-        selectinload(Chapter.scenes)  # 预加载场景列表
-    ).filter(Chapter.project_id == project_id).order_by(
-        asc(Chapter.order)  # 按 order 字段升序排序
-    ).offset(skip).limit(limit).all()
+def _list_options(fields: Optional[fieldsets.FieldSet]) -> list:
+    if fields is not None:
+        return fieldsets.load_options(Chapter, fields)  # 只查询请求的列，scenes 只在请求时加载
+    return [selectinload(Chapter.scenes)]  # 预加载场景列表
 
-def get_chapters_by_volume(db: Session, volume_id: int, skip: int = 0, limit: int = 100) -> List[Chapter]:
-    """获取指定项目下的章节列表，按 'order' 排序，并预加载场景"""
-    return db.query(Chapter).options(
-        selectinload(Chapter.scenes)  # 预加载场景列表
-    ).filter(Chapter.volume_id == volume_id).order_by(
-        asc(Chapter.order)  # 按 order 字段升序排序
-    ).offset(skip).limit(limit).all()
+
+def get_chapters_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                            cursor: Optional[str] = None,
+                            fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """获取指定项目下的章节列表，按 ('order', id) 游标分页，并预加载场景"""
+    query = db.query(Chapter).options(
+        *_list_options(fields)
+    ).filter(Chapter.project_id == project_id)
+    return pagination.paginate(query, [Chapter.order, Chapter.id], limit, cursor, skip)
+
+def _with_scene_content(fields: Optional[fieldsets.FieldSet]) -> Optional[fieldsets.FieldSet]:
+    """
+    请求 content 时，加载用的 FieldSet 加上 scenes.generated_content：没有正文的章节由场景正文拼接，
+    避免逐章懒加载 scenes。只影响查询，响应仍按 fields 输出。
+    """
+    if fields is None or "content" not in fields or ("scenes" in fields and fields["scenes"] is None):
+        return fields
+    scenes = dict(fields.get("scenes") or {"id": None})
+    scenes["generated_content"] = None
+    return {**fields, "scenes": scenes}
+
+
+def get_chapters_by_volume(db: Session, volume_id: int, skip: int = 0, limit: int = 100,
+                           cursor: Optional[str] = None,
+                           fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """获取指定卷下的章节列表，按 ('order', id) 游标分页，并预加载场景（路由用场景正文补全 content）"""
+    query = db.query(Chapter).options(
+        *_list_options(_with_scene_content(fields))
+    ).filter(Chapter.volume_id == volume_id)
+    return pagination.paginate(query, [Chapter.order, Chapter.id], limit, cursor, skip)
 
 
 async def update_chapter(db: Session, db_chapter: Chapter, chapter_in: ChapterUpdate) -> Chapter:
-    """更新章节信息，如果摘要变化则重新生成 Embedding"""
+    """更新章节信息，如果摘要或正文变化则排队重新生成 Embedding"""
     update_data = chapter_in.model_dump(exclude_unset=True)
     needs_re_embedding = False
 
@@ -77,19 +100,21 @@ async def update_chapter(db: Session, db_chapter: Chapter, chapter_in: ChapterUp
     for key, value in update_data.items():
         setattr(db_chapter, key, value)
 
-    # 如果需要，重新生成并更新 embedding
-    if needs_re_embedding:
-        new_summary = db_chapter.summary  # 获取更新后的摘要
-        if new_summary:
-            text_for_embedding = prepare_text_for_embedding(new_summary)
-            db_chapter.embedding = await get_embedding(text_for_embedding)
-        else:
-            db_chapter.embedding = None  # 如果摘要被清空，则 embedding 也设为 None
+    if needs_re_embedding and not db_chapter.summary:
+        db_chapter.embedding = None  # 如果摘要被清空，则 embedding 也设为 None
+        db_chapter.embedding_signature = None
 
     db.add(db_chapter)
     try:
+        if "order" in update_data or "volume_id" in update_data:
+            position_service.renumber_project(db, db_chapter.project_id)
         db.commit()
         db.refresh(db_chapter)
+        # 摘要向量和正文段落索引由后台队列更新（段落索引只对改动过的段落重新 embedding）
+        if needs_re_embedding and db_chapter.summary:
+            embedding_worker.enqueue("chapters", db_chapter.id)
+        if "content" in update_data:
+            embedding_worker.enqueue(embedding_worker.CHAPTER_CONTENT, db_chapter.id)
         # 需要重新加载 scenes 关系，因为 refresh 不会加载它们
         db.refresh(db_chapter, attribute_names=['scenes'])  # Pydantic 需要这个
         # 或者重新查询一次: db_chapter = get_chapter(db, db_chapter.id)
@@ -113,5 +138,6 @@ def delete_chapter(db: Session, chapter_id: int) -> Optional[Chapter]:
         pass  # get_chapter 已经加载了
 
         db.delete(db_chapter)
+        position_service.renumber_project(db, db_chapter.project_id)
         db.commit()
     return db_chapter
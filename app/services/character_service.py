@@ -1,32 +1,34 @@
 # backend/app/service/character_service.py
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import Optional
 
 from app.models.character import Character
 from app.schemas.character import CharacterCreate, CharacterUpdate
-from app.services.llm_service import get_embedding, prepare_text_for_embedding # 导入 Embedding 服务
+from app.services.llm_service import prepare_text_for_embedding
+from app.services import mention_service, embedding_worker
+from app.utils import fieldsets, pagination
 
-async def create_character(db: Session, character: CharacterCreate) -> Character:
-    """创建新角色并生成 Embedding"""
-    # 准备用于 Embedding 的文本
-    text_for_embedding = prepare_text_for_embedding(
+def embedding_text(character: Character) -> str:
+    """角色用于 Embedding 的文本（重建任务也使用这个函数）"""
+    return prepare_text_for_embedding(
         character.name,
         character.description,
         character.backstory,
         character.goals,
         character.arc_summary
     )
-    embedding_vector = await get_embedding(text_for_embedding)
 
-    db_character = Character(
-        **character.model_dump(),
-        embedding=embedding_vector # 添加 embedding
-    )
+
+async def create_character(db: Session, character: CharacterCreate) -> Character:
+    """创建新角色，Embedding 由后台队列生成"""
+    db_character = Character(**character.model_dump())
     db.add(db_character)
     try:
         db.commit()
         db.refresh(db_character)
+        embedding_worker.enqueue("characters", db_character.id)
+        mention_service.on_character_saved(db, db_character)
         return db_character
     except IntegrityError as e:
         db.rollback() # 回滚事务
@@ -43,12 +45,17 @@ def get_character(db: Session, character_id: int) -> Optional[Character]:
     """通过 ID 获取角色"""
     return db.query(Character).filter(Character.id == character_id).first()
 
-def get_characters_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[Character]:
-    """获取指定项目下的角色列表（分页）"""
-    return db.query(Character).filter(Character.project_id == project_id).offset(skip).limit(limit).all()
+def get_characters_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                              cursor: Optional[str] = None,
+                              fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """获取指定项目下的角色列表（按 id 游标分页），fields 不为空时只查询其中的列"""
+    query = db.query(Character).filter(Character.project_id == project_id)
+    if fields is not None:
+        query = query.options(*fieldsets.load_options(Character, fields))
+    return pagination.paginate(query, [Character.id], limit, cursor, skip)
 
 async def update_character(db: Session, db_character: Character, character_in: CharacterUpdate) -> Character:
-    """更新角色信息，如果相关字段变化则重新生成 Embedding"""
+    """更新角色信息，如果相关字段变化则排队重新生成 Embedding"""
     update_data = character_in.model_dump(exclude_unset=True)
     needs_re_embedding = False
     current_data = {}
@@ -69,21 +76,14 @@ async def update_character(db: Session, db_character: Character, character_in: C
     for key, value in update_data.items():
         setattr(db_character, key, value)
 
-    # 如果需要，重新生成并更新 embedding
-    if needs_re_embedding:
-        text_for_embedding = prepare_text_for_embedding(
-            update_data.get("name", current_data.get("name")), # 使用更新后的值（如果存在）
-            update_data.get("description", current_data.get("description")),
-            update_data.get("backstory", current_data.get("backstory")),
-            update_data.get("goals", current_data.get("goals")),
-            update_data.get("arc_summary", current_data.get("arc_summary"))
-        )
-        db_character.embedding = await get_embedding(text_for_embedding)
-
     db.add(db_character)
     try:
         db.commit()
         db.refresh(db_character)
+        # 如果需要，由后台队列重新生成 embedding（写回前继续使用旧向量）
+        if needs_re_embedding:
+            embedding_worker.enqueue("characters", db_character.id)
+        mention_service.on_character_saved(db, db_character)
         return db_character
     except IntegrityError:
         db.rollback()
@@ -100,4 +100,5 @@ def delete_character(db: Session, character_id: int) -> Optional[Character]:
     if db_character:
         db.delete(db_character)
         db.commit()
+        mention_service.on_character_deleted(db, db_character)
     return db_character
\ No newline at end of file
@@ -0,0 +1,133 @@
+# backend/app/services/embedding_worker.py
+"""
+后写（write-behind）embedding。
+
+角色、设定、人物关系、章节和卷保存时不再等待 embedding 接口：服务层先提交数据，
+把行标记为待更新（新建的行向量为 NULL；修改的行保留旧向量，签名与新文本不一致），
+再调用 enqueue()。worker 等待 EMBED_WRITE_BEHIND_DELAY_SECONDS 秒收集同一时间段的保存，
+然后按目标分组批量计算向量并写回。保存接口的耗时因此只取决于数据库。
+章节正文的段落索引同样通过 CHAPTER_CONTENT 排队，由 passage_service 增量同步。
+
+待更新的行在检索时仍然可用：
+- 修改过的行在新向量写回前继续用旧向量参与向量检索；
+- 新建的行暂时只参与词法检索和名称点名，不会出现在向量召回中。
+
+worker 只在内存中排队。进程退出或 embedding 失败时未处理的行签名仍是过期的，
+会被向量重建任务（reindex_service）补齐。
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.structure import Chapter
+from app.services import passage_service
+
+CHAPTER_CONTENT = "chapter_content"  # 章节正文段落索引（不是 reindex_service 的目标）
+
+
+class EmbeddingWorker:
+    """
+    按目标分组的防抖批处理队列，结构与 summary_service.RollupScheduler 相同。
+
+    enqueue() 可以在任意线程调用（同步路由运行在线程池中），实际调度总是回到事件循环线程。
+    """
+
+    def __init__(self, delay_seconds: float, max_batch: int):
+        self.delay_seconds = delay_seconds
+        self.max_batch = max(max_batch, 1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, Set[int]] = defaultdict(set)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Optional[asyncio.Task] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    async def stop(self) -> None:
+        """
+        应用关闭时调用：取消计时器和正在执行的批次，之后的 enqueue() 不再调度。
+
+        未处理的行签名仍是过期的，由 reindex_service 补齐。
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            print(f"Embedding worker stopped, {self.pending_count()} rows left for reindex.")
+            self._pending = defaultdict(set)
+        running, self._running = self._running, None
+        if running is not None and not running.done():
+            running.cancel()
+            await asyncio.gather(running, return_exceptions=True)
+        self._loop = None
+
+    def enqueue(self, target_name: str, row_id: Optional[int]) -> None:
+        if row_id is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and (self._loop is None or loop is self._loop):
+            self._loop = loop
+            self._enqueue(target_name, row_id)
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(self._enqueue, target_name, row_id)
+        else:
+            print(f"Embedding worker not started, {target_name} {row_id} left for reindex.")
+
+    def pending_count(self) -> int:
+        return sum(len(row_ids) for row_ids in self._pending.values())
+
+    def _enqueue(self, target_name: str, row_id: int) -> None:
+        self._pending[target_name].add(row_id)
+        if self._timer is not None:
+            if self.pending_count() < self.max_batch:
+                return  # 与已在计时的这一批一起处理，不推迟
+            self._timer.cancel()
+            self._timer = None
+        delay = 0 if self.pending_count() >= self.max_batch else self.delay_seconds
+        self._timer = self._loop.call_later(delay, self._flush)
+
+    def _flush(self) -> None:
+        self._timer = None
+        if self._running is not None and not self._running.done():
+            # 上一批还没处理完，等它结束后再处理新积累的行
+            self._timer = self._loop.call_later(self.delay_seconds, self._flush)
+            return
+        pending, self._pending = self._pending, defaultdict(set)
+        if pending:
+            self._running = self._loop.create_task(self._run(dict(pending)))
+
+    @staticmethod
+    async def _run(pending: Dict[str, Set[int]]) -> None:
+        # reindex_service 依赖各实体服务的 embedding_text，而实体服务又依赖本模块，这里延迟导入避免循环
+        from app.services import reindex_service
+
+        db = SessionLocal()
+        try:
+            for target_name, row_ids in pending.items():
+                try:
+                    if target_name == CHAPTER_CONTENT:
+                        for chapter in db.query(Chapter).filter(Chapter.id.in_(list(row_ids))).all():
+                            await passage_service.sync_chapter_passages(db, chapter)
+                            db.commit()
+                        continue
+                    updated = await reindex_service.embed_rows(db, target_name, sorted(row_ids))
+                    print(f"Write-behind embedded {updated} of {len(row_ids)} {target_name}.")
+                except Exception as e:
+                    db.rollback()
+                    print(f"Write-behind embedding of {target_name} {sorted(row_ids)} failed: {e}")
+        finally:
+            db.close()
+
+
+embedding_worker = EmbeddingWorker(delay_seconds=settings.EMBED_WRITE_BEHIND_DELAY_SECONDS,
+                                   max_batch=settings.EMBED_WRITE_BEHIND_MAX_BATCH)
+
+
+def enqueue(target_name: str, row_id: Optional[int]) -> None:
+    """标记一行的向量需要（重新）计算，目标名称见 reindex_service.TARGETS。"""
+    embedding_worker.enqueue(target_name, row_id)
@@ -0,0 +1,262 @@
+# backend/app/services/export_service.py
+"""
+全书导出：按叙事顺序（卷 -> 章节 -> 场景）流式输出 TXT / Markdown / EPUB。
+
+- 一条查询：卷 LEFT JOIN 章节 LEFT JOIN 场景，只取标题和正文列（不读取向量），
+  用服务端游标（yield_per）分批读取，边读边写，内存占用与全书长度无关；
+- 章节有 content 时使用 content，否则按顺序拼接各场景的 generated_content（场景之间空一行），
+  有 content 的章节不会 JOIN 出场景行；
+- TXT / Markdown 输出攒够 EXPORT_CHUNK_BYTES 字节发送一块；
+- EPUB 是 zip：每个卷/章节一个 XHTML 条目，条目写完（zipfile 回写本地头部的长度和 CRC）后立即发送，
+  内存中最多保留一个章节的压缩数据；目录（nav.xhtml、content.opf）只记录标题，放在最后写入。
+"""
+import io
+import re
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Iterable, Iterator, List, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import Project, Scene
+from app.models.structure import Chapter, Volume
+
+ROWS_PER_FETCH = 100  # 每行可能带一整章正文，比快照的批次小
+LANGUAGE = "zh"
+
+# (媒体类型, 扩展名)
+FORMATS = {
+    "txt": ("text/plain; charset=utf-8", "txt"),
+    "md": ("text/markdown; charset=utf-8", "md"),
+    "epub": ("application/epub+zip", "epub"),
+}
+
+VOLUME, CHAPTER, TEXT = "volume", "chapter", "text"
+Event = Tuple[str, str]
+
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _manuscript(db: Session, project_id: int) -> Iterator[Event]:
+    """按叙事顺序产生 (VOLUME, 卷标题) / (CHAPTER, 章节标题) / (TEXT, 章节正文或一个场景的正文)。"""
+    rows = db.query(Volume.id.label("volume_id"), Volume.title.label("volume_title"),
+                    Chapter.id.label("chapter_id"), Chapter.title.label("chapter_title"),
+                    Chapter.content.label("chapter_content"), Scene.generated_content.label("scene_content")) \
+        .outerjoin(Chapter, Chapter.volume_id == Volume.id) \
+        .outerjoin(Scene, and_(Scene.chapter_id == Chapter.id, Chapter.content == None)) \
+        .filter(Volume.project_id == project_id) \
+        .order_by(Volume.order, Volume.id, Chapter.order, Chapter.id, Scene.order_in_chapter, Scene.id) \
+        .yield_per(ROWS_PER_FETCH)
+    for (_, volume_title), volume_rows in groupby(rows, key=lambda row: (row.volume_id, row.volume_title)):
+        yield VOLUME, volume_title
+        for (chapter_id, chapter_title), chapter_rows in groupby(
+                volume_rows, key=lambda row: (row.chapter_id, row.chapter_title)):
+            if chapter_id is None:
+                continue  # 空卷
+            yield CHAPTER, chapter_title
+            for row in chapter_rows:
+                text = row.chapter_content if row.chapter_content is not None else row.scene_content
+                if text and text.strip():
+                    yield TEXT, text.strip("\n")
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+# --- TXT / Markdown ---
+
+def _txt(project: Project, events: Iterable[Event]) -> Iterator[str]:
+    yield f"{project.title}\n\n"
+    for _, value in events:
+        yield f"{value}\n\n"
+
+
+def _markdown(project: Project, events: Iterable[Event]) -> Iterator[str]:
+    yield f"# {project.title}\n\n"
+    for kind, value in events:
+        if kind == VOLUME:
+            yield f"## {value}\n\n"
+        elif kind == CHAPTER:
+            yield f"### {value}\n\n"
+        else:
+            # 中文书稿通常一行一段，Markdown 里单个换行不分段
+            yield "".join(f"{paragraph}\n\n" for paragraph in _paragraphs(value))
+
+
+def _encode_chunks(pieces: Iterable[str]) -> Iterator[bytes]:
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece.encode("utf-8")
+        if len(buffer) >= settings.EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+# --- EPUB ---
+
+class _ZipSink(io.RawIOBase):
+    """
+    zipfile 的输出目标：看起来可以 seek，实际只保留还没发送的字节。
+
+    zipfile 写完一个条目后会 seek 回该条目的本地头部补写长度和 CRC，再回到末尾；
+    因此只要在条目之间调用 take()，回写的位置总在缓冲区内。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = io.BytesIO()
+        self._sent = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self._buffer.write(data)
+
+    def tell(self) -> int:
+        return self._sent + self._buffer.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence != io.SEEK_SET or offset < self._sent:
+            raise OSError("Cannot seek into data that has already been sent")
+        return self._sent + self._buffer.seek(offset - self._sent)
+
+    def take(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._sent += len(data)
+        self._buffer = io.BytesIO()
+        return data
+
+
+def _xml_text(value: str) -> str:
+    return escape(_XML_INVALID.sub("", value))
+
+
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+def _xhtml_head(title: str) -> str:
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'lang="{LANGUAGE}" xml:lang="{LANGUAGE}">\n<head><title>{_xml_text(title)}</title></head>\n<body>\n')
+
+
+def _nav_xhtml(project: Project, toc: List[Tuple[str, str, str]]) -> str:
+    """卷作为一级目录，章节嵌套在所属的卷下。"""
+    volumes: List[Tuple[str, str, List[Tuple[str, str]]]] = []
+    for href, title, kind in toc:
+        if kind == VOLUME:
+            volumes.append((href, title, []))
+        else:
+            volumes[-1][2].append((href, title))  # 事件总是以卷开始
+    items = []
+    for href, title, chapters in volumes:
+        nested = "".join(f'<li><a href="{chapter_href}">{_xml_text(chapter_title)}</a></li>\n'
+                         for chapter_href, chapter_title in chapters)
+        items.append(f'<li><a href="{href}">{_xml_text(title)}</a>' + (f"\n<ol>\n{nested}</ol>" if nested else "")
+                     + "</li>\n")
+    if not items:  # 空书：目录至少要有一项
+        items.append(f'<li><a href="nav.xhtml">{_xml_text(project.title)}</a></li>\n')
+    return (_xhtml_head(project.title) + '<nav epub:type="toc" id="toc">\n'
+            f"<h1>{_xml_text(project.title)}</h1>\n<ol>\n{''.join(items)}</ol>\n</nav>\n</body>\n</html>\n")
+
+
+def _content_opf(project: Project, toc: List[Tuple[str, str, str]]) -> str:
+    modified = (project.updated_at or project.created_at or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    identifier = uuid.uuid5(uuid.NAMESPACE_URL, f"novel-project:{project.id}")
+    description = f"<dc:description>{_xml_text(project.logline)}</dc:description>\n" if project.logline else ""
+    manifest = "".join(f'<item id="item-{index}" href="{href}" media-type="application/xhtml+xml"/>\n'
+                       for index, (href, _, _) in enumerate(toc))
+    spine = "".join(f'<itemref idref="item-{index}"/>\n' for index in range(len(toc))) \
+        or '<itemref idref="nav"/>\n'  # spine 不能为空
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="book-id">urn:uuid:{identifier}</dc:identifier>\n'
+            f"<dc:title>{_xml_text(project.title)}</dc:title>\n"
+            f"<dc:language>{LANGUAGE}</dc:language>\n{description}"
+            f'<meta property="dcterms:modified">{modified.strftime("%Y-%m-%dT%H:%M:%SZ")}</meta>\n'
+            "</metadata>\n<manifest>\n"
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            f"{manifest}</manifest>\n<spine>\n{spine}</spine>\n</package>\n")
+
+
+def _epub(project: Project, events: Iterable[Event]) -> Iterator[bytes]:
+    sink = _ZipSink()
+    book = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    # mimetype 必须是第一个条目且不压缩
+    book.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+    book.writestr("META-INF/container.xml", CONTAINER_XML)
+    yield sink.take()
+
+    toc: List[Tuple[str, str, str]] = []  # (href, 标题, VOLUME / CHAPTER)
+    entry = None
+    for kind, value in events:
+        if kind == TEXT:
+            entry.write("".join(f"<p>{_xml_text(paragraph)}</p>\n" for paragraph in _paragraphs(value))
+                        .encode("utf-8"))
+            continue
+        if entry is not None:
+            entry.write(b"</body>\n</html>\n")
+            entry.close()
+            yield sink.take()
+        href = f"text/{len(toc):05d}.xhtml"
+        toc.append((href, value, kind))
+        entry = book.open(f"OEBPS/{href}", "w")
+        heading = "h1" if kind == VOLUME else "h2"
+        entry.write(f"{_xhtml_head(value)}<{heading}>{_xml_text(value)}</{heading}>\n".encode("utf-8"))
+    if entry is not None:
+        entry.write(b"</body>\n</html>\n")
+        entry.close()
+
+    book.writestr("OEBPS/nav.xhtml", _nav_xhtml(project, toc))
+    book.writestr("OEBPS/content.opf", _content_opf(project, toc))
+    book.close()
+    yield sink.take()
+
+
+def content_disposition(project: Project, format: str) -> str:
+    extension = FORMATS[format][1]
+    return f"attachment; filename=\"project-{project.id}.{extension}\"; " \
+           f"filename*=UTF-8''{quote(project.title, safe='')}.{extension}"
+
+
+def stream_export(project_id: int, format: str) -> Iterator[bytes]:
+    """
+    按 format（txt / md / epub）输出全书的字节分块。
+
+    与 snapshot_service.stream_snapshot 一样使用自己的 REPEATABLE READ 会话，读完或客户端断开时关闭。
+    """
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if project is None:
+            return  # 路由检查之后项目被删除了
+        events = _manuscript(db, project_id)
+        if format == "epub":
+            yield from _epub(project, events)
+        else:
+            yield from _encode_chunks((_markdown if format == "md" else _txt)(project, events))
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,488 @@
+# backend/app/services/import_service.py
+"""
+批量导入已有书稿和世界观设定。
+
+输入统一成一串记录（dict，type 为 volume / chapter / scene / character / setting / relationship）：
+- JSON Lines：每行一条记录；{"type": "manuscript", "text": "..."} 表示一段纯文本书稿，按下面的规则切分；
+- 纯文本书稿：按行切分，"第X卷" / "Volume 1" / "# 标题" 开始新卷，"第X章" / "Chapter 1" / "## 标题" 开始新章，
+  "***"、"---"、"◇◇◇" 之类的分隔行切分场景；第一个章节标题之前的正文归入 "序" 章。
+chapter 属于它之前最近的 volume（没有时自动建一个 "正文" 卷），scene 属于它之前最近的 chapter；
+relationship 用 character1 / character2 的名字引用角色（项目中已有的或本次导入的）。
+
+写入分两个阶段：
+1. import_records()：预先从序列取 id，用 COPY 一次写入每张表，重排叙事位置、按名称补充场景与角色/设定的关联，
+   整个导入一次提交。同名的角色/设定/关系跳过并在结果中说明，同名的卷/章节自动加序号；
+2. embed_imported()：场景正文跨场景切块后并发批量 embedding 并 COPY 进 scene_passages，
+   其余向量（角色、设定、关系、卷/章摘要、场景目标/概要）交给 reindex_service.run_reindex 批量补齐。
+   中断后可以用 app/scripts/reindex.py 补齐第二阶段。
+"""
+import asyncio
+import codecs
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import (Character, CharacterRelationship, Project, Scene, SettingElement,
+                        scene_character_association, scene_setting_association)
+from app.models.structure import Chapter, SceneStatus, Volume
+from app.services import llm_service, mention_service, passage_service, position_service, reindex_service
+
+FORMATS = ("jsonl", "text")
+DEFAULT_VOLUME_TITLE = "正文"
+PREFACE_TITLE = "序"
+MAX_HEADING_CHARS = 50  # 超过这个长度的行不当作标题
+
+_NUMERAL = r"[0-9零〇一二两三四五六七八九十百千]+"
+VOLUME_HEADING = re.compile(rf"^(?:#\s+.+|第{_NUMERAL}[卷部集](?:[\s:：].*)?|(?:volume|book|part)\s+[0-9ivxlc]+\b.*)$",
+                            re.IGNORECASE)
+CHAPTER_HEADING = re.compile(rf"^(?:##\s+.+|第{_NUMERAL}[章回](?:.*)?|chapter\s+[0-9ivxlc]+\b.*|序章|楔子|尾声|后记)$",
+                             re.IGNORECASE)
+SCENE_BREAK = re.compile(r"^(?:[*＊※◇◆○●#~\-—=·]\s*){3,}$")
+
+RECORD_FIELDS = {
+    "volume": ("title", "summary"),
+    "chapter": ("title", "summary"),
+    "scene": ("title", "goal", "summary", "generated_content", "status"),
+    "character": ("name", "description", "backstory", "goals", "arc_summary", "current_status"),
+    "setting": ("name", "element_type", "description"),
+    "relationship": ("character1", "character2", "relationship_type", "description"),
+}
+# 导入的场景只能处于编辑状态；GENERATING / GENERATION_FAILED 只由生成流程写入，导入后会卡在该状态
+IMPORT_SCENE_STATUSES = (SceneStatus.PLANNED.name, SceneStatus.DRAFTED.name, SceneStatus.REVISING.name,
+                         SceneStatus.COMPLETED.name)
+REQUIRED_FIELDS = {
+    "volume": ("title",),
+    "chapter": ("title",),
+    "character": ("name",),
+    "setting": ("name", "element_type"),
+    "relationship": ("character1", "character2", "relationship_type"),
+}
+PASSAGE_TARGETS = ("scene_passages", "chapter_passages")  # 由段落同步生成，不走 run_reindex
+
+
+# --- 解析 ---
+
+def _heading_title(line: str) -> str:
+    return line.lstrip("#").strip()
+
+
+class ManuscriptSplitter:
+    """逐行切分纯文本书稿，产生 volume / chapter / scene 记录。"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+        self.chapter_open = False
+        self._lines: List[str] = []
+
+    def feed(self, line: str) -> None:
+        stripped = line.strip()
+        if stripped and len(stripped) <= MAX_HEADING_CHARS:
+            if VOLUME_HEADING.match(stripped):
+                self.end_scene()
+                self.records.append(_normalize({"type": "volume", "title": _heading_title(stripped)}, stripped))
+                self.chapter_open = False
+                return
+            if CHAPTER_HEADING.match(stripped):
+                self.end_scene()
+                self.records.append(_normalize({"type": "chapter", "title": _heading_title(stripped)}, stripped))
+                self.chapter_open = True
+                return
+            if SCENE_BREAK.match(stripped):
+                self.end_scene()
+                return
+        self._lines.append(line.rstrip("\r\n"))
+
+    def end_scene(self) -> None:
+        content = "\n".join(self._lines).strip("\n")
+        self._lines = []
+        if not content.strip():
+            return
+        if not self.chapter_open:
+            self.records.append(_normalize({"type": "chapter", "title": PREFACE_TITLE}, PREFACE_TITLE))
+            self.chapter_open = True
+        self.records.append(_normalize({"type": "scene", "generated_content": content}, "manuscript"))
+
+
+class ImportParser:
+    """把 JSON Lines 或纯文本逐行解析成记录。格式错误时抛出 ValueError（带行号）。"""
+
+    def __init__(self, format: str):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown import format '{format}'. Available formats: {', '.join(FORMATS)}")
+        self.format = format
+        self.records: List[Dict[str, Any]] = []
+        self._splitter = ManuscriptSplitter(self.records)
+        self._line_number = 0
+
+    def feed(self, line: str) -> None:
+        self._line_number += 1
+        if self.format == "text":
+            self._splitter.feed(line)
+            return
+        if not line.strip():
+            return
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Line {self._line_number}: invalid JSON ({e})")
+        self.feed_record(record, f"Line {self._line_number}")
+
+    def feed_record(self, record: Any, where: str) -> None:
+        """加入一条结构化记录（JSON Lines 的一行，或 CLI 读入的世界观文件中的一项）。"""
+        if not isinstance(record, dict):
+            raise ValueError(f"{where}: expected a JSON object")
+        record_type = record.get("type")
+        if record_type == "manuscript":
+            if not isinstance(record.get("text"), str):
+                raise ValueError(f"{where}: manuscript records need a 'text' string")
+            for line in record["text"].splitlines():
+                self._splitter.feed(line)
+            self._splitter.end_scene()
+            return
+        self._splitter.end_scene()
+        self.records.append(_normalize(record, where))
+        if record_type == "chapter":
+            self._splitter.chapter_open = True
+        elif record_type == "volume":
+            self._splitter.chapter_open = False
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._splitter.end_scene()
+        return self.records
+
+
+def _normalize(record: Dict[str, Any], where: str) -> Dict[str, Any]:
+    record_type = record.get("type")
+    if record_type not in RECORD_FIELDS:
+        raise ValueError(f"{where}: unknown record type '{record_type}'. "
+                         f"Available types: manuscript, {', '.join(RECORD_FIELDS)}")
+    if record_type == "scene" and "content" in record and "generated_content" not in record:
+        record = {**record, "generated_content": record["content"]}
+    normalized = {"type": record_type}
+    for name in RECORD_FIELDS[record_type]:
+        value = record.get(name)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{where}: '{name}' must be a string")
+        normalized[name] = value.strip() if isinstance(value, str) and name != "generated_content" else value
+    missing = [name for name in REQUIRED_FIELDS.get(record_type, ()) if not normalized[name]]
+    if missing:
+        raise ValueError(f"{where}: {record_type} records need {', '.join(missing)}")
+    if record_type == "scene" and normalized["status"] is not None \
+            and normalized["status"] not in IMPORT_SCENE_STATUSES:
+        raise ValueError(f"{where}: scene status must be one of {', '.join(IMPORT_SCENE_STATUSES)}, "
+                         f"got '{normalized['status']}'")
+    return normalized
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """把 UTF-8 字节流（如请求体）按行解码，不需要先读完整个请求。"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+# --- 写入 ---
+
+@dataclass
+class ImportOutcome:
+    counts: Dict[str, int]
+    skipped: List[str]
+    scene_ids: List[int] = field(default_factory=list)  # 有正文的新场景，用于第二阶段的段落索引
+    rollup_chapter_ids: List[int] = field(default_factory=list)  # 导入了场景概要、需要重算滚动摘要的章节
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, list):  # 向量
+        return "[" + ",".join(str(component) for component in value) + "]"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(db: Session, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """用 COPY FROM STDIN（文本格式）把 rows 写入 table，在会话当前的事务中执行。"""
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    cursor = db.connection().connection.cursor()  # psycopg2 连接
+    try:
+        cursor.copy_expert(f"COPY {table} ({quoted}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+    return count
+
+
+def _reserve_ids(db: Session, table: str, count: int) -> List[int]:
+    if not count:
+        return []
+    return list(db.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {"table": table, "count": count},
+    ).scalars())
+
+
+def _unique_title(title: str, taken: set) -> str:
+    candidate, suffix = title, 2
+    while candidate in taken:
+        candidate, suffix = f"{title} ({suffix})", suffix + 1
+    taken.add(candidate)
+    return candidate
+
+
+class _ImportPlan:
+    """把记录整理成各表的行（此时还没有 id），并处理重名。"""
+
+    def __init__(self, db: Session, project_id: int):
+        self.project_id = project_id
+        self.skipped: List[str] = []
+        self.volumes: List[Dict[str, Any]] = []
+        self.chapters: List[Dict[str, Any]] = []
+        self.scenes: List[Dict[str, Any]] = []
+        self.characters: List[Dict[str, Any]] = []
+        self.settings: List[Dict[str, Any]] = []
+        self.relationships: List[Dict[str, Any]] = []
+        self._volume_titles = {title for title, in db.query(Volume.title).filter(Volume.project_id == project_id)}
+        self._chapter_titles = {title for title, in db.query(Chapter.title).filter(Chapter.project_id == project_id)}
+        self._next_volume_order = db.query(func.coalesce(func.max(Volume.order) + 1, 0)) \
+            .filter(Volume.project_id == project_id).scalar()
+        self._character_ids: Dict[str, Any] = dict(db.query(Character.name, Character.id)
+                                                   .filter(Character.project_id == project_id).all())
+        self._setting_keys = set(db.query(SettingElement.name, SettingElement.element_type)
+                                 .filter(SettingElement.project_id == project_id).all())
+        self._relationship_keys = set(db.query(CharacterRelationship.character1_id,
+                                               CharacterRelationship.character2_id,
+                                               CharacterRelationship.relationship_type)
+                                      .filter(CharacterRelationship.project_id == project_id).all())
+        self._volume: Optional[Dict[str, Any]] = None
+        self._chapter: Optional[Dict[str, Any]] = None
+        self._pending_relationships: List[Dict[str, Any]] = []
+
+    def add(self, record: Dict[str, Any]) -> None:
+        getattr(self, f"_add_{record['type']}")(record)
+
+    def _add_volume(self, record):
+        self._volume = {"title": _unique_title(record["title"], self._volume_titles), "summary": record["summary"],
+                        "order": self._next_volume_order, "chapters": 0}
+        self._next_volume_order += 1
+        self._chapter = None
+        self.volumes.append(self._volume)
+
+    def _add_chapter(self, record):
+        if self._volume is None:
+            self._add_volume({"title": DEFAULT_VOLUME_TITLE, "summary": None})
+        self._chapter = {"title": _unique_title(record["title"], self._chapter_titles), "summary": record["summary"],
+                         "volume": self._volume, "order": self._volume["chapters"], "scenes": 0}
+        self._volume["chapters"] += 1
+        self.chapters.append(self._chapter)
+
+    def _add_scene(self, record):
+        status = record["status"] or (SceneStatus.DRAFTED.name if record["generated_content"]
+                                      else SceneStatus.PLANNED.name)
+        scene = {**{name: record[name] for name in RECORD_FIELDS["scene"]}, "status": status,
+                 "chapter": self._chapter, "order_in_chapter": 0}
+        if self._chapter is not None:
+            scene["order_in_chapter"] = self._chapter["scenes"]
+            self._chapter["scenes"] += 1
+        self.scenes.append(scene)
+
+    def _add_character(self, record):
+        if record["name"] in self._character_ids:
+            self.skipped.append(f"character '{record['name']}' already exists")
+            return
+        character = {name: record[name] for name in RECORD_FIELDS["character"]}
+        self._character_ids[record["name"]] = character  # 写入前用行本身占位，id 分配后再解析
+        self.characters.append(character)
+
+    def _add_setting(self, record):
+        key = (record["name"], record["element_type"])
+        if key in self._setting_keys:
+            self.skipped.append(f"setting '{record['name']}' ({record['element_type']}) already exists")
+            return
+        self._setting_keys.add(key)
+        self.settings.append({name: record[name] for name in RECORD_FIELDS["setting"]})
+
+    def _add_relationship(self, record):
+        self._pending_relationships.append(record)  # 角色可能在后面才出现
+
+    def resolve_relationships(self) -> None:
+        """角色 id 分配之后，按名字解析人物关系。"""
+        for record in self._pending_relationships:
+            first, second = self._character_ids.get(record["character1"]), self._character_ids.get(
+                record["character2"])
+            label = f"relationship '{record['character1']}' - '{record['character2']}'"
+            if first is None or second is None:
+                self.skipped.append(f"{label}: unknown character")
+                continue
+            first_id = first["id"] if isinstance(first, dict) else first
+            second_id = second["id"] if isinstance(second, dict) else second
+            key = (first_id, second_id, record["relationship_type"])
+            if first_id == second_id or key in self._relationship_keys:
+                self.skipped.append(f"{label} ({record['relationship_type']}): duplicate or self relationship")
+                continue
+            self._relationship_keys.add(key)
+            self.relationships.append({"character1_id": first_id, "character2_id": second_id,
+                                       "relationship_type": record["relationship_type"],
+                                       "description": record["description"]})
+
+
+def _copy_associations(db: Session, project_id: int, scenes: List[Dict[str, Any]]) -> None:
+    """按场景标题/目标/正文中出现的角色、设定名称补充关联（与 mention_service.sync_scene_associations 相同的规则）。"""
+    character_links, setting_links = [], []
+    mention_texts = ("\n".join(filter(None, [scene["title"], scene["goal"], scene["generated_content"]]))
+                     for scene in scenes)
+    for scene, (character_ids, setting_ids) in zip(
+            scenes, mention_service.detect_mentions_many(db, project_id, mention_texts)):
+        character_links.extend((scene["id"], character_id) for character_id in character_ids)
+        setting_links.extend((scene["id"], setting_id) for setting_id in setting_ids)
+    copy_rows(db, scene_character_association.name, ("scene_id", "character_id"), character_links)
+    copy_rows(db, scene_setting_association.name, ("scene_id", "setting_element_id"), setting_links)
+
+
+def import_records(db: Session, project_id: int, records: Sequence[Dict[str, Any]]) -> ImportOutcome:
+    """
+    把解析好的记录写入项目，一次提交。向量留空，由 embed_imported() 补齐。
+
+    滚动摘要不在这里调度：路由交给 summary_service.schedule_chapter_rollup，命令行脚本直接等待 rollup_chapters。
+    """
+    plan = _ImportPlan(db, project_id)
+    for record in records:
+        plan.add(record)
+
+    try:
+        for rows, table in ((plan.volumes, "volumes"), (plan.chapters, "chapters"), (plan.scenes, "scenes"),
+                            (plan.characters, "characters"), (plan.settings, "setting_elements")):
+            for row, row_id in zip(rows, _reserve_ids(db, table, len(rows))):
+                row["id"] = row_id
+        plan.resolve_relationships()
+
+        copy_rows(db, "volumes", ("id", "project_id", "title", "summary", "order"),
+                  ((v["id"], project_id, v["title"], v["summary"], v["order"]) for v in plan.volumes))
+        copy_rows(db, "chapters", ("id", "project_id", "volume_id", "title", "summary", "order"),
+                  ((c["id"], project_id, c["volume"]["id"], c["title"], c["summary"], c["order"])
+                   for c in plan.chapters))
+        copy_rows(db, "scenes", ("id", "project_id", "chapter_id", "title", "goal", "summary", "generated_content",
+                                 "order_in_chapter", "status"),
+                  ((s["id"], project_id, s["chapter"]["id"] if s["chapter"] else None, s["title"], s["goal"],
+                    s["summary"], s["generated_content"], s["order_in_chapter"], s["status"]) for s in plan.scenes))
+        copy_rows(db, "characters", ("id", "project_id", *RECORD_FIELDS["character"]),
+                  ((c["id"], project_id, *(c[name] for name in RECORD_FIELDS["character"])) for c in plan.characters))
+        copy_rows(db, "setting_elements", ("id", "project_id", *RECORD_FIELDS["setting"]),
+                  ((s["id"], project_id, *(s[name] for name in RECORD_FIELDS["setting"])) for s in plan.settings))
+        copy_rows(db, "character_relationships",
+                  ("project_id", "character1_id", "character2_id", "relationship_type", "description"),
+                  ((project_id, r["character1_id"], r["character2_id"], r["relationship_type"], r["description"])
+                   for r in plan.relationships))
+
+        _copy_associations(db, project_id, plan.scenes)
+        if plan.chapters or plan.scenes:
+            position_service.renumber_project(db, project_id)
+        # COPY 不经过 ORM 的 after_flush，这里手动让项目下读接口的 ETag 失效
+        db.execute(update(Project).where(Project.id == project_id).values(version=Project.version + 1))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    counts = {"volumes": len(plan.volumes), "chapters": len(plan.chapters), "scenes": len(plan.scenes),
+              "characters": len(plan.characters), "settings": len(plan.settings),
+              "relationships": len(plan.relationships)}
+    print(f"Imported into project {project_id}: {counts}, {len(plan.skipped)} skipped.")
+    return ImportOutcome(counts, plan.skipped,
+                         scene_ids=[s["id"] for s in plan.scenes if s["generated_content"]],
+                         rollup_chapter_ids=sorted({s["chapter"]["id"] for s in plan.scenes
+                                                    if s["summary"] and s["chapter"]}))
+
+
+# --- 第二阶段：批量 embedding ---
+
+async def _embed_concurrently(texts: List[str]) -> List[List[float]]:
+    """按 EMBED_BATCH_SIZE 切分，最多 IMPORT_EMBED_CONCURRENCY 个请求同时进行，返回顺序与输入一致。"""
+    batch_size = max(settings.EMBED_BATCH_SIZE, 1)
+    semaphore = asyncio.Semaphore(max(settings.IMPORT_EMBED_CONCURRENCY, 1))
+
+    async def embed(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await llm_service.get_embeddings(batch)
+
+    batches = await asyncio.gather(*(embed(texts[start:start + batch_size])
+                                     for start in range(0, len(texts), batch_size)))
+    return [embedding for batch in batches for embedding in batch]
+
+
+async def _embed_scene_passages(db: Session, project_id: int, scene_ids: Sequence[int]) -> int:
+    """为新导入的场景建立段落索引：跨场景切块、并发批量 embedding、COPY 写入，每批场景提交一次。"""
+    written = 0
+    step = max(settings.IMPORT_PASSAGE_BATCH_SCENES, 1)
+    for start in range(0, len(scene_ids), step):
+        batch_ids = list(scene_ids[start:start + step])
+        scenes = db.query(Scene.id, Scene.generated_content).filter(Scene.id.in_(batch_ids)).all()
+        passages: List[Tuple[int, int, Any]] = []
+        for scene_id, content in scenes:
+            passages.extend((scene_id, index, chunk)
+                            for index, chunk in enumerate(passage_service.split_passages(content or "")))
+        try:
+            embeddings = await _embed_concurrently([chunk.text for _, _, chunk in passages])
+        except Exception as e:
+            print(f"Passage embedding for scenes {batch_ids[0]}..{batch_ids[-1]} failed: {e}")
+            continue  # 这些场景的段落索引在正文下次保存时重建
+        copy_rows(db, "scene_passages", ("project_id", "scene_id", "passage_index", "start_offset", "content",
+                                         "content_hash", "embedding", "embedding_signature"),
+                  ((project_id, scene_id, index, chunk.start_offset, chunk.text, chunk.content_hash, embedding,
+                    llm_service.embedding_signature(chunk.text))
+                   for (scene_id, index, chunk), embedding in zip(passages, embeddings)))
+        db.commit()
+        written += len(passages)
+        print(f"Import passages: {written} written ({start + len(batch_ids)}/{len(scene_ids)} scenes).")
+    return written
+
+
+async def embed_imported(db: Session, project_id: int, scene_ids: Sequence[int]) -> Dict[str, int]:
+    """导入的第二阶段：场景段落索引，以及项目中所有缺失的向量。"""
+    results = {"scene_passages": await _embed_scene_passages(db, project_id, scene_ids)}
+    targets = [target.name for target in reindex_service.TARGETS if target.name not in PASSAGE_TARGETS]
+    results.update(await reindex_service.run_reindex(db, project_id=project_id, targets=targets,
+                                                     throttle_seconds=0))
+    return results
+
+
+_running_jobs: Dict[int, asyncio.Task] = {}
+
+
+def start_background_embedding(project_id: int, scene_ids: Sequence[int]) -> None:
+    """在当前事件循环中执行 embed_imported()，使用自己的数据库会话。"""
+
+    async def _run():
+        db = SessionLocal()
+        try:
+            results = await embed_imported(db, project_id, scene_ids)
+            print(f"Import embedding of project {project_id} finished: {results}")
+        except Exception as e:
+            print(f"Import embedding of project {project_id} failed: {e}")
+        finally:
+            db.close()
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _running_jobs[project_id] = task
+    task.add_done_callback(lambda done: _running_jobs.pop(project_id, None) if _running_jobs.get(project_id) is done
+                           else None)
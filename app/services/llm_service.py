@@ -1,25 +1,95 @@
 # backend/app/services/llm_service.py
 
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
 from typing import List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.core.config import settings
 
-client = OpenAI(api_key=settings.LLM_API_KEY, base_url=settings.LLM_API_BASE)
-embed_client = OpenAI(api_key=settings.EMBED_API_KEY, base_url=settings.EMBED_API_BASE)
+# 使用异步客户端：等待上游响应时让出事件循环，生成任务才能被取消或超时中断
+client = AsyncOpenAI(api_key=settings.LLM_API_KEY, base_url=settings.LLM_API_BASE)
+embed_client = AsyncOpenAI(api_key=settings.EMBED_API_KEY, base_url=settings.EMBED_API_BASE)
+
+
+class ResponseCache:
+    """进程内 LLM 响应缓存：LRU 淘汰 + TTL 过期，条目数有上限。"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)  # 最近使用的放到末尾
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # 淘汰最久未使用的条目
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                               ttl_seconds=settings.LLM_CACHE_TTL_SECONDS)
+
+
+def _normalize_messages(messages) -> List[dict]:
+    return [{'role': message['role'], 'content': message['content']} for message in messages]
+
+
+def make_cache_key(model: str, messages, max_tokens: int, temperature: float) -> str:
+    """根据 (model, messages, max_tokens, temperature) 计算缓存键。"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": _normalize_messages(messages),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 # 文本流生成
-async def generate_text_stream(messages, max_tokens: int = 150) -> str:
-    messages_data = [{'role': message['role'], 'content': message['content']} for message in messages]
+async def generate_text_stream(messages, max_tokens: int = 150, temperature: float = 1) -> str:
+    """
+    流式调用 LLM 并拼接完整结果。
+
+    任务被取消（客户端断开、显式取消或超过时间预算）时会关闭上游流，停止继续消耗 token，
+    然后把 CancelledError 继续抛给调用方。
+    """
+    messages_data = _normalize_messages(messages)
+    response = None
     try:
-        response = client.chat.completions.create(model=settings.LLM_MODEL,
-                                                  messages=messages_data,
-                                                  max_tokens=max_tokens,
-                                                  stream=True,
-                                                  temperature=1)
+        response = await client.chat.completions.create(model=settings.LLM_MODEL,
+                                                        messages=messages_data,
+                                                        max_tokens=max_tokens,
+                                                        stream=True,
+                                                        temperature=temperature)
         response_str = ''
-        for part in response:
+        async for part in response:
             if len(part.choices) == 0:
                 continue
             choice = part.choices[0]
@@ -35,27 +105,78 @@ async def generate_text_stream(messages, max_tokens: int = 150) -> str:
             if choice.finish_reason == 'length':
                 break
         return response_str
+    except asyncio.CancelledError:
+        print("LLM generation cancelled, closing upstream stream.")
+        raise
     except Exception as e:
         print(f"Error calling OpenAI API: {e}")
         # 更健壮的错误处理
         raise Exception("Failed to generate text")
+    finally:
+        if response is not None:
+            await response.close()
+
+
+async def generate_text(messages, max_tokens: int = 150, temperature: float = 1, use_cache: bool = False) -> str:
+    """
+    生成文本。
+
+    use_cache=True 时，相同 (model, messages, max_tokens, temperature) 的请求在 TTL 内直接返回缓存结果，
+    适用于章节大纲、摘要等可重复的调用；创作类调用（场景正文等）应保持默认值以绕过缓存。
+    """
+    if not (use_cache and settings.LLM_CACHE_ENABLED):
+        return await generate_text_stream(messages, max_tokens=max_tokens, temperature=temperature)
 
+    cache_key = make_cache_key(settings.LLM_MODEL, messages, max_tokens, temperature)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print(f"LLM response cache hit: {cache_key[:12]}")
+        return cached
 
-async def generate_text(messages, max_tokens: int = 150) -> str:
-    return await generate_text_stream(messages, max_tokens=max_tokens)
+    response_str = await generate_text_stream(messages, max_tokens=max_tokens, temperature=temperature)
+    if response_str:  # 不缓存空响应
+        response_cache.set(cache_key, response_str)
+    return response_str
 
 
 # 未来可以添加获取 embedding 的函数等
 async def get_embedding(text: str) -> List[float]:
-    response = embed_client.embeddings.create(
+    response = await embed_client.embeddings.create(
         model=settings.EMBED_MODEL,
         input=text,
-        dimensions=1024,
+        dimensions=settings.EMBED_DIMENSIONS,
         encoding_format="float"
     )
     return response.data[0].embedding
 
 
+async def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """批量获取 embedding，按 EMBED_BATCH_SIZE 分批请求，返回顺序与输入一致。"""
+    embeddings: List[List[float]] = []
+    batch_size = max(settings.EMBED_BATCH_SIZE, 1)
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        response = await embed_client.embeddings.create(
+            model=settings.EMBED_MODEL,
+            input=batch,
+            dimensions=settings.EMBED_DIMENSIONS,
+            encoding_format="float"
+        )
+        embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    return embeddings
+
+
+def embedding_signature(text: str) -> str:
+    """
+    向量签名："<模型>/v<版本>/d<维度>:<源文本 md5>"。
+
+    与行上存储的签名不一致说明向量缺失或过期：源文本改过、EMBED_MODEL 换了，
+    或 EMBED_VERSION 被调高（embedding 文本的拼接方式变了）。
+    """
+    digest = hashlib.md5((text or "").encode("utf-8")).hexdigest()
+    return f"{settings.EMBED_MODEL}/v{settings.EMBED_VERSION}/d{settings.EMBED_DIMENSIONS}:{digest}"
+
+
 def prepare_text_for_embedding(*args: Optional[str]) -> str:
     """将多个可能为 None 的字符串字段安全地连接成一个用于嵌入的文本块。"""
     return " ".join(filter(None, args)).strip()
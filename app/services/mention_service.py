@@ -0,0 +1,159 @@
+# backend/app/services/mention_service.py
+"""
+实体提及检测：在场景目标/正文中找出直接点名的角色和设定。
+
+每个项目维护一个按名称构建的 Aho–Corasick 自动机（进程内缓存）。
+角色/设定写入时增量更新名称表，自动机在下一次检测时按需重建；
+其他 worker 的写入通过 (数量, 最近更新时间) 签名发现，签名变化时整体重建。
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Character, SettingElement, Scene
+from app.utils.aho_corasick import AhoCorasick
+
+CHARACTER = "character"
+SETTING = "setting"
+MIN_NAME_LENGTH = 2  # 单字名称误命中太多，不参与匹配
+
+
+class _ProjectMentionIndex:
+    def __init__(self):
+        self.names: Dict[Tuple[str, int], str] = {}  # (kind, entity_id) -> name
+        self.signature: Optional[tuple] = None
+        self._automaton: Optional[AhoCorasick] = None
+
+    def upsert(self, kind: str, entity_id: int, name: Optional[str]) -> None:
+        if self.names.get((kind, entity_id)) == name:
+            return
+        self.names[(kind, entity_id)] = name
+        self._automaton = None
+
+    def remove(self, kind: str, entity_id: int) -> None:
+        if self.names.pop((kind, entity_id), None) is not None:
+            self._automaton = None
+
+    def find(self, text: str) -> Set[Tuple[str, int]]:
+        if self._automaton is None:
+            self._automaton = AhoCorasick.from_patterns(
+                (name.lower(), key) for key, name in self.names.items()
+                if name and len(name) >= MIN_NAME_LENGTH
+            )
+        return self._automaton.find_payloads(text.lower())
+
+
+_indexes: Dict[int, _ProjectMentionIndex] = {}
+
+
+def _project_signature(db: Session, project_id: int) -> tuple:
+    signature = []
+    for model in (Character, SettingElement):
+        count, last_change = db.query(
+            func.count(model.id),
+            func.max(func.coalesce(model.updated_at, model.created_at))
+        ).filter(model.project_id == project_id).one()
+        signature.append((count, last_change))
+    return tuple(signature)
+
+
+def _load_index(db: Session, project_id: int) -> _ProjectMentionIndex:
+    index = _ProjectMentionIndex()
+    for entity_id, name in db.query(Character.id, Character.name).filter(Character.project_id == project_id):
+        index.upsert(CHARACTER, entity_id, name)
+    for entity_id, name in db.query(SettingElement.id, SettingElement.name) \
+            .filter(SettingElement.project_id == project_id):
+        index.upsert(SETTING, entity_id, name)
+    return index
+
+
+def _get_index(db: Session, project_id: int) -> _ProjectMentionIndex:
+    signature = _project_signature(db, project_id)
+    index = _indexes.get(project_id)
+    if index is None or index.signature != signature:
+        index = _load_index(db, project_id)
+        index.signature = signature
+        _indexes[project_id] = index
+    return index
+
+
+def detect_mentions(db: Session, project_id: int, text: Optional[str]) -> Tuple[List[int], List[int]]:
+    """
+    找出文本中提及的角色和设定。
+
+    Returns:
+        (character_ids, setting_element_ids)
+    """
+    if not text:
+        return [], []
+    return _split_hits(_get_index(db, project_id).find(text))
+
+
+def detect_mentions_many(db: Session, project_id: int, texts: Iterable[Optional[str]]) \
+        -> Iterator[Tuple[List[int], List[int]]]:
+    """与 detect_mentions 相同，但名称表只检查一次，用于批量导入等一次处理大量文本的场合。"""
+    index = _get_index(db, project_id)
+    for text in texts:
+        yield _split_hits(index.find(text)) if text else ([], [])
+
+
+def _split_hits(hits) -> Tuple[List[int], List[int]]:
+    character_ids = sorted(entity_id for kind, entity_id in hits if kind == CHARACTER)
+    setting_ids = sorted(entity_id for kind, entity_id in hits if kind == SETTING)
+    return character_ids, setting_ids
+
+
+# --- 写入钩子：在服务层提交后调用，增量维护名称表 ---
+
+def _on_entity_saved(db: Session, kind: str, project_id: int, entity_id: int, name: str) -> None:
+    index = _indexes.get(project_id)
+    if index is None:
+        return  # 尚未构建，下次检测时会完整加载
+    index.upsert(kind, entity_id, name)
+    index.signature = _project_signature(db, project_id)
+
+
+def _on_entity_deleted(db: Session, kind: str, project_id: int, entity_id: int) -> None:
+    index = _indexes.get(project_id)
+    if index is None:
+        return
+    index.remove(kind, entity_id)
+    index.signature = _project_signature(db, project_id)
+
+
+def on_character_saved(db: Session, character: Character) -> None:
+    _on_entity_saved(db, CHARACTER, character.project_id, character.id, character.name)
+
+
+def on_character_deleted(db: Session, character: Character) -> None:
+    _on_entity_deleted(db, CHARACTER, character.project_id, character.id)
+
+
+def on_setting_saved(db: Session, setting: SettingElement) -> None:
+    _on_entity_saved(db, SETTING, setting.project_id, setting.id, setting.name)
+
+
+def on_setting_deleted(db: Session, setting: SettingElement) -> None:
+    _on_entity_deleted(db, SETTING, setting.project_id, setting.id)
+
+
+def sync_scene_associations(db: Session, scene: Scene) -> None:
+    """
+    根据场景目标和正文中的提及，补充 scene_character_association / scene_setting_association。
+
+    只增加不删除，手动维护的关联不会被覆盖。不提交事务，由调用方提交。
+    """
+    text = "\n".join(filter(None, [scene.title, scene.goal, scene.generated_content]))
+    character_ids, setting_ids = detect_mentions(db, scene.project_id, text)
+
+    existing_characters = {character.id for character in scene.characters}
+    new_character_ids = [cid for cid in character_ids if cid not in existing_characters]
+    if new_character_ids:
+        scene.characters.extend(db.query(Character).filter(Character.id.in_(new_character_ids)).all())
+
+    existing_settings = {setting.id for setting in scene.setting_elements}
+    new_setting_ids = [sid for sid in setting_ids if sid not in existing_settings]
+    if new_setting_ids:
+        scene.setting_elements.extend(
+            db.query(SettingElement).filter(SettingElement.id.in_(new_setting_ids)).all())
@@ -0,0 +1,92 @@
+# backend/app/services/passage_service.py
+"""
+正文段落索引：把场景 generated_content 和章节 content 切成稳定的内容哈希块，
+批量 embedding 后分别写入 scene_passages / chapter_passages。
+
+正文修改时按块的 sha256 与已存储的块比对，内容没变的块直接复用原来的向量，
+只对新出现的块调用 embedding 接口，开销与修改量成正比，而不是与全文长度成正比。
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Scene, Chapter, ScenePassage, ChapterPassage
+from app.services import llm_service
+from app.utils.chunking import Chunk, split_stable_chunks
+
+
+def split_passages(text: str) -> List[Chunk]:
+    return split_stable_chunks(text, max_chars=settings.PASSAGE_SIZE_CHARS, min_chars=settings.PASSAGE_MIN_CHARS,
+                               overlap=settings.PASSAGE_OVERLAP_CHARS)
+
+
+async def _sync_passages(rows: List, text: str, new_row: Callable[..., object]) -> Tuple[int, int]:
+    """
+    把 rows（关系集合）同步为 text 的分块结果。
+
+    Returns:
+        (复用的块数, 新 embedding 的块数)
+    """
+    chunks = split_passages(text)
+
+    existing: Dict[str, List] = defaultdict(list)
+    for row in rows:
+        existing[row.content_hash].append(row)
+
+    kept = []
+    to_embed: List[Tuple[int, Chunk]] = []
+    for passage_index, chunk in enumerate(chunks):
+        if existing.get(chunk.content_hash):
+            kept.append((passage_index, chunk, existing[chunk.content_hash].pop()))
+        else:
+            to_embed.append((passage_index, chunk))
+
+    embeddings = await llm_service.get_embeddings([chunk.text for _, chunk in to_embed]) if to_embed else []
+
+    # 不再出现的块删除；保留的块只更新位置
+    for stale_rows in existing.values():
+        for row in stale_rows:
+            rows.remove(row)
+    for passage_index, chunk, row in kept:
+        row.passage_index = passage_index
+        row.start_offset = chunk.start_offset
+    for (passage_index, chunk), embedding in zip(to_embed, embeddings):
+        rows.append(new_row(
+            passage_index=passage_index,
+            start_offset=chunk.start_offset,
+            content=chunk.text,
+            content_hash=chunk.content_hash,
+            embedding=embedding,
+            embedding_signature=llm_service.embedding_signature(chunk.text),
+        ))
+    return len(kept), len(to_embed)
+
+
+async def sync_scene_passages(db: Session, scene: Scene) -> int:
+    """
+    按当前正文更新场景的段落索引。不提交事务，由调用方提交。
+
+    Returns:
+        新计算 embedding 的块数。
+    """
+    reused, embedded = await _sync_passages(
+        scene.passages, scene.generated_content or "",
+        lambda **fields: ScenePassage(project_id=scene.project_id, **fields))
+    print(f"Scene {scene.id} passages: {reused} reused, {embedded} embedded.")
+    return embedded
+
+
+async def sync_chapter_passages(db: Session, chapter: Chapter) -> int:
+    """
+    按当前章节全文更新章节的段落索引。不提交事务，由调用方提交。
+
+    Returns:
+        新计算 embedding 的块数。
+    """
+    reused, embedded = await _sync_passages(
+        chapter.passages, chapter.content or "",
+        lambda **fields: ChapterPassage(project_id=chapter.project_id, **fields))
+    print(f"Chapter {chapter.id} passages: {reused} reused, {embedded} embedded.")
+    return embedded
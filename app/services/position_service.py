@@ -0,0 +1,112 @@
+# backend/app/services/position_service.py
+"""
+全书叙事位置：为每个章节和场景维护一个全局顺序号 narrative_position。
+
+顺序由 (卷 order, 章 order, 场景 order_in_chapter) 决定，ID 作为并列时的稳定排序。
+章节、场景、卷在创建/删除/调整顺序后，由服务层在提交前调用 renumber_project()，
+用两条 UPDATE ... FROM (row_number()) 批量重排，只写入发生变化的行。
+有了这个索引列，"前 N 个场景"、"下一章"、区间查询都只需一次索引扫描。
+"""
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.structure import Volume, Chapter, Scene
+
+
+def renumber_project(db: Session, project_id: int) -> None:
+    """
+    重排项目内所有章节和场景的 narrative_position。
+
+    会先 flush 会话中的待写入修改；不提交事务，由调用方提交。
+    未归属章节的场景位置为 NULL。
+    """
+    db.flush()
+
+    chapter_positions = select(
+        Chapter.id.label("chapter_id"),
+        func.row_number().over(order_by=(Volume.order, Volume.id, Chapter.order, Chapter.id)).label("position"),
+    ) \
+        .join(Volume, Chapter.volume_id == Volume.id) \
+        .where(Chapter.project_id == project_id) \
+        .subquery()
+    db.execute(
+        update(Chapter)
+        .where(Chapter.id == chapter_positions.c.chapter_id,
+               Chapter.narrative_position.is_distinct_from(chapter_positions.c.position))
+        .values(narrative_position=chapter_positions.c.position,
+                updated_at=Chapter.updated_at)  # 重排不算内容修改，不触发 onupdate
+        .execution_options(synchronize_session=False)
+    )
+
+    scene_positions = select(
+        Scene.id.label("scene_id"),
+        func.row_number().over(order_by=(Chapter.narrative_position, Scene.order_in_chapter, Scene.id))
+        .label("position"),
+    ) \
+        .join(Chapter, Scene.chapter_id == Chapter.id) \
+        .where(Scene.project_id == project_id) \
+        .subquery()
+    db.execute(
+        update(Scene)
+        .where(Scene.id == scene_positions.c.scene_id,
+               Scene.narrative_position.is_distinct_from(scene_positions.c.position))
+        .values(narrative_position=scene_positions.c.position,
+                updated_at=Scene.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(Scene)
+        .where(Scene.project_id == project_id, Scene.chapter_id == None, Scene.narrative_position != None)
+        .values(narrative_position=None, updated_at=Scene.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.expire_all()  # 会话中已加载的对象重新读取位置
+
+
+# --- 按叙事位置的查询 ---
+
+def get_previous_chapter(db: Session, chapter: Chapter) -> Optional[Chapter]:
+    """全书顺序中的上一章（跨卷）。"""
+    if chapter.narrative_position is None:
+        return None
+    return db.query(Chapter) \
+        .filter(Chapter.project_id == chapter.project_id,
+                Chapter.narrative_position < chapter.narrative_position) \
+        .order_by(Chapter.narrative_position.desc()) \
+        .first()
+
+
+def get_next_chapter(db: Session, chapter: Chapter) -> Optional[Chapter]:
+    """全书顺序中的下一章（跨卷）。"""
+    if chapter.narrative_position is None:
+        return None
+    return db.query(Chapter) \
+        .filter(Chapter.project_id == chapter.project_id,
+                Chapter.narrative_position > chapter.narrative_position) \
+        .order_by(Chapter.narrative_position) \
+        .first()
+
+
+def get_previous_scenes(db: Session, scene: Scene, n: int) -> List[Scene]:
+    """场景之前的 n 个场景（跨章、跨卷），按故事顺序返回。"""
+    if scene.narrative_position is None or n <= 0:
+        return []
+    scenes = db.query(Scene) \
+        .filter(Scene.project_id == scene.project_id,
+                Scene.narrative_position < scene.narrative_position) \
+        .order_by(Scene.narrative_position.desc()) \
+        .limit(n) \
+        .all()
+    return scenes[::-1]
+
+
+def get_scenes_in_range(db: Session, project_id: int, start: int, end: int) -> List[Scene]:
+    """叙事位置在 [start, end] 之间的场景，按故事顺序返回。"""
+    return db.query(Scene) \
+        .filter(Scene.project_id == project_id,
+                Scene.narrative_position >= start,
+                Scene.narrative_position <= end) \
+        .order_by(Scene.narrative_position) \
+        .all()
@@ -1,31 +1,282 @@
 # 在你的 RAG 服务函数内部
+import asyncio
+import functools
 import json
+import re
+import threading
+from collections import defaultdict
 
 from fastapi import HTTPException
-from sqlalchemy import func, select
+from sqlalchemy import func, select, or_, and_, case, literal, event
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.models import Character, CharacterRelationship, SettingElement, Scene, Chapter
-from sqlalchemy.orm import Session, selectinload
-from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.models import Character, CharacterRelationship, SettingElement, Scene, Chapter, ScenePassage, ChapterPassage, \
+    scene_character_association, scene_setting_association
+from sqlalchemy.orm import Session, selectinload, aliased
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Callable, TypeVar
 
 from app.models.structure import SceneStatus
 from app.schemas import SceneUpdate, ChapterUpdate
 from app.schemas.scene import SceneUpdateGenerated, SceneCreate
-from app.services import llm_service, scene_service, chapter_service
+from app.services import llm_service, scene_service, chapter_service, mention_service, position_service, \
+    summary_service, vector_search
 from app.utils import jsonUtils
+from app.utils.mmr import mmr_select
 
 
 # --- 检索函数 ---
 
-async def retrieve_relevant_context(
+def _lexical_tsquery_text(query_text: str) -> Optional[str]:
+    """把查询文本切成词项并用 OR 连接，供 to_tsquery('simple', ...) 使用。"""
+    terms = list(dict.fromkeys(re.findall(r"\w+", query_text)))
+    if not terms:
+        return None
+    return " | ".join(terms)
+
+
+def _lexical_search_ids(db: Session, model, project_id: int, query_text: str, limit: int,
+                        exclude_ids: Sequence[int] = ()) -> List[int]:
+    """
+    基于名称/描述的词法检索，返回按相关度排序的 ID 列表。
+
+    - search_vector @@ tsquery: 以空白/标点分隔的词项命中（适合拉丁字母名称）。
+    - strpos / word_similarity(name, query): 名称在查询中被精确或近似提及（中文名称的主要召回路径）。
+    - search_text %> query: 较短的查询（如章节标题）整体出现在名称或描述中，可走 trigram GIN 索引。
+    """
+    tsquery_text = _lexical_tsquery_text(query_text)
+    mentioned = func.strpos(query_text, model.name) > 0
+    conditions = [mentioned, model.name.op('<%')(query_text), model.search_text.op('%>')(query_text)]
+    rank = func.word_similarity(model.name, query_text)
+    if tsquery_text:
+        tsquery = func.to_tsquery('simple', tsquery_text)
+        conditions.append(model.search_vector.op('@@')(tsquery))
+        rank = rank + func.ts_rank_cd(model.search_vector, tsquery)
+
+    query = db.query(model.id).filter(model.project_id == project_id, or_(*conditions))
+    if exclude_ids:
+        query = query.filter(model.id.notin_(exclude_ids))
+    rows = query \
+        .order_by(case((mentioned, 1), else_=0).desc(), rank.desc()) \
+        .limit(limit) \
+        .all()
+    return [row_id for (row_id,) in rows]
+
+
+def _reciprocal_rank_fusion(rankings: List[List[int]], k: int) -> List[int]:
+    """Reciprocal Rank Fusion：score(d) = Σ 1 / (k + rank_i(d))。"""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking, start=1):
+            scores[row_id] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda row_id: scores[row_id], reverse=True)
+
+
+def _hybrid_search(
+        db: Session,
+        model,
+        project_id: int,
+        query_text: Optional[str],
+        query_embedding: List[float],
+        limit: int,
+        exclude_ids: Sequence[int] = (),
+) -> List[Any]:
+    """向量 top-k 与词法 top-k 通过 RRF 融合；没有查询文本时退化为纯向量检索。"""
+    if limit <= 0:
+        return []
+    candidate_pool = limit * 2
+    vector_query = db.query(model.id).filter(model.project_id == project_id, model.embedding != None)
+    if exclude_ids:
+        vector_query = vector_query.filter(model.id.notin_(exclude_ids))
+    vector_ids = [row_id for (row_id,) in vector_search.nearest(
+        vector_query, model.embedding, query_embedding, candidate_pool).all()]
+    rankings = [vector_ids]
+    if query_text:
+        rankings.append(_lexical_search_ids(db, model, project_id, query_text, candidate_pool, exclude_ids))
+
+    fused_ids = _reciprocal_rank_fusion(rankings, settings.HYBRID_RRF_K)[:limit]
+    if not fused_ids:
+        return []
+    return _load_in_order(db, model, fused_ids)
+
+
+def _load_in_order(db: Session, model, ids: Sequence[int]) -> List[Any]:
+    if not ids:
+        return []
+    rows_by_id = {row.id: row for row in db.query(model).filter(model.id.in_(ids)).all()}
+    return [rows_by_id[row_id] for row_id in ids if row_id in rows_by_id]
+
+
+def _mmr_rerank(candidates: List[Any], vector_attr: str, query_embedding: List[float], k: int,
+                lambda_mult: float) -> List[Any]:
+    """对过量召回的候选做 MMR 多样性重排，保留 k 条。"""
+    if len(candidates) <= 1:
+        return candidates[:k]
+    vectors = [getattr(candidate, vector_attr) for candidate in candidates]
+    selected = mmr_select(query_embedding, vectors, k, lambda_mult)
+    return [candidates[index] for index in selected]
+
+
+def _pinned_entity_ids(
+        db: Session,
+        project_id: int,
+        query_text: Optional[str],
+        current_scene_id: Optional[int],
+) -> Tuple[List[int], List[int]]:
+    """
+    需要固定放入上下文的角色和设定：查询文本中直接点名的，加上当前场景已关联的。
+
+    Returns:
+        (character_ids, setting_element_ids)，点名的排在前面。
+    """
+    character_ids, setting_ids = mention_service.detect_mentions(db, project_id, query_text)
+    if current_scene_id is not None:
+        character_ids += [row_id for (row_id,) in db.query(scene_character_association.c.character_id)
+                          .filter(scene_character_association.c.scene_id == current_scene_id)]
+        setting_ids += [row_id for (row_id,) in db.query(scene_setting_association.c.setting_element_id)
+                        .filter(scene_setting_association.c.scene_id == current_scene_id)]
+    return list(dict.fromkeys(character_ids)), list(dict.fromkeys(setting_ids))
+
+
+def _narrative_anchor(current_scene_id: Optional[int], anchor_chapter_id: Optional[int]):
+    """
+    当前写作位置（SQL 标量子查询）。
+
+    有当前场景时取该场景的叙事位置；只有章节时取该章之前最后一个场景的位置 + 0.5，
+    这样即使章节还没有场景，前面的场景也都在锚点之前。
+    """
+    if current_scene_id is not None:
+        current_scene = aliased(Scene)
+        return select(current_scene.narrative_position) \
+            .where(current_scene.id == current_scene_id) \
+            .scalar_subquery()
+    if anchor_chapter_id is None:
+        return None
+    scene, chapter, current_chapter = aliased(Scene), aliased(Chapter), aliased(Chapter)
+    return select(func.coalesce(func.max(scene.narrative_position), 0) + 0.5) \
+        .select_from(scene) \
+        .join(chapter, scene.chapter_id == chapter.id) \
+        .join(current_chapter, current_chapter.id == anchor_chapter_id) \
+        .where(chapter.project_id == current_chapter.project_id,
+               chapter.narrative_position < current_chapter.narrative_position) \
+        .scalar_subquery()
+
+
+def _retrieve_past_scenes(
+        db: Session,
+        project_id: int,
+        query_embedding: List[float],
+        k: int,
+        current_scene_id: Optional[int],
+        anchor_chapter_id: Optional[int],
+) -> List[Scene]:
+    """
+    检索过往场景：向量相似度与叙事距离混合打分，紧邻的前 N 个场景总是保留。
+
+    score = w · (1 − cosine_distance) + (1 − w) · 1 / (1 + |pos − anchor| / decay)
+
+    pos 为 position_service 维护的全书叙事位置。打分、前 N 个场景的判定和排序在同一条 SQL 中完成；
+    其余候选再用 MMR 以该分数为相关度去重。返回结果按叙事顺序排列。
+    """
+    position = Scene.narrative_position
+    anchor = _narrative_anchor(current_scene_id, anchor_chapter_id)
+    preceding_count = settings.PAST_SCENE_PRECEDING_COUNT
+
+    similarity = func.coalesce(1 - Scene.summary_embedding.cosine_distance(query_embedding), 0)
+    if anchor is None:
+        score = similarity
+        is_preceding = literal(False)
+    else:
+        weight = settings.PAST_SCENE_SIMILARITY_WEIGHT
+        proximity = 1.0 / (1.0 + func.abs(position - anchor) / settings.PAST_SCENE_DISTANCE_DECAY)
+        score = weight * similarity + (1 - weight) * func.coalesce(proximity, 0)
+        is_preceding = and_(position < anchor, position >= anchor - preceding_count)
+
+    query = db.query(Scene, score.label("score"), is_preceding.label("is_preceding")) \
+        .filter(
+        Scene.project_id == project_id,
+        Scene.status.in_(['DRAFTED', 'REVISING', 'COMPLETED']),  # 只检索有内容的场景
+        or_(Scene.summary_embedding != None, is_preceding),  # 紧邻的前文即使还没有概要向量也保留
+    )
+    if current_scene_id is not None:
+        query = query.filter(Scene.id != current_scene_id)
+    rows = query \
+        .order_by(case((is_preceding, 0), else_=1), score.desc()) \
+        .limit(max(settings.MMR_POOL_PAST_SCENES, k) + preceding_count) \
+        .all()
+
+    preceding = [row for row in rows if row.is_preceding][:k]
+    candidates = [row for row in rows if not row.is_preceding]
+    remaining = k - len(preceding)
+    selected = []
+    if remaining > 0 and candidates:
+        # 过量召回候选，再用 MMR 去掉同一情节线上的近似重复概要
+        indexes = mmr_select(query_embedding, [row.Scene.summary_embedding for row in candidates], remaining,
+                             settings.MMR_LAMBDA_PAST_SCENES, relevance=[row.score for row in candidates])
+        selected = [candidates[index] for index in indexes]
+
+    # 未归属章节的场景没有叙事位置，排在最后
+    ordered = sorted(preceding + selected,
+                     key=lambda row: (row.Scene.narrative_position is None, row.Scene.narrative_position or 0))
+    return [row.Scene for row in ordered]
+
+
+T = TypeVar("T")
+
+
+class RetrievalInterrupted(Exception):
+    """检索阶段超出时间预算后，线程中尚未执行的查询被拒绝。"""
+
+
+async def _run_db_in_thread(db: Session, fn: Callable[[], T]) -> T:
+    """
+    在线程池中执行使用 db 的同步查询，不阻塞事件循环。
+
+    外层的 asyncio.timeout 到期（或任务被取消）时：取消正在执行的 SQL（psycopg2 cancel），
+    拒绝线程之后的查询，等线程结束后再把取消向上抛出。这样阶段预算真正限制了查询时间，
+    而且返回后会话不会再被线程使用。
+    """
+    connection = db.connection()
+    interrupted = threading.Event()
+
+    def guard(*args):
+        if interrupted.is_set():
+            raise RetrievalInterrupted("Retrieval exceeded its time budget.")
+
+    event.listen(connection, "before_cursor_execute", guard)
+    future = asyncio.get_running_loop().run_in_executor(None, fn)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        interrupted.set()
+        try:
+            connection.connection.dbapi_connection.cancel()
+        except Exception as e:
+            print(f"Failed to cancel running retrieval query: {e}")
+        await asyncio.gather(future, return_exceptions=True)
+        raise
+    finally:
+        event.remove(connection, "before_cursor_execute", guard)
+
+
+async def retrieve_relevant_context(db: Session, *args, **kwargs) -> Dict[str, List[Any]]:
+    """
+    _retrieve_relevant_context 的异步入口（参数相同）：检索查询在线程池中执行，
+    外层 asyncio.timeout 到期时会中断正在执行的查询。
+    """
+    return await _run_db_in_thread(db, functools.partial(_retrieve_relevant_context, db, *args, **kwargs))
+
+
+def _retrieve_relevant_context(
         db: Session,
         project_id: int,
         query_embedding: List[float],
         k_per_type: int,  # 每个类别检索多少条
         current_chapter_id: Optional[int] = None,
         current_scene_id: Optional[int] = None,  # 用于排除正在生成的场景自身
+        query_text: Optional[str] = None,  # 查询原文，用于名称/描述的词法检索
+        anchor_chapter_id: Optional[int] = None,  # 没有当前场景时，用于确定叙事位置的章节
 ) -> Dict[str, List[Any]]:
     """
     从数据库检索与查询向量相关的上下文信息。
@@ -37,6 +288,10 @@ async def retrieve_relevant_context(
         db: SQLAlchemy 数据库会话。
         current_chapter_id: (可选) 当前正在处理的章节 ID。
         current_scene_id: (可选) 当前正在处理的场景 ID，用于从检索中排除。
+        query_text: (可选) 查询原文。提供时角色和设定使用向量 + 词法的混合检索，
+            文中直接点名的角色和设定会被固定放入上下文。
+        anchor_chapter_id: (可选) 正在规划的章节 ID。过往场景按与当前场景（或该章节）的
+            叙事距离加权，紧邻的前几个场景总是放入上下文。
 
     Returns:
         一个字典，键是上下文类别（如 'characters', 'settings', 'past_scenes'），
@@ -49,16 +304,25 @@ async def retrieve_relevant_context(
         "character_relationships": [],
         "last_chapter": [],
         "chapters": [],
+        "story_so_far": [],
+        "passages": [],
     }
     print(f"Starting context retrieval for project {project_id} with k={k_per_type}")
 
+    # 0. 被点名或与当前场景关联的角色/设定先固定下来，检索只补足剩余名额
+    pinned_character_ids, pinned_setting_ids = [], []
+    try:
+        pinned_character_ids, pinned_setting_ids = _pinned_entity_ids(db, project_id, query_text, current_scene_id)
+        print(f"Pinned {len(pinned_character_ids)} characters and {len(pinned_setting_ids)} settings.")
+    except Exception as e:
+        print(f"Error detecting mentioned entities: {e}")
+
     # 1. 检索相关角色
     try:
-        relevant_characters = db.query(Character) \
-            .filter(Character.project_id == project_id, Character.embedding != None) \
-            .order_by(Character.embedding.cosine_distance(query_embedding)) \
-            .limit(k_per_type) \
-            .all()
+        pinned_characters = _load_in_order(db, Character, pinned_character_ids)
+        relevant_characters = pinned_characters + _hybrid_search(
+            db, Character, project_id, query_text, query_embedding,
+            k_per_type - len(pinned_characters), exclude_ids=pinned_character_ids)
         retrieved_context["characters"] = relevant_characters
         print(f"Retrieved {len(relevant_characters)} relevant characters.")
     except Exception as e:
@@ -66,11 +330,10 @@ async def retrieve_relevant_context(
 
     # 2. 检索相关设定
     try:
-        relevant_settings = db.query(SettingElement) \
-            .filter(SettingElement.project_id == project_id, SettingElement.embedding != None) \
-            .order_by(SettingElement.embedding.cosine_distance(query_embedding)) \
-            .limit(k_per_type) \
-            .all()
+        pinned_settings = _load_in_order(db, SettingElement, pinned_setting_ids)
+        relevant_settings = pinned_settings + _hybrid_search(
+            db, SettingElement, project_id, query_text, query_embedding,
+            k_per_type - len(pinned_settings), exclude_ids=pinned_setting_ids)
         retrieved_context["settings"] = relevant_settings
         print(f"Retrieved {len(relevant_settings)} relevant settings.")
     except Exception as e:
@@ -78,32 +341,67 @@ async def retrieve_relevant_context(
 
     # # 3. 检索相关过往场景概要 (核心上下文)
     try:
-        scene_query = db.query(Scene) \
-            .filter(
-            Scene.project_id == project_id,
-            Scene.summary_embedding != None,  # 必须有概要向量
-            Scene.status.in_(['DRAFTED', 'REVISING', 'COMPLETED'])  # 只检索有内容的场景
-        )
-        # 如果提供了当前场景 ID，则排除它
-        if current_scene_id is not None:
-            scene_query = scene_query.filter(Scene.id != current_scene_id)
-
-        relevant_past_scenes = scene_query \
-            .order_by(Scene.summary_embedding.cosine_distance(query_embedding)) \
-            .limit(k_per_type) \
-            .all()
+        relevant_past_scenes = _retrieve_past_scenes(db, project_id, query_embedding, k_per_type,
+                                                     current_scene_id, anchor_chapter_id)
         retrieved_context["past_scenes"] = relevant_past_scenes
         print(f"Retrieved {len(relevant_past_scenes)} relevant past scenes.")
     except Exception as e:
         print(f"Error retrieving past scenes: {e}")
 
-    # 4. 检索相关人物关系
+    # 3.1 检索相关原文段落（概要里没有写到的细节），场景正文和章节全文的段落一起按距离排序
     try:
-        relevant_relationships = db.query(CharacterRelationship) \
-            .filter(CharacterRelationship.project_id == project_id, CharacterRelationship.embedding != None) \
-            .order_by(CharacterRelationship.embedding.cosine_distance(query_embedding)) \
-            .limit(k_per_type) \
+        scene_distance = ScenePassage.embedding.cosine_distance(query_embedding)
+        passage_query = db.query(ScenePassage, scene_distance) \
+            .filter(ScenePassage.project_id == project_id, ScenePassage.embedding != None)
+        if current_scene_id is not None:
+            passage_query = passage_query.filter(ScenePassage.scene_id != current_scene_id)
+        candidates = vector_search.nearest(passage_query, ScenePassage.embedding, query_embedding,
+                                           settings.PASSAGE_TOP_K) \
+            .options(selectinload(ScenePassage.scene).selectinload(Scene.chapter)) \
+            .all()
+
+        chapter_distance = ChapterPassage.embedding.cosine_distance(query_embedding)
+        chapter_passage_query = db.query(ChapterPassage, chapter_distance) \
+            .filter(ChapterPassage.project_id == project_id, ChapterPassage.embedding != None)
+        excluded_chapter_ids = [chapter_id for chapter_id in (current_chapter_id, anchor_chapter_id)
+                                if chapter_id is not None]
+        if excluded_chapter_ids:
+            chapter_passage_query = chapter_passage_query.filter(
+                ChapterPassage.chapter_id.notin_(excluded_chapter_ids))
+        candidates += vector_search.nearest(chapter_passage_query, ChapterPassage.embedding, query_embedding,
+                                            settings.PASSAGE_TOP_K) \
+            .options(selectinload(ChapterPassage.chapter)) \
             .all()
+
+        relevant_passages = [passage for passage, _ in
+                             sorted(candidates, key=lambda row: row[1])[:settings.PASSAGE_TOP_K]]
+        retrieved_context["passages"] = relevant_passages
+        print(f"Retrieved {len(relevant_passages)} relevant passages.")
+    except Exception as e:
+        print(f"Error retrieving passages: {e}")
+
+    # 4. 检索相关人物关系
+    try:
+        # 被固定的角色之间的关系同样固定
+        pinned_relationships = []
+        if len(pinned_character_ids) > 1:
+            pinned_relationships = db.query(CharacterRelationship) \
+                .filter(CharacterRelationship.project_id == project_id,
+                        CharacterRelationship.character1_id.in_(pinned_character_ids),
+                        CharacterRelationship.character2_id.in_(pinned_character_ids)) \
+                .limit(k_per_type) \
+                .all()
+        relationship_query = db.query(CharacterRelationship) \
+            .filter(CharacterRelationship.project_id == project_id, CharacterRelationship.embedding != None)
+        if pinned_relationships:
+            relationship_query = relationship_query.filter(
+                CharacterRelationship.id.notin_([rel.id for rel in pinned_relationships]))
+        remaining = max(k_per_type - len(pinned_relationships), 0)
+        candidate_relationships = vector_search.nearest(
+            relationship_query, CharacterRelationship.embedding, query_embedding,
+            max(settings.MMR_POOL_RELATIONSHIPS, remaining)).all() if remaining else []
+        relevant_relationships = pinned_relationships + _mmr_rerank(
+            candidate_relationships, "embedding", query_embedding, remaining, settings.MMR_LAMBDA_RELATIONSHIPS)
         # 为了方便格式化，加载关联的角色名字
         for rel in relevant_relationships:
             db.refresh(rel, ['character1', 'character2'])  # 确保关联对象加载
@@ -115,15 +413,25 @@ async def retrieve_relevant_context(
     if current_chapter_id is not None:
         # 5. 检索上一章节
         try:
-            last_chapter = db.query(Chapter) \
-                .filter(Chapter.project_id == project_id, Chapter.id < current_chapter_id) \
-                .order_by(Chapter.order.desc()) \
-                .first()
+            current_chapter = db.get(Chapter, current_chapter_id)
+            last_chapter = position_service.get_previous_chapter(db, current_chapter) if current_chapter else None
             retrieved_context["last_chapter"] = [last_chapter]
         except Exception as e:
             print(f"Error last_chapter: {e}")
 
-    # 6. (可选) 检索相关章节概要 (提供宏观上下文)
+    # 6. 前情提要：更早的卷摘要 + 本卷之前各章的滚动摘要，总长度固定
+    try:
+        story_chapter_id = anchor_chapter_id or current_chapter_id
+        if current_scene_id is not None:
+            current_scene = db.get(Scene, current_scene_id)
+            story_chapter_id = current_scene.chapter_id if current_scene else story_chapter_id
+        story_chapter = db.get(Chapter, story_chapter_id) if story_chapter_id is not None else None
+        retrieved_context["story_so_far"] = summary_service.build_story_so_far(db, story_chapter)
+        print(f"Built story so far with {len(retrieved_context['story_so_far'])} entries.")
+    except Exception as e:
+        print(f"Error building story so far: {e}")
+
+    # 7. (可选) 检索相关章节概要 (提供宏观上下文)
     # try:
     #     relevant_chapters = db.query(Chapter) \
     #         .filter(Chapter.project_id == project_id, Chapter.embedding != None) \
@@ -203,19 +511,13 @@ def format_context_for_prompt(
 
     def format_past_scenes(scenes: List[Scene]) -> str:
         nonlocal current_length
-        part = "\n[相关场景概要（相关度优先）]:\n"
+        part = "\n[相关场景概要（按故事顺序）]:\n"
         added_len = len(part)
         if current_length + added_len > max_context_length: return ""
         current_length += added_len
 
-        # 按更新时间或创建时间倒序排列，给 LLM 最近的上下文
-        sorted_scenes = sorted(
-            scenes,
-            key=lambda s: s.updated_at or s.created_at or func.now(),  # Fallback if None
-            reverse=True
-        )
-
-        for scene in sorted_scenes:
+        # 检索结果已按叙事顺序排列，保持原顺序
+        for scene in scenes:
             chapter_info = f"第 {scene.chapter.order + 1} 章" if scene.chapter else "未知章节"
             entry = f"- 场景 ({chapter_info}, 第 {scene.order_in_chapter + 1} 个场景): {scene.title or '未命名场景'}\n"
             if scene.summary:
@@ -232,6 +534,32 @@ def format_context_for_prompt(
                 break
         return part
 
+    def format_passages(passages: List[Any]) -> str:
+        nonlocal current_length
+        part = "\n[相关原文片段]:\n"
+        added_len = len(part)
+        if current_length + added_len > max_context_length: return ""
+        current_length += added_len
+
+        for passage in passages:
+            if isinstance(passage, ChapterPassage):
+                chapter = passage.chapter
+                source = f"第 {chapter.order + 1} 章 {chapter.title}" if chapter else "未知章节"
+            else:
+                scene = passage.scene
+                chapter_info = f"第 {scene.chapter.order + 1} 章" if scene and scene.chapter else "未知章节"
+                source = f"{chapter_info}, {scene.title if scene and scene.title else '未命名场景'}"
+            entry = f"- ({source}): {passage.content.strip()}\n"
+
+            if current_length + len(entry) <= max_context_length:
+                part += entry
+                current_length += len(entry)
+            else:
+                part += "- (More passages truncated due to length limit)\n"
+                current_length = max_context_length
+                break
+        return part
+
     def format_relationships(relationships: List[CharacterRelationship]) -> str:
         nonlocal current_length
         part = "\n[相关角色关系]:\n"
@@ -299,7 +627,20 @@ def format_context_for_prompt(
                 break
         return part
 
+    def format_story_so_far(entries: List[Dict[str, str]]) -> str:
+        nonlocal current_length
+        part = "\n[前情提要]:\n"
+        for entry in entries:
+            part += f"- {entry['label']}: {entry['summary']}\n"
+        # 条目已在 build_story_so_far 中按固定预算截断，这里只做总长度保护
+        if current_length + len(part) > max_context_length: return ""
+        current_length += len(part)
+        return part
+
     # 按优先级添加上下文，重要的放前面
+    if retrieved_data.get("story_so_far"):
+        context_parts.append(format_story_so_far(retrieved_data["story_so_far"]))
+
     if retrieved_data.get("characters"):
         context_parts.append(format_characters(retrieved_data["characters"]))
         if current_length >= max_context_length: return "".join(context_parts)
@@ -318,6 +659,11 @@ def format_context_for_prompt(
 
     if retrieved_data.get("last_chapter"):
         context_parts.append(format_last_chapter(retrieved_data["last_chapter"]))
+        if current_length >= max_context_length: return "".join(context_parts)
+
+    if retrieved_data.get("passages"):
+        context_parts.append(format_passages(retrieved_data["passages"]))
+        if current_length >= max_context_length: return "".join(context_parts)
 
     if retrieved_data.get("chapters"):
         context_parts.append(format_chapters(retrieved_data["chapters"]))
@@ -332,6 +678,18 @@ def format_context_for_prompt(
     return f"<相关上下文>\n{final_context.strip()}\n</相关上下文>"
 
 
+def _restore_scene_status(db: Session, scene_id: int, previous_status: SceneStatus) -> None:
+    """生成被取消、超时或失败时，把场景状态从 GENERATING 回滚到生成前的状态。"""
+    try:
+        db.rollback()  # 丢弃未提交的部分修改
+        scene = db.get(Scene, scene_id)
+        if scene is not None and scene.status == SceneStatus.GENERATING:
+            scene.status = previous_status
+            db.commit()
+    except Exception as e:
+        print(f"Failed to restore status of scene {scene_id}: {e}")
+
+
 async def generate_scenes(
         db: Session,
         chapter_id: int
@@ -399,17 +757,19 @@ async def generate_scenes(
 
     try:
         # 2. Get Query Embedding (Generate fresh embedding for the current goal)
-        print("Generating embedding for chapter title...")
-        query_embedding = await llm_service.get_embedding(chapter.title)
-
-        # 3. Retrieve Relevant Context
-        print("Retrieving relevant context...")
-        # 如果不是第一个章节，需要获取上一个章节的上下文
-        current_chapter_id = None
-        if chapter.order != 0:
+        async with asyncio.timeout(settings.RETRIEVAL_TIMEOUT_SECONDS):
+            print("Generating embedding for chapter title...")
+            query_embedding = await llm_service.get_embedding(chapter.title)
+
+            # 3. Retrieve Relevant Context
+            print("Retrieving relevant context...")
+            # 获取全书顺序中上一个章节的上下文（跨卷；第一章时为空）
             current_chapter_id = chapter_id
-        retrieved_context = await retrieve_relevant_context(db, chapter.project_id, query_embedding, 10,
-                                                            current_chapter_id=current_chapter_id)
+            query_text = llm_service.prepare_text_for_embedding(chapter.title, chapter.summary)
+            retrieved_context = await retrieve_relevant_context(db, chapter.project_id, query_embedding, 10,
+                                                                current_chapter_id=current_chapter_id,
+                                                                query_text=query_text,
+                                                                anchor_chapter_id=chapter_id)
         # print(f"Retrieved Context: {retrieved_context}") # DEBUG
 
         # 4. Format Context
@@ -445,7 +805,8 @@ async def generate_scenes(
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ]
-        generated_text = await llm_service.generate_text(messages, max_tokens=48000)
+        async with asyncio.timeout(settings.GENERATION_TIMEOUT_SECONDS):
+            generated_text = await llm_service.generate_text(messages, max_tokens=48000, use_cache=True)
         print("LLM generation complete.")
         print("\n--- Generated Content (truncated) ---")  # DEBUG
         print(generated_text[:500] + "..." if len(generated_text) > 500 else generated_text)  # DEBUG
@@ -486,6 +847,12 @@ async def generate_scenes(
 
     except HTTPException as http_exc:
         raise http_exc  # Re-raise HTTP exceptions from LLM service or validation
+    except TimeoutError:
+        print(f"Generation scenes for chapter {chapter_id} exceeded its time budget.")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Generation scenes exceeded its time budget."
+        )
     except Exception as e:
         print(f"Error during generation scenes for chapter {chapter_id}: {e}")
         import traceback
@@ -550,20 +917,27 @@ async def generate_scene_content(
 
     print(f"Starting RAG generation for Scene ID: {scene_id}, Goal: '{scene.goal[:100]}...'")
 
+    previous_status = scene.status
     try:
-        # 2. Get Query Embedding (Generate fresh embedding for the current goal)
-        print("Generating embedding for scene goal...")
-        query_embedding = await llm_service.get_embedding(scene.goal)
-
-        # 3. Retrieve Relevant Context
-        print("Retrieving relevant context...")
-        # 如果是章节中的第一个场景，需要查询上一章节
-        current_chapter_id = None
-        if scene.order_in_chapter == 0:
-            current_chapter_id = scene.chapter_id
-        retrieved_context = await retrieve_relevant_context(db, scene.project_id, query_embedding, 10,
-                                                            current_chapter_id=current_chapter_id,
-                                                            current_scene_id=scene_id)
+        # 标记为生成中；写入本身失败也会经过下面的回滚路径，取消、超时或失败时回到原状态
+        scene.status = SceneStatus.GENERATING
+        db.commit()
+
+        async with asyncio.timeout(settings.RETRIEVAL_TIMEOUT_SECONDS):
+            # 2. Get Query Embedding (Generate fresh embedding for the current goal)
+            print("Generating embedding for scene goal...")
+            query_embedding = await llm_service.get_embedding(scene.goal)
+
+            # 3. Retrieve Relevant Context
+            print("Retrieving relevant context...")
+            # 如果是章节中的第一个场景，需要查询上一章节
+            current_chapter_id = None
+            if scene.order_in_chapter == 0:
+                current_chapter_id = scene.chapter_id
+            retrieved_context = await retrieve_relevant_context(db, scene.project_id, query_embedding, 10,
+                                                                current_chapter_id=current_chapter_id,
+                                                                current_scene_id=scene_id,
+                                                                query_text=scene.goal)
         # print(f"Retrieved Context: {retrieved_context}") # DEBUG
 
         # 4. Format Context
@@ -601,7 +975,8 @@ async def generate_scene_content(
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ]
-        generated_text = await llm_service.generate_text(messages, max_tokens=48000)
+        async with asyncio.timeout(settings.GENERATION_TIMEOUT_SECONDS):
+            generated_text = await llm_service.generate_text(messages, max_tokens=48000)
         print("LLM generation complete.")
         print("\n--- Generated Content (truncated) ---")  # DEBUG
         print(generated_text[:500] + "..." if len(generated_text) > 500 else generated_text)  # DEBUG
@@ -617,17 +992,18 @@ async def generate_scene_content(
                 {"role": "system", "content": summarize_system_prompt},
                 {"role": "user", "content": generated_text}
             ]
-            summary = await llm_service.generate_text(messages, max_tokens=28000)
-            scene_update.summary = summary
-            print(f"Generated Summary: {summary[:200]}...")
-            if summary:
-                print("Generating embedding for the summary...")
-                summary_embedding = await llm_service.get_embedding(summary)
-                scene_update.summary_embedding = summary_embedding
-                print("Summary embedding generated.")
-            else:
-                scene_update.summary_embedding = None
-        except Exception as summary_err:
+            async with asyncio.timeout(settings.SUMMARY_TIMEOUT_SECONDS):
+                summary = await llm_service.generate_text(messages, max_tokens=28000, use_cache=True)
+                scene_update.summary = summary
+                print(f"Generated Summary: {summary[:200]}...")
+                if summary:
+                    print("Generating embedding for the summary...")
+                    summary_embedding = await llm_service.get_embedding(summary)
+                    scene_update.summary_embedding = summary_embedding
+                    print("Summary embedding generated.")
+                else:
+                    scene_update.summary_embedding = None
+        except Exception as summary_err:  # 包括超出摘要时间预算的 TimeoutError
             # Don't fail the whole process if summarization fails, just log it
             print(f"Warning: Failed to generate summary or embedding for scene {scene_id}: {summary_err}")
             scene_update.summary = None  # Ensure summary is cleared if generation failed
@@ -638,9 +1014,22 @@ async def generate_scene_content(
         print(f"Successfully generated content and updated Scene ID: {scene_id}")
         return scene
 
+    except asyncio.CancelledError:
+        print(f"RAG generation for scene {scene_id} cancelled, restoring status {previous_status}.")
+        _restore_scene_status(db, scene_id, previous_status)
+        raise
     except HTTPException as http_exc:
+        _restore_scene_status(db, scene_id, previous_status)
         raise http_exc  # Re-raise HTTP exceptions from LLM service or validation
+    except TimeoutError:
+        print(f"RAG generation for scene {scene_id} exceeded its time budget.")
+        _restore_scene_status(db, scene_id, previous_status)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Scene generation exceeded its time budget."
+        )
     except Exception as e:
+        _restore_scene_status(db, scene_id, previous_status)
         print(f"Error during RAG generation for scene {scene_id}: {e}")
         import traceback
         traceback.print_exc()  # Log the full traceback for debugging
@@ -725,7 +1114,8 @@ async def generate_chapter_content(
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ]
-        generated_text = await llm_service.generate_text(messages, max_tokens=48000)
+        async with asyncio.timeout(settings.GENERATION_TIMEOUT_SECONDS):
+            generated_text = await llm_service.generate_text(messages, max_tokens=48000)
         print("LLM generation complete.")
         print("\n--- Generated Content (truncated) ---")  # DEBUG
         print(generated_text[:500] + "..." if len(generated_text) > 500 else generated_text)  # DEBUG
@@ -741,6 +1131,12 @@ async def generate_chapter_content(
 
     except HTTPException as http_exc:
         raise http_exc  # Re-raise HTTP exceptions from LLM service or validation
+    except TimeoutError:
+        print(f"Chapter generation for chapter {chapter_id} exceeded its time budget.")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Chapter generation exceeded its time budget."
+        )
     except Exception as e:
         print(f"Error during RAG generation for chapter {chapter_id}: {e}")
         import traceback
@@ -0,0 +1,282 @@
+# backend/app/services/reindex_service.py
+"""
+向量补齐与重建。
+
+每个向量列旁边有一个签名列（见 llm_service.embedding_signature），
+签名记录了生成向量时的模型、EMBED_VERSION 和源文本的 md5。扫描时用服务层的
+embedding 文本函数重新拼出源文本并计算签名，与存储的签名不一致即为过期：
+- 向量为 NULL（inline embedding 失败）；
+- 源文本改过但向量没有更新；
+- EMBED_MODEL 或 EMBED_VERSION 变了（整个项目都会被重建）。
+
+任务按 id 做 keyset 扫描，每批提交一次并在批次之间休眠，可以随时中断；
+已处理的行签名已经更新，重新运行时会自然跳过，相当于断点续跑。
+"""
+import asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import update, bindparam
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import Character, CharacterRelationship, SettingElement, Scene, Chapter, ScenePassage, \
+    ChapterPassage
+from app.models.structure import Volume
+from app.services import llm_service, character_service, setting_service, relationship_service, chapter_service, \
+    volume_service, scene_service
+
+
+@dataclass(frozen=True)
+class EmbeddingTarget:
+    name: str
+    model: Any
+    vector_attr: str
+    signature_attr: str
+    source_columns: Tuple[str, ...]
+    build_text: Callable[[Any], str]
+
+
+TARGETS: List[EmbeddingTarget] = [
+    EmbeddingTarget("characters", Character, "embedding", "embedding_signature",
+                    ("name", "description", "backstory", "goals", "arc_summary"), character_service.embedding_text),
+    EmbeddingTarget("settings", SettingElement, "embedding", "embedding_signature",
+                    ("name", "description"), setting_service.embedding_text),
+    EmbeddingTarget("relationships", CharacterRelationship, "embedding", "embedding_signature",
+                    ("relationship_type", "description"), relationship_service.embedding_text),
+    EmbeddingTarget("volumes", Volume, "embedding", "embedding_signature",
+                    ("summary",), volume_service.embedding_text),
+    EmbeddingTarget("chapters", Chapter, "embedding", "embedding_signature",
+                    ("summary",), chapter_service.embedding_text),
+    EmbeddingTarget("scene_goals", Scene, "goal_embedding", "goal_embedding_signature",
+                    ("goal",), scene_service.goal_embedding_text),
+    EmbeddingTarget("scene_summaries", Scene, "summary_embedding", "summary_embedding_signature",
+                    ("summary",), scene_service.summary_embedding_text),
+    EmbeddingTarget("scene_passages", ScenePassage, "embedding", "embedding_signature",
+                    ("content",), lambda row: row.content),
+    EmbeddingTarget("chapter_passages", ChapterPassage, "embedding", "embedding_signature",
+                    ("content",), lambda row: row.content),
+]
+TARGETS_BY_NAME: Dict[str, EmbeddingTarget] = {target.name: target for target in TARGETS}
+
+
+def _resolve_targets(names: Optional[Sequence[str]]) -> List[EmbeddingTarget]:
+    if not names:
+        return TARGETS
+    unknown = [name for name in names if name not in TARGETS_BY_NAME]
+    if unknown:
+        raise ValueError(f"Unknown embedding targets: {', '.join(unknown)}")
+    return [TARGETS_BY_NAME[name] for name in names]
+
+
+def _state_query(db: Session, target: EmbeddingTarget):
+    """查询行的 id、向量是否存在、签名和源字段（不读取向量本身）。"""
+    model = target.model
+    vector = getattr(model, target.vector_attr)
+    columns = [getattr(model, column) for column in target.source_columns]
+    return db.query(model.id, (vector != None).label("has_vector"), getattr(model, target.signature_attr), *columns)
+
+
+def _scan(db: Session, target: EmbeddingTarget, project_id: Optional[int], after_id: int, limit: int):
+    model = target.model
+    query = _state_query(db, target).filter(model.id > after_id)
+    if project_id is not None:
+        query = query.filter(model.project_id == project_id)
+    return query.order_by(model.id).limit(limit).all()
+
+
+def _plan_batch(target: EmbeddingTarget, rows, force: bool) -> Tuple[List[Tuple[int, str, str]], List[int]]:
+    """
+    Returns:
+        (需要 embedding 的 [(id, text, signature)], 源文本已为空、需要清除向量的 id)
+    """
+    to_embed, to_clear = [], []
+    for row in rows:
+        row_id, has_vector, stored_signature = row[0], row[1], row[2]
+        source = SimpleNamespace(**dict(zip(target.source_columns, row[3:])))
+        text = target.build_text(source)
+        if not text:
+            if has_vector or stored_signature:
+                to_clear.append(row_id)
+            continue
+        signature = llm_service.embedding_signature(text)
+        if force or not has_vector or stored_signature != signature:
+            to_embed.append((row_id, text, signature))
+    return to_embed, to_clear
+
+
+def _write(db: Session, target: EmbeddingTarget, rows: List[Dict[str, Any]], with_vector: bool = True) -> None:
+    """
+    按 id 批量写入向量和签名。rows 中的键为 row_id / vector / signature。
+
+    使用 Core executemany 并显式保留 updated_at：重建向量不算内容修改。
+    """
+    table = target.model.__table__
+    values = {target.signature_attr: bindparam("signature", type_=table.c[target.signature_attr].type)}
+    if with_vector:
+        values[target.vector_attr] = bindparam("vector", type_=table.c[target.vector_attr].type)
+    if "updated_at" in table.c:
+        values["updated_at"] = table.c.updated_at
+    db.execute(update(table).where(table.c.id == bindparam("row_id")).values(values), rows)
+
+
+async def _embed_batch(db: Session, target: EmbeddingTarget, rows, force: bool) -> int:
+    """对一批扫描结果中过期的行计算向量并提交，返回更新的行数。"""
+    to_embed, to_clear = _plan_batch(target, rows, force)
+    if not to_embed and not to_clear:
+        return 0
+    embeddings = await llm_service.get_embeddings([text for _, text, _ in to_embed]) if to_embed else []
+    values = [{"row_id": row_id, "vector": embedding, "signature": signature}
+              for (row_id, _, signature), embedding in zip(to_embed, embeddings)]
+    values += [{"row_id": row_id, "vector": None, "signature": None} for row_id in to_clear]
+    _write(db, target, values)
+    db.commit()
+    return len(values)
+
+
+async def embed_rows(db: Session, target_name: str, row_ids: Sequence[int]) -> int:
+    """
+    为指定的行补齐向量（签名已是最新的行会被跳过），供后写 embedding 队列使用。
+
+    Returns:
+        更新的行数。
+    """
+    target = _resolve_targets([target_name])[0]
+    rows = _state_query(db, target).filter(target.model.id.in_(list(row_ids))).order_by(target.model.id).all()
+    return await _embed_batch(db, target, rows, force=False)
+
+
+def count_stale(db: Session, project_id: Optional[int] = None, targets: Optional[Sequence[str]] = None,
+                force: bool = False) -> Dict[str, int]:
+    """统计每个目标中缺失或过期的向量数量（只读）。"""
+    counts = {}
+    batch_size = max(settings.REINDEX_BATCH_SIZE, 1) * 10
+    for target in _resolve_targets(targets):
+        stale, after_id = 0, 0
+        while True:
+            rows = _scan(db, target, project_id, after_id, batch_size)
+            if not rows:
+                break
+            to_embed, to_clear = _plan_batch(target, rows, force)
+            stale += len(to_embed) + len(to_clear)
+            after_id = rows[-1][0]
+        counts[target.name] = stale
+    return counts
+
+
+async def run_reindex(
+        db: Session,
+        project_id: Optional[int] = None,
+        targets: Optional[Sequence[str]] = None,
+        force: bool = False,
+        batch_size: Optional[int] = None,
+        throttle_seconds: Optional[float] = None,
+) -> Dict[str, int]:
+    """
+    补齐/重建缺失或过期的向量。
+
+    Args:
+        project_id: 只处理该项目；为 None 时处理所有项目。
+        targets: 目标名称列表（见 TARGETS），为空时处理全部。
+        force: 忽略签名，全部重新 embedding。
+        batch_size: 每批扫描的行数，默认 REINDEX_BATCH_SIZE。
+        throttle_seconds: 批次之间的休眠时间，默认 REINDEX_THROTTLE_SECONDS。
+
+    Returns:
+        每个目标重新 embedding（含清除）的行数。
+    """
+    batch_size = batch_size or settings.REINDEX_BATCH_SIZE
+    throttle_seconds = settings.REINDEX_THROTTLE_SECONDS if throttle_seconds is None else throttle_seconds
+    results = {}
+    for target in _resolve_targets(targets):
+        processed, after_id = 0, 0
+        while True:
+            rows = _scan(db, target, project_id, after_id, batch_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            updated = await _embed_batch(db, target, rows, force)
+            if not updated:
+                continue
+            processed += updated
+            print(f"Reindex {target.name}: {processed} rows updated (up to id {after_id}).")
+            if throttle_seconds > 0:
+                await asyncio.sleep(throttle_seconds)
+        results[target.name] = processed
+    return results
+
+
+def adopt_existing(db: Session, project_id: Optional[int] = None,
+                   targets: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """
+    为已有向量但还没有签名的行补写当前签名，不调用 embedding 接口。
+
+    用于升级后第一次运行：确认现有向量就是当前模型生成的，避免全部重建。
+    """
+    results = {}
+    batch_size = max(settings.REINDEX_BATCH_SIZE, 1) * 10
+    for target in _resolve_targets(targets):
+        adopted, after_id = 0, 0
+        while True:
+            rows = _scan(db, target, project_id, after_id, batch_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            values = []
+            for row in rows:
+                row_id, has_vector, stored_signature = row[0], row[1], row[2]
+                if not has_vector or stored_signature is not None:
+                    continue
+                text = target.build_text(SimpleNamespace(**dict(zip(target.source_columns, row[3:]))))
+                if text:
+                    values.append({"row_id": row_id, "signature": llm_service.embedding_signature(text)})
+            if values:
+                _write(db, target, values, with_vector=False)
+                db.commit()
+                adopted += len(values)
+        results[target.name] = adopted
+    return results
+
+
+# --- 后台任务（供 API 触发） ---
+
+_running_jobs: Dict[int, asyncio.Task] = {}
+
+
+def is_running(project_id: int) -> bool:
+    task = _running_jobs.get(project_id)
+    return task is not None and not task.done()
+
+
+def start_background_reindex(project_id: int, force: bool = False,
+                             targets: Optional[Sequence[str]] = None) -> bool:
+    """
+    在当前事件循环中启动项目的重建任务。
+
+    Returns:
+        该项目已有任务在运行时返回 False。
+    """
+    _resolve_targets(targets)  # 提前校验目标名称
+    if is_running(project_id):
+        return False
+
+    async def _run():
+        db = SessionLocal()
+        try:
+            results = await run_reindex(db, project_id=project_id, targets=targets, force=force)
+            print(f"Reindex of project {project_id} finished: {results}")
+        except Exception as e:
+            print(f"Reindex of project {project_id} failed: {e}")
+        finally:
+            db.close()
+
+    def _forget(task: asyncio.Task) -> None:
+        if _running_jobs.get(project_id) is task:
+            del _running_jobs[project_id]
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _running_jobs[project_id] = task
+    task.add_done_callback(_forget)
+    return True
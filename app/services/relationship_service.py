@@ -1,18 +1,25 @@
 # backend/app/services/relationship_service.py
-from typing import List, Optional
+from typing import Optional
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.models.character import CharacterRelationship
 from app.schemas.relationship import CharacterRelationshipCreate, CharacterRelationshipUpdate
-from app.services.llm_service import get_embedding, prepare_text_for_embedding
+from app.services.llm_service import prepare_text_for_embedding
+from app.services import embedding_worker
+from app.utils import fieldsets, pagination
 from .character_service import get_character  # 引入 get_character 用于校验
 
 
+def embedding_text(relationship: CharacterRelationship) -> str:
+    """人物关系用于 Embedding 的文本（重建任务也使用这个函数）"""
+    return prepare_text_for_embedding(relationship.relationship_type, relationship.description)
+
+
 async def create_character_relationship(db: Session,
                                         relationship: CharacterRelationshipCreate) -> CharacterRelationship:
-    """创建新的人物关系并生成 Embedding"""
+    """创建新的人物关系，Embedding 由后台队列生成"""
 
     # 1. 验证 Project 存在 (虽然外键会处理，但提前校验更友好)
     #    这里省略，假设 project_id 来源于可信上下文 (如 URL 参数已验证)
@@ -28,21 +35,16 @@ async def create_character_relationship(db: Session,
     if char1.id == char2.id:  # 双重检查，虽然 schema validator 做了
         raise ValueError("Cannot create a relationship with the same character.")
 
-    # 3. 准备 Embedding
-    text_for_embedding = prepare_text_for_embedding(relationship.relationship_type, relationship.description)
-    embedding_vector = await get_embedding(text_for_embedding)
-
-    # 4. 创建对象
-    db_relationship = CharacterRelationship(
-        **relationship.model_dump(),
-        embedding=embedding_vector
-    )
+    # 3. 创建对象
+    db_relationship = CharacterRelationship(**relationship.model_dump())
 
-    # 5. 添加到数据库并处理唯一约束
+    # 4. 添加到数据库并处理唯一约束
     db.add(db_relationship)
     try:
         db.commit()
         db.refresh(db_relationship)
+        # 5. Embedding 交给后台队列
+        embedding_worker.enqueue("relationships", db_relationship.id)
         return db_relationship
     except IntegrityError as e:
         db.rollback()
@@ -62,26 +64,34 @@ def get_character_relationship(db: Session, relationship_id: int) -> Optional[Ch
     return db.query(CharacterRelationship).filter(CharacterRelationship.id == relationship_id).first()
 
 
-def get_relationships_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[
-    CharacterRelationship]:
-    """获取指定项目下的人物关系列表（分页）"""
+def _sparse(query, fields: Optional[fieldsets.FieldSet]):
+    return query.options(*fieldsets.load_options(CharacterRelationship, fields)) if fields is not None else query
+
+
+def get_relationships_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                                 cursor: Optional[str] = None,
+                                 fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """获取指定项目下的人物关系列表（按 id 游标分页），fields 不为空时只查询其中的列"""
     # 这里可以添加 .options(joinedload(CharacterRelationship.character1), joinedload(CharacterRelationship.character2))
     # 如果 Read Schema 需要嵌套角色信息
-    return db.query(CharacterRelationship).filter(CharacterRelationship.project_id == project_id).offset(skip).limit(
-        limit).all()
+    query = _sparse(db.query(CharacterRelationship), fields).filter(CharacterRelationship.project_id == project_id)
+    return pagination.paginate(query, [CharacterRelationship.id], limit, cursor, skip)
 
 
-def get_relationships_for_character(db: Session, character_id: int) -> List[CharacterRelationship]:
-    """获取指定角色的所有关系"""
-    return db.query(CharacterRelationship).filter(
+def get_relationships_for_character(db: Session, character_id: int, skip: int = 0, limit: int = 100,
+                                    cursor: Optional[str] = None,
+                                    fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """获取指定角色的关系（按 id 游标分页）"""
+    query = _sparse(db.query(CharacterRelationship), fields).filter(
         (CharacterRelationship.character1_id == character_id) |
         (CharacterRelationship.character2_id == character_id)
-    ).all()
+    )
+    return pagination.paginate(query, [CharacterRelationship.id], limit, cursor, skip)
 
 
 async def update_character_relationship(db: Session, db_relationship: CharacterRelationship,
                                         relationship_in: CharacterRelationshipUpdate) -> CharacterRelationship:
-    """更新人物关系信息，如果相关字段变化则重新生成 Embedding"""
+    """更新人物关系信息，如果相关字段变化则排队重新生成 Embedding"""
     update_data = relationship_in.model_dump(exclude_unset=True)
     needs_re_embedding = False
     current_data = {}
@@ -99,18 +109,13 @@ async def update_character_relationship(db: Session, db_relationship: CharacterR
     for key, value in update_data.items():
         setattr(db_relationship, key, value)
 
-    # 如果需要，重新生成并更新 embedding
-    if needs_re_embedding:
-        text_for_embedding = prepare_text_for_embedding(
-            update_data.get("relationship_type", current_data.get("relationship_type")),
-            update_data.get("description", current_data.get("description"))
-        )
-        db_relationship.embedding = await get_embedding(text_for_embedding)
-
     db.add(db_relationship)
     try:
         db.commit()
         db.refresh(db_relationship)
+        # 如果需要，由后台队列重新生成 embedding（写回前继续使用旧向量）
+        if needs_re_embedding:
+            embedding_worker.enqueue("relationships", db_relationship.id)
         return db_relationship
     except IntegrityError:
         db.rollback()
@@ -7,7 +7,18 @@ from sqlalchemy.orm import Session, selectinload
 from app.models import Scene, Project, Chapter  # Assuming models are correctly imported
 from app.schemas import SceneCreate, SceneUpdate
 from app.schemas.scene import SceneUpdateGenerated
-from app.services import llm_service
+from app.services import llm_service, mention_service, position_service, summary_service, passage_service
+from app.utils import fieldsets, pagination
+
+
+def goal_embedding_text(scene: Scene) -> str:
+    """Text used for the goal embedding (also used by the re-index job)."""
+    return llm_service.prepare_text_for_embedding(scene.goal)
+
+
+def summary_embedding_text(scene: Scene) -> str:
+    """Text used for the summary embedding (also used by the re-index job)."""
+    return llm_service.prepare_text_for_embedding(scene.summary)
 
 
 async def _generate_and_set_goal_embedding(db: Session, scene: Scene):
@@ -15,14 +26,28 @@ async def _generate_and_set_goal_embedding(db: Session, scene: Scene):
     if scene.goal:
         try:
             # IMPORTANT: Call the actual embedding function here
-            goal_embedding = await llm_service.get_embedding(scene.goal)
+            text_for_embedding = goal_embedding_text(scene)
+            goal_embedding = await llm_service.get_embedding(text_for_embedding)
             scene.goal_embedding = goal_embedding
+            scene.goal_embedding_signature = llm_service.embedding_signature(text_for_embedding)
             # No commit here, assumes caller will commit
         except Exception as e:
+            # 向量缺失，由重建任务 (app/scripts/reindex.py) 补齐
             print(f"Error generating embedding for scene {scene.id} goal: {e}")  # Replace with proper logging
             scene.goal_embedding = None  # Clear or leave as is? Decide policy.
+            scene.goal_embedding_signature = None
     else:
         scene.goal_embedding = None
+        scene.goal_embedding_signature = None
+
+
+async def _sync_passages(db: Session, scene: Scene):
+    """Internal helper to refresh the passage index after prose changes."""
+    try:
+        await passage_service.sync_scene_passages(db, scene)
+        # No commit here, assumes caller will commit
+    except Exception as e:
+        print(f"Error indexing passages for scene {scene.id}: {e}")  # 段落索引失败不影响正文保存
 
 
 async def create_scene(db: Session, scene: SceneCreate) -> Scene:
@@ -49,6 +74,10 @@ async def create_scene(db: Session, scene: SceneCreate) -> Scene:
     await _generate_and_set_goal_embedding(db, db_scene)
 
     db.add(db_scene)
+    # 根据目标中点名的角色/设定自动补充关联
+    mention_service.sync_scene_associations(db, db_scene)
+    if db_scene.chapter_id is not None:
+        position_service.renumber_project(db, db_scene.project_id)
     db.commit()
     db.refresh(db_scene)
     return db_scene
@@ -61,40 +90,47 @@ def get_scene(db: Session, scene_id: int) -> Optional[Scene]:
     ).filter(Scene.id == scene_id).first()
 
 
-def get_scenes_by_chapter(db: Session, chapter_id: int, skip: int = 0, limit: int = 100) -> List[Scene]:
-    """Gets all scenes for a specific chapter, ordered by 'order_in_chapter'."""
+def _sparse(query, fields: Optional[fieldsets.FieldSet]):
+    return query.options(*fieldsets.load_options(Scene, fields)) if fields is not None else query
+
+
+def get_scenes_by_chapter(db: Session, chapter_id: int, skip: int = 0, limit: int = 100,
+                          cursor: Optional[str] = None,
+                          fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """Gets a page of scenes for a specific chapter, ordered by ('order_in_chapter', id)."""
     # Check if chapter exists
     chapter = db.get(Chapter, chapter_id)
     if not chapter:
         raise ValueError(f"Chapter with id {chapter_id} not found")
 
-    return db.query(Scene).filter(
-        Scene.chapter_id == chapter_id).order_by(Scene.order_in_chapter).all()
+    query = _sparse(db.query(Scene), fields).filter(Scene.chapter_id == chapter_id)
+    return pagination.paginate(query, [Scene.order_in_chapter, Scene.id], limit, cursor, skip)
 
 
-def get_scenes_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[Scene]:
-    """Gets scenes belonging to a project ."""
+def get_scenes_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                          cursor: Optional[str] = None,
+                          fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """Gets a page of scenes belonging to a project, ordered by (created_at, id)."""
     # Check if project exists
     project = db.get(Project, project_id)
     if not project:
         raise ValueError(f"Project with id {project_id} not found")
 
-    return db.query(Scene).filter(
-        Scene.project_id == project_id).order_by(
-        Scene.created_at).offset(skip).limit(limit).all()
+    query = _sparse(db.query(Scene), fields).filter(Scene.project_id == project_id)
+    return pagination.paginate(query, [Scene.created_at, Scene.id], limit, cursor, skip)
 
 
-def get_scenes_by_project_unassigned(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[
-    Scene]:
+def get_scenes_by_project_unassigned(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                                     cursor: Optional[str] = None,
+                                     fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
     """Gets scenes belonging to a project but not assigned to any chapter."""
     # Check if project exists
     project = db.get(Project, project_id)
     if not project:
         raise ValueError(f"Project with id {project_id} not found")
 
-    return db.query(Scene).filter(
-        Scene.project_id == project_id, Scene.chapter_id == None).order_by(
-        Scene.created_at).offset(skip).limit(limit).all()
+    query = _sparse(db.query(Scene), fields).filter(Scene.project_id == project_id, Scene.chapter_id == None)
+    return pagination.paginate(query, [Scene.created_at, Scene.id], limit, cursor, skip)
 
 
 async def update_scene_generated(db: Session, scene_id: int, scene_update: SceneUpdateGenerated) -> Optional[Scene]:
@@ -103,6 +139,7 @@ async def update_scene_generated(db: Session, scene_id: int, scene_update: Scene
     if not db_scene:
         return None
     update_data = scene_update.model_dump(exclude_unset=True)
+    previous_summary = db_scene.summary
 
     for key, value in update_data.items():
         if value is not None:
@@ -111,9 +148,16 @@ async def update_scene_generated(db: Session, scene_id: int, scene_update: Scene
                 continue
             setattr(db_scene, key, value)
 
+    if update_data.get('summary_embedding') is not None:
+        db_scene.summary_embedding_signature = llm_service.embedding_signature(summary_embedding_text(db_scene))
+    mention_service.sync_scene_associations(db, db_scene)
+    if 'generated_content' in update_data:
+        await _sync_passages(db, db_scene)
     db.add(db_scene)
     db.commit()
     db.refresh(db_scene)
+    if db_scene.summary != previous_summary:
+        summary_service.schedule_chapter_rollup(db_scene.chapter_id)
     return db_scene
 
 
@@ -125,6 +169,10 @@ async def update_scene_metadata(db: Session, scene_id: int, scene_update: SceneU
 
     update_data = scene_update.model_dump(exclude_unset=True)
     needs_embedding_update = False
+    needs_association_sync = False
+    needs_renumber = False
+    needs_passage_sync = False
+    previous_chapter_id, previous_summary = db_scene.chapter_id, db_scene.summary
 
     # Check if chapter is being changed and validate new chapter
     if 'chapter_id' in update_data and update_data['chapter_id'] is not None:
@@ -143,13 +191,30 @@ async def update_scene_metadata(db: Session, scene_id: int, scene_update: SceneU
             setattr(db_scene, key, value)
             if key == 'goal':
                 needs_embedding_update = True
+            if key in ('title', 'goal', 'generated_content'):
+                needs_association_sync = True
+            if key in ('chapter_id', 'order_in_chapter'):
+                needs_renumber = True
+            if key == 'generated_content':
+                needs_passage_sync = True
 
     if needs_embedding_update:
         await _generate_and_set_goal_embedding(db, db_scene)
+    if needs_association_sync:
+        mention_service.sync_scene_associations(db, db_scene)
+    if needs_passage_sync:
+        await _sync_passages(db, db_scene)
 
     db.add(db_scene)  # Add to session context if detached
+    if needs_renumber:
+        position_service.renumber_project(db, db_scene.project_id)
     db.commit()
     db.refresh(db_scene)
+    # 概要变化、移动或调整顺序都会影响所在章节的滚动摘要
+    if db_scene.summary != previous_summary or needs_renumber:
+        summary_service.schedule_chapter_rollup(db_scene.chapter_id)
+        if previous_chapter_id != db_scene.chapter_id:
+            summary_service.schedule_chapter_rollup(previous_chapter_id)
     return db_scene
 
 
@@ -158,14 +223,24 @@ def delete_scene(db: Session, scene_id: int) -> Optional[Scene]:
     db_scene = db.get(Scene, scene_id)
     if db_scene:
         db.delete(db_scene)
+        if db_scene.chapter_id is not None:
+            position_service.renumber_project(db, db_scene.project_id)
         db.commit()
+        if db_scene.summary:
+            summary_service.schedule_chapter_rollup(db_scene.chapter_id)
     return db_scene
 
 
 def delete_scenes_by_chapter(db: Session, chapter_id: int) -> List[Scene]:
     """Deletes a scene."""
-    scenes = get_scenes_by_chapter(db, chapter_id)
+    scenes = db.query(Scene).filter(Scene.chapter_id == chapter_id).all()
+    project_ids = {scene.project_id for scene in scenes}
     for scene in scenes:
         db.delete(scene)
         db.commit()
+    for project_id in project_ids:
+        position_service.renumber_project(db, project_id)
+    db.commit()
+    if any(scene.summary for scene in scenes):
+        summary_service.schedule_chapter_rollup(chapter_id)
     return scenes
@@ -1,26 +1,29 @@
 # backend/app/services/setting_service.py
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import Optional
 
 from app.models.setting import SettingElement
 from app.schemas.setting import SettingElementCreate, SettingElementUpdate
-from app.services.llm_service import get_embedding, prepare_text_for_embedding
+from app.services.llm_service import prepare_text_for_embedding
+from app.services import mention_service, embedding_worker
+from app.utils import fieldsets, pagination
+
+
+def embedding_text(setting: SettingElement) -> str:
+    """设定元素用于 Embedding 的文本（重建任务也使用这个函数）"""
+    return prepare_text_for_embedding(setting.name, setting.description)
 
 
 async def create_setting_element(db: Session, setting: SettingElementCreate) -> SettingElement:
-    """创建新设定元素并生成 Embedding"""
-    text_for_embedding = prepare_text_for_embedding(setting.name, setting.description)
-    embedding_vector = await get_embedding(text_for_embedding)
-
-    db_setting = SettingElement(
-        **setting.model_dump(),
-        embedding=embedding_vector
-    )
+    """创建新设定元素，Embedding 由后台队列生成"""
+    db_setting = SettingElement(**setting.model_dump())
     db.add(db_setting)
     try:
         db.commit()
         db.refresh(db_setting)
+        embedding_worker.enqueue("settings", db_setting.id)
+        mention_service.on_setting_saved(db, db_setting)
         return db_setting
     except IntegrityError as e:
         db.rollback()
@@ -38,15 +41,19 @@ def get_setting_element(db: Session, setting_element_id: int) -> Optional[Settin
     return db.query(SettingElement).filter(SettingElement.id == setting_element_id).first()
 
 
-def get_setting_elements_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[
-    SettingElement]:
-    """获取指定项目下的设定元素列表（分页）"""
-    return db.query(SettingElement).filter(SettingElement.project_id == project_id).offset(skip).limit(limit).all()
+def get_setting_elements_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                                    cursor: Optional[str] = None,
+                                    fields: Optional[fieldsets.FieldSet] = None) -> pagination.Page:
+    """获取指定项目下的设定元素列表（按 id 游标分页），fields 不为空时只查询其中的列"""
+    query = db.query(SettingElement).filter(SettingElement.project_id == project_id)
+    if fields is not None:
+        query = query.options(*fieldsets.load_options(SettingElement, fields))
+    return pagination.paginate(query, [SettingElement.id], limit, cursor, skip)
 
 
 async def update_setting_element(db: Session, db_setting: SettingElement,
                                  setting_in: SettingElementUpdate) -> SettingElement:
-    """更新设定元素信息，如果相关字段变化则重新生成 Embedding"""
+    """更新设定元素信息，如果相关字段变化则排队重新生成 Embedding"""
     update_data = setting_in.model_dump(exclude_unset=True)
     needs_re_embedding = False
     current_data = {}
@@ -64,18 +71,14 @@ async def update_setting_element(db: Session, db_setting: SettingElement,
     for key, value in update_data.items():
         setattr(db_setting, key, value)
 
-    # 如果需要，重新生成并更新 embedding
-    if needs_re_embedding:
-        text_for_embedding = prepare_text_for_embedding(
-            update_data.get("name", current_data.get("name")),
-            update_data.get("description", current_data.get("description"))
-        )
-        db_setting.embedding = await get_embedding(text_for_embedding)
-
     db.add(db_setting)
     try:
         db.commit()
         db.refresh(db_setting)
+        # 如果需要，由后台队列重新生成 embedding（写回前继续使用旧向量）
+        if needs_re_embedding:
+            embedding_worker.enqueue("settings", db_setting.id)
+        mention_service.on_setting_saved(db, db_setting)
         return db_setting
     except IntegrityError:
         db.rollback()
@@ -95,4 +98,5 @@ def delete_setting_element(db: Session, setting_element_id: int) -> Optional[Set
     if db_setting:
         db.delete(db_setting)
         db.commit()
+        mention_service.on_setting_deleted(db, db_setting)
     return db_setting
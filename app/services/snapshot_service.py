@@ -0,0 +1,193 @@
+# backend/app/services/snapshot_service.py
+"""
+项目快照：编辑器打开项目时一次请求拿到卷、章节、场景、角色、设定和人物关系。
+
+- 查询数量固定：项目、卷、章节、已归属章节的场景、未归属的场景、角色、设定、人物关系各一条，
+  与项目大小无关（不使用 selectinload，它会按 500 个 id 一批拆成多条 IN 查询）；
+  fields 中没有请求的部分不查询；
+- 所有查询在同一个 REPEATABLE READ 事务中执行，看到的是同一时刻的数据；
+- 章节和场景按 (卷顺序, 章节顺序, 场景顺序) 用服务端游标（yield_per）分批读取，边读边拼接嵌套的 JSON，
+  内存占用与项目大小无关；输出攒够 SNAPSHOT_CHUNK_BYTES 字节发送一块；
+- 只加载 schema 中的列（load_only），不会读取向量列。
+"""
+from typing import Callable, Iterable, Iterator, Optional, Type
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import Character, CharacterRelationship, Project, Scene, SettingElement
+from app.models.structure import Chapter, Volume
+from app.schemas import ChapterRead, ProjectSnapshot, SceneRead, VolumeRead
+from app.utils import fieldsets
+from app.utils.serialization import ORJSON_OPTIONS, dump_orm, nested_schema
+
+ROWS_PER_FETCH = 1000
+
+# (字段名, 模型, 查询过滤条件, 排序键)：项目下的平铺列表
+FLAT_SECTIONS = [
+    ("unassigned_scenes", Scene, lambda project_id: [Scene.project_id == project_id, Scene.chapter_id == None],
+     [Scene.created_at, Scene.id]),
+    ("characters", Character, lambda project_id: [Character.project_id == project_id], [Character.id]),
+    ("setting_elements", SettingElement, lambda project_id: [SettingElement.project_id == project_id],
+     [SettingElement.id]),
+    ("relationships", CharacterRelationship, lambda project_id: [CharacterRelationship.project_id == project_id],
+     [CharacterRelationship.id]),
+]
+TREE_SECTION = "volumes"
+
+
+class _Rows:
+    """只向前读取的行迭代器，可以查看下一行，用来把有序的子行归并到父行下。"""
+
+    def __init__(self, rows: Iterable):
+        self._rows = iter(rows)
+        self.head = next(self._rows, None)
+
+    def take_while(self, predicate: Callable) -> Iterator:
+        while self.head is not None and predicate(self.head):
+            row = self.head
+            self.head = next(self._rows, None)
+            yield row
+
+
+def _requested(fields: Optional[fieldsets.FieldSet], name: str) -> bool:
+    return fields is None or name in fields
+
+
+def _dump(obj, schema: Type[BaseModel], flat: fieldsets.FieldSet) -> bytes:
+    return orjson.dumps(dump_orm(obj, schema, flat), option=ORJSON_OPTIONS)
+
+
+def _open_list(obj_json: bytes, name: str) -> bytes:
+    """把对象的 JSON 去掉结尾的 }，接上 "name":[ ，后面继续输出列表元素。"""
+    body = obj_json[:-1]
+    return body + (b"," if body != b"{" else b"") + orjson.dumps(name) + b":["
+
+
+def _join(items: Iterable[bytes]) -> Iterator[bytes]:
+    for index, item in enumerate(items):
+        yield b"," + item if index else item
+
+
+def _load(model, flat: fieldsets.FieldSet, *extra: str) -> list:
+    return fieldsets.load_options(model, {**flat, **{name: None for name in extra}})
+
+
+def _scene_rows(db: Session, project_id: int, flat: fieldsets.FieldSet) -> Iterable[Scene]:
+    return db.query(Scene) \
+        .options(*_load(Scene, flat, "chapter_id")) \
+        .join(Chapter, Scene.chapter_id == Chapter.id) \
+        .join(Volume, Chapter.volume_id == Volume.id) \
+        .filter(Volume.project_id == project_id) \
+        .order_by(Volume.order, Volume.id, Chapter.order, Chapter.id, Scene.order_in_chapter, Scene.id) \
+        .yield_per(ROWS_PER_FETCH)
+
+
+def _chapter_rows(db: Session, project_id: int, flat: fieldsets.FieldSet) -> Iterable[Chapter]:
+    return db.query(Chapter) \
+        .options(*_load(Chapter, flat, "volume_id")) \
+        .join(Volume, Chapter.volume_id == Volume.id) \
+        .filter(Volume.project_id == project_id) \
+        .order_by(Volume.order, Volume.id, Chapter.order, Chapter.id) \
+        .yield_per(ROWS_PER_FETCH)
+
+
+def _chapter_json(chapter: Chapter, flat: fieldsets.FieldSet, scenes: Optional[_Rows],
+                  scene_flat: fieldsets.FieldSet) -> Iterator[bytes]:
+    if scenes is None:
+        yield _dump(chapter, ChapterRead, flat)
+        return
+    yield _open_list(_dump(chapter, ChapterRead, flat), "scenes")
+    yield from _join(_dump(scene, SceneRead, scene_flat)
+                     for scene in scenes.take_while(lambda scene: scene.chapter_id == chapter.id))
+    yield b"]}"
+
+
+def _tree_json(db: Session, project_id: int, fields: Optional[fieldsets.FieldSet]) -> Iterator[bytes]:
+    """卷 -> 章节 -> 场景。章节和场景两条查询按相同的顺序流式读取，依次归并到所属的卷和章节下。"""
+    volume_flat = fieldsets.scalar_fields(VolumeRead, fields)
+    volumes = db.query(Volume) \
+        .options(*_load(Volume, volume_flat)) \
+        .filter(Volume.project_id == project_id) \
+        .order_by(Volume.order, Volume.id) \
+        .all()
+    if not _requested(fields, "chapters"):
+        yield from _join(_dump(volume, VolumeRead, volume_flat) for volume in volumes)
+        return
+
+    chapter_fields = fields.get("chapters") if fields is not None else None
+    chapter_flat = fieldsets.scalar_fields(ChapterRead, chapter_fields)
+    chapters = _Rows(_chapter_rows(db, project_id, chapter_flat))
+    scenes, scene_flat = None, {}
+    if _requested(chapter_fields, "scenes"):
+        scene_fields = chapter_fields.get("scenes") if chapter_fields is not None else None
+        scene_flat = fieldsets.scalar_fields(SceneRead, scene_fields)
+        scenes = _Rows(_scene_rows(db, project_id, scene_flat))
+
+    for index, volume in enumerate(volumes):
+        if index:
+            yield b","
+        yield _open_list(_dump(volume, VolumeRead, volume_flat), "chapters")
+        volume_chapters = chapters.take_while(lambda chapter: chapter.volume_id == volume.id)
+        for chapter_index, chapter in enumerate(volume_chapters):
+            if chapter_index:
+                yield b","
+            yield from _chapter_json(chapter, chapter_flat, scenes, scene_flat)
+        yield b"]}"
+
+
+def _snapshot_json(db: Session, project_id: int, fields: Optional[fieldsets.FieldSet]) -> Iterator[bytes]:
+    project_flat = fieldsets.scalar_fields(ProjectSnapshot, fields)
+    project = db.query(Project) \
+        .options(*_load(Project, project_flat)) \
+        .filter(Project.id == project_id) \
+        .first()
+    if project is None:
+        yield b"null"  # 路由检查之后项目被删除了
+        return
+
+    output = _dump(project, ProjectSnapshot, project_flat)
+    sections = [name for name in [TREE_SECTION, *(section[0] for section in FLAT_SECTIONS)]
+                if _requested(fields, name)]
+    for name in sections:
+        yield _open_list(output, name)
+        output = b"]}"
+        section_fields = fields.get(name) if fields is not None else None
+        if name == TREE_SECTION:
+            yield from _tree_json(db, project_id, section_fields)
+            continue
+        _, model, criteria, order = next(section for section in FLAT_SECTIONS if section[0] == name)
+        schema, _ = nested_schema(ProjectSnapshot.model_fields[name].annotation)
+        flat = fieldsets.scalar_fields(schema, section_fields)
+        rows = db.query(model) \
+            .options(*_load(model, flat)) \
+            .filter(*criteria(project_id)) \
+            .order_by(*order) \
+            .yield_per(ROWS_PER_FETCH)
+        yield from _join(_dump(row, schema, flat) for row in rows)
+    yield output
+
+
+def stream_snapshot(project_id: int, fields: Optional[fieldsets.FieldSet] = None) -> Iterator[bytes]:
+    """
+    按 ProjectSnapshot 输出项目快照的 JSON 分块。
+
+    使用自己的数据库会话（流式响应在路由函数返回之后才开始读取），读完或客户端断开时关闭。
+    """
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        buffer = bytearray()
+        for piece in _snapshot_json(db, project_id, fields):
+            buffer += piece
+            if len(buffer) >= settings.SNAPSHOT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,256 @@
+# backend/app/services/summary_service.py
+"""
+分层滚动摘要：场景概要 → 章节 rolling_summary → 卷 rolling_summary。
+
+场景概要变化时只标记所在章节；调度器在静默 ROLLUP_DEBOUNCE_SECONDS 秒后
+把这段时间内积累的章节一次性处理，再重算受影响的卷。章节汇总结果没有变化时不会触发卷的重算。
+LLM 调用开启 use_cache，输入不变时直接命中缓存。
+
+生成时 build_story_so_far() 按固定字符预算拼出"前情提要"，与全书长度无关。
+"""
+import asyncio
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.structure import Volume, Chapter, Scene
+from app.services import llm_service
+
+ROLLUP_CONCURRENCY = 4
+
+CHAPTER_ROLLUP_PROMPT = """
+角色： AI小说编辑。
+任务： 根据下面按顺序给出的场景概要，写出本章到目前为止的剧情梗概。
+要求：
+按时间顺序交代主要事件、冲突和人物关系的变化，保留后续情节需要的伏笔和未解决的问题。
+不得添加原文没有的内容。
+不超过 {max_chars} 个字。
+输出： 仅输出梗概正文。
+"""
+
+VOLUME_ROLLUP_PROMPT = """
+角色： AI小说编辑。
+任务： 根据下面按顺序给出的各章梗概，写出本卷到目前为止的剧情梗概。
+要求：
+突出主线进展、关键转折和人物状态的变化，保留尚未解决的悬念。
+不得添加原文没有的内容。
+不超过 {max_chars} 个字。
+输出： 仅输出梗概正文。
+"""
+
+
+async def _summarize(system_prompt: str, items: List[str], max_chars: int) -> Optional[str]:
+    if not items:
+        return None
+    messages = [
+        {"role": "system", "content": system_prompt.format(max_chars=max_chars)},
+        {"role": "user", "content": "\n".join(items)},
+    ]
+    async with asyncio.timeout(settings.SUMMARY_TIMEOUT_SECONDS):
+        result = await llm_service.generate_text(messages, max_tokens=max_chars * 2, use_cache=True)
+    return result.strip()[:max_chars] or None
+
+
+def _chapter_rollup_items(db: Session, chapter: Chapter) -> List[str]:
+    scenes = db.query(Scene) \
+        .filter(Scene.chapter_id == chapter.id) \
+        .order_by(Scene.order_in_chapter, Scene.id) \
+        .all()
+    return [f"{index + 1}. {scene.title or '未命名场景'}: {scene.summary.strip()}"
+            for index, scene in enumerate(scenes) if scene.summary]
+
+
+def _volume_rollup_items(db: Session, volume: Volume) -> List[str]:
+    chapters = db.query(Chapter) \
+        .filter(Chapter.volume_id == volume.id) \
+        .order_by(Chapter.order, Chapter.id) \
+        .all()
+    return [f"第 {chapter.order + 1} 章 {chapter.title}: {(chapter.rolling_summary or chapter.summary).strip()}"
+            for chapter in chapters if chapter.rolling_summary or chapter.summary]
+
+
+async def rollup_chapters(db: Session, chapter_ids: Iterable[int]) -> None:
+    """重算一批章节的滚动摘要，以及其中发生变化的章节所在卷的滚动摘要。"""
+    chapters = db.query(Chapter).filter(Chapter.id.in_(list(chapter_ids))).all()
+    semaphore = asyncio.Semaphore(ROLLUP_CONCURRENCY)
+
+    async def summarize_chapter(items: List[str]) -> Optional[str]:
+        async with semaphore:
+            return await _summarize(CHAPTER_ROLLUP_PROMPT, items, settings.ROLLUP_CHAPTER_MAX_CHARS)
+
+    # 先读取输入，并发调用 LLM，最后统一写回
+    inputs = [_chapter_rollup_items(db, chapter) for chapter in chapters]
+    results = await asyncio.gather(*(summarize_chapter(items) for items in inputs), return_exceptions=True)
+    changed_volume_ids: Set[int] = set()
+    for chapter, result in zip(chapters, results):
+        if isinstance(result, BaseException):
+            print(f"Failed to roll up chapter {chapter.id}: {result}")
+            continue
+        if result != chapter.rolling_summary:
+            chapter.rolling_summary = result
+            changed_volume_ids.add(chapter.volume_id)
+    db.commit()
+
+    for volume in db.query(Volume).filter(Volume.id.in_(changed_volume_ids)).all():
+        try:
+            volume.rolling_summary = await _summarize(VOLUME_ROLLUP_PROMPT, _volume_rollup_items(db, volume),
+                                                      settings.ROLLUP_VOLUME_MAX_CHARS)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to roll up volume {volume.id}: {e}")
+    print(f"Rolled up {len(chapters)} chapters and {len(changed_volume_ids)} volumes.")
+
+
+class RollupScheduler:
+    """
+    防抖 + 批处理的滚动摘要调度器。
+
+    schedule() 可以在任意线程调用（同步路由运行在线程池中），实际调度总是回到事件循环线程。
+    """
+
+    def __init__(self, debounce_seconds: float):
+        self.debounce_seconds = debounce_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[int] = set()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Optional[asyncio.Task] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    async def stop(self) -> None:
+        """应用关闭时调用：取消计时器和正在执行的汇总，之后的 schedule() 不再调度。"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            print(f"Rollup scheduler stopped, skipping chapters {sorted(self._pending)}.")
+            self._pending = set()
+        running, self._running = self._running, None
+        if running is not None and not running.done():
+            running.cancel()
+            await asyncio.gather(running, return_exceptions=True)
+        self._loop = None
+
+    def schedule(self, chapter_id: Optional[int]) -> None:
+        if chapter_id is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and (self._loop is None or loop is self._loop):
+            self._loop = loop
+            self._schedule(chapter_id)
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(self._schedule, chapter_id)
+        else:
+            print(f"Rollup scheduler not started, skipping chapter {chapter_id}.")
+
+    def _schedule(self, chapter_id: int) -> None:
+        self._pending.add(chapter_id)
+        if self._timer is not None:
+            self._timer.cancel()  # 重新开始计时：连续修改只触发一次汇总
+        self._timer = self._loop.call_later(self.debounce_seconds, self._flush)
+
+    def _flush(self) -> None:
+        self._timer = None
+        if self._running is not None and not self._running.done():
+            # 上一批还没处理完，等它结束后再处理新积累的章节
+            self._timer = self._loop.call_later(self.debounce_seconds, self._flush)
+            return
+        chapter_ids, self._pending = self._pending, set()
+        if chapter_ids:
+            self._running = self._loop.create_task(self._run(chapter_ids))
+
+    @staticmethod
+    async def _run(chapter_ids: Set[int]) -> None:
+        db = SessionLocal()
+        try:
+            await rollup_chapters(db, chapter_ids)
+        except Exception as e:
+            print(f"Rollup of chapters {sorted(chapter_ids)} failed: {e}")
+        finally:
+            db.close()
+
+
+rollup_scheduler = RollupScheduler(debounce_seconds=settings.ROLLUP_DEBOUNCE_SECONDS)
+
+
+def schedule_chapter_rollup(chapter_id: Optional[int]) -> None:
+    """标记章节的滚动摘要需要重算（防抖后批量执行）。"""
+    rollup_scheduler.schedule(chapter_id)
+
+
+# --- 前情提要 ---
+
+STORY_SO_FAR_ROWS_PER_FETCH = 20  # 摘要按从近到远分批读取，预算用完即停止
+
+
+def _story_entries_recent_first(db: Session, chapter: Chapter, volume) -> Iterator[Dict[str, str]]:
+    """
+    从近到远产生前情提要条目：本卷之前各章，然后更早的卷。
+
+    只查询标题、顺序和摘要列（不读取正文和向量），用服务端游标分批读取；
+    调用方关闭生成器后不再读取后面的行。
+    """
+    if chapter.narrative_position is not None:
+        earlier_chapters = select(Chapter.order, Chapter.title, Chapter.rolling_summary, Chapter.summary) \
+            .where(Chapter.volume_id == volume.id,
+                   Chapter.narrative_position < chapter.narrative_position,
+                   or_(Chapter.rolling_summary != None, Chapter.summary != None)) \
+            .order_by(Chapter.narrative_position.desc()) \
+            .execution_options(yield_per=STORY_SO_FAR_ROWS_PER_FETCH)
+        with db.execute(earlier_chapters) as rows:
+            for earlier in rows:
+                text = earlier.rolling_summary or earlier.summary
+                if text:
+                    yield {"label": f"第 {earlier.order + 1} 章 {earlier.title}", "summary": text.strip()}
+
+    earlier_volumes = select(Volume.title, Volume.rolling_summary, Volume.summary) \
+        .where(Volume.project_id == volume.project_id,
+               (Volume.order < volume.order) | ((Volume.order == volume.order) & (Volume.id < volume.id)),
+               or_(Volume.rolling_summary != None, Volume.summary != None)) \
+        .order_by(Volume.order.desc(), Volume.id.desc()) \
+        .execution_options(yield_per=STORY_SO_FAR_ROWS_PER_FETCH)
+    with db.execute(earlier_volumes) as rows:
+        for earlier in rows:
+            text = earlier.rolling_summary or earlier.summary
+            if text:
+                yield {"label": f"卷 {earlier.title}", "summary": text.strip()}
+
+
+def build_story_so_far(db: Session, chapter: Optional[Chapter], max_chars: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    当前章节之前的多层前情提要：更早的卷用卷摘要，本卷用之前各章的章节摘要。
+
+    从最近的内容往前填充，直到用完 max_chars；返回结果按故事顺序排列，
+    每项为 {"label": ..., "summary": ...}。读取的行数受预算限制，与全书长度无关。
+    """
+    if chapter is None:
+        return []
+    budget = settings.STORY_SO_FAR_MAX_CHARS if max_chars is None else max_chars
+    volume = db.query(Volume.id, Volume.project_id, Volume.order) \
+        .filter(Volume.id == chapter.volume_id) \
+        .first()
+    if volume is None:
+        return []
+
+    recent_first = _story_entries_recent_first(db, chapter, volume)
+    selected = []
+    for item in recent_first:
+        cost = len(item["label"]) + len(item["summary"])
+        if cost > budget:
+            if budget > len(item["label"]) + 20:
+                # 最早的一项截断保留结尾，结尾离当前情节更近
+                keep = budget - len(item["label"])
+                selected.append({"label": item["label"], "summary": "..." + item["summary"][-keep:]})
+            break
+        selected.append(item)
+        budget -= cost
+    recent_first.close()  # 关闭服务端游标
+    return selected[::-1]
@@ -0,0 +1,250 @@
+# backend/app/services/vector_search.py
+"""
+向量近邻检索的存储/索引模式（VECTOR_STORAGE_MODE）与 Matryoshka 粗排（EMBED_SEARCH_DIMENSIONS）。
+
+向量列本身始终保存完整维度（EMBED_DIMENSIONS）的 float32，用于最终的精确打分；
+不同模式只改变 ANN 索引和候选召回方式：
+- float：vector_cosine_ops 索引，直接按 float32 余弦距离排序（原行为）；
+- halfvec：在 embedding::halfvec 上建 HNSW 表达式索引，索引体积约为 float 的一半；
+- binary：在 binary_quantize(embedding)::bit 上建 HNSW 表达式索引（汉明距离），索引体积约为 1/32。
+
+EMBED_SEARCH_DIMENSIONS 小于完整维度时，候选召回只用向量的前 N 维（subvector），
+适用于 Matryoshka 训练的 embedding 模型。余弦距离与向量长度无关，
+截断后不需要单独归一化，等价于对截断并重新归一化的向量求内积。
+
+量化或截断时先召回 limit * VECTOR_RESCORE_FACTOR 个候选，再用完整 float32 向量的余弦距离重排取前 limit 个。
+切换模式或粗排维度后用 python -m app.scripts.vector_storage --mode <mode> 创建对应的索引。
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pgvector.sqlalchemy import VECTOR, HALFVEC, BIT
+from sqlalchemy import bindparam, cast, func, literal_column, select, text
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.db.session import engine
+
+FLOAT = "float"
+HALFVEC_MODE = "halfvec"
+BINARY = "binary"
+STORAGE_MODES = (FLOAT, HALFVEC_MODE, BINARY)
+
+# pgvector 的维度上限：vector 列本身，以及各类型 HNSW 索引
+MAX_VECTOR_DIMENSIONS = 16000
+HNSW_MAX_DIMENSIONS = {FLOAT: 2000, HALFVEC_MODE: 4000, BINARY: 64000}
+
+# 参与 ANN 检索（按距离排序取 top-k）的向量列：(表名, 列名, float 模式下的索引名)
+ANN_COLUMNS: List[Tuple[str, str, Optional[str]]] = [
+    ("characters", "embedding", None),
+    ("setting_elements", "embedding", None),
+    ("character_relationships", "embedding", None),
+    ("scene_passages", "embedding", "ix_scene_passages_embedding_hnsw"),
+    ("chapter_passages", "embedding", "ix_chapter_passages_embedding_hnsw"),
+]
+
+
+def _check_mode(mode: Optional[str]) -> str:
+    mode = mode or settings.VECTOR_STORAGE_MODE
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown vector storage mode '{mode}', expected one of: {', '.join(STORAGE_MODES)}")
+    return mode
+
+
+def search_dimensions(dimensions: Optional[int] = None) -> int:
+    """粗排使用的维度：未配置或超过完整维度时使用完整维度。"""
+    dimensions = dimensions or settings.EMBED_SEARCH_DIMENSIONS
+    if not dimensions or dimensions >= settings.EMBED_DIMENSIONS:
+        return settings.EMBED_DIMENSIONS
+    return dimensions
+
+
+def _coarse_source(column, dimensions: int):
+    if dimensions == settings.EMBED_DIMENSIONS:
+        return column
+    # 常量直接写进 SQL，保证与索引表达式一致
+    return func.subvector(column, literal_column("1"), literal_column(str(dimensions)))
+
+
+def quantized_distance(column, query_embedding: List[float], mode: Optional[str] = None,
+                       dimensions: Optional[int] = None):
+    """
+    候选召回用的距离表达式。表达式必须与 index_ddl() 中的索引表达式完全一致，否则用不上索引。
+    """
+    mode = _check_mode(mode)
+    dimensions = search_dimensions(dimensions)
+    source = _coarse_source(column, dimensions)
+    query_embedding = list(query_embedding[:dimensions])
+    if mode == HALFVEC_MODE:
+        query_vector = cast(bindparam(None, query_embedding, type_=HALFVEC(dimensions)), HALFVEC(dimensions))
+        return cast(source, HALFVEC(dimensions)).cosine_distance(query_vector)
+    # binary_quantize 对 vector 和 halfvec 都有重载，参数需要显式转换类型
+    query_vector = cast(bindparam(None, query_embedding, type_=VECTOR(dimensions)), VECTOR(dimensions))
+    if mode == BINARY:
+        return cast(func.binary_quantize(source), BIT(dimensions)) \
+            .hamming_distance(cast(func.binary_quantize(query_vector), BIT(dimensions)))
+    if dimensions == settings.EMBED_DIMENSIONS:
+        return column.cosine_distance(query_embedding)
+    return cast(source, VECTOR(dimensions)).cosine_distance(query_vector)
+
+
+def nearest(query: Query, column, query_embedding: List[float], limit: int, mode: Optional[str] = None,
+            dimensions: Optional[int] = None) -> Query:
+    """
+    给已经加好过滤条件的查询加上按 column 余弦距离的 top-limit 排序。
+
+    量化或截断时先按粗排距离取候选 id，再按完整 float32 向量的余弦距离重排。
+    加载选项（selectinload 等）请在调用之后再加，候选子查询只选 id 列。
+    """
+    mode = _check_mode(mode)
+    dimensions = search_dimensions(dimensions)
+    full_distance = column.cosine_distance(query_embedding)
+    if mode == FLOAT and dimensions == settings.EMBED_DIMENSIONS:
+        return query.order_by(full_distance).limit(limit)
+    id_column = column.class_.id
+    candidates = query.with_entities(id_column.label("candidate_id")) \
+        .order_by(quantized_distance(column, query_embedding, mode, dimensions)) \
+        .limit(limit * max(settings.VECTOR_RESCORE_FACTOR, 1)) \
+        .subquery()
+    return query.filter(id_column.in_(select(candidates.c.candidate_id))).order_by(full_distance).limit(limit)
+
+
+# --- 索引管理 ---
+
+def index_name(table_name: str, column_name: str, mode: str, dimensions: Optional[int] = None) -> str:
+    dimensions = search_dimensions(dimensions)
+    suffix = "" if dimensions == settings.EMBED_DIMENSIONS else f"_d{dimensions}"
+    return f"ix_{table_name}_{column_name}_{mode}{suffix}_hnsw"
+
+
+def index_ddl(table_name: str, column_name: str, mode: str, dimensions: Optional[int] = None,
+              name: Optional[str] = None) -> str:
+    dimensions = search_dimensions(dimensions)
+    source = column_name if dimensions == settings.EMBED_DIMENSIONS else f"subvector({column_name}, 1, {dimensions})"
+    if mode == HALFVEC_MODE:
+        expression = f"(({source})::halfvec({dimensions})) halfvec_cosine_ops"
+    elif mode == BINARY:
+        expression = f"((binary_quantize({source}))::bit({dimensions})) bit_hamming_ops"
+    elif dimensions != settings.EMBED_DIMENSIONS:
+        expression = f"(({source})::vector({dimensions})) vector_cosine_ops"
+    else:
+        expression = f"{column_name} vector_cosine_ops"
+    return (f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name or index_name(table_name, column_name, mode, dimensions)} "
+            f"ON {table_name} USING hnsw ({expression})")
+
+
+def switch_storage_mode(mode: str, dimensions: Optional[int] = None, drop_float_indexes: bool = False) -> List[str]:
+    """
+    为 mode 和粗排维度创建所有 ANN 列的 HNSW 索引，并删除这些列上其它模式/维度的索引。
+
+    段落表的完整维度 float 索引（ix_*_embedding_hnsw）在模型中声明，默认保留；
+    drop_float_indexes=True 时一并删除，以真正节省空间。
+    使用 CONCURRENTLY，不阻塞读写；需要在事务外执行，因此直接使用 AUTOCOMMIT 连接。
+
+    Returns:
+        执行过的 DDL 语句。
+    """
+    mode = _check_mode(mode)
+    dimensions = search_dimensions(dimensions)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        existing = sorted(connection.execute(
+            text("SELECT indexname FROM pg_indexes WHERE indexdef ILIKE '%USING hnsw%'")).scalars())
+        statements = []
+        for table_name, column_name, float_index in ANN_COLUMNS:
+            # 完整维度的 float 模式下段落表使用模型里声明的索引
+            use_model_index = mode == FLOAT and dimensions == settings.EMBED_DIMENSIONS and float_index is not None
+            name = float_index if use_model_index else index_name(table_name, column_name, mode, dimensions)
+            statements.append(index_ddl(table_name, column_name, mode, dimensions, name))
+            for other in existing:
+                if other == name or not other.startswith(f"ix_{table_name}_{column_name}_"):
+                    continue
+                if other == float_index and not drop_float_indexes:
+                    continue
+                statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS {other}")
+
+        for statement in statements:
+            print(statement)
+            connection.execute(text(statement))
+    return statements
+
+
+def _column_dimensions(connection, table_name: str, column_name: str) -> int:
+    return connection.execute(text(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = CAST(:table_name AS regclass) AND attname = :column_name"
+    ), {"table_name": table_name, "column_name": column_name}).scalar()
+
+
+def resize_vector_columns(columns: Sequence[Tuple[str, str, str]],
+                          drop_float_indexes: bool = False) -> List[Tuple[str, str]]:
+    """
+    把维度与 EMBED_DIMENSIONS 不一致的向量列改成 vector(EMBED_DIMENSIONS)。
+
+    只处理维度不一致的列：删除这些列上的 HNSW 索引，修改列类型并清空向量和签名（旧向量无法转换），
+    再按当前 VECTOR_STORAGE_MODE / EMBED_SEARCH_DIMENSIONS 重建 ANN 索引；段落表在模型中声明的 float 索引
+    原来存在时一并重建（drop_float_indexes=True 时不重建）。
+    维度上限（包括要重建的 HNSW 索引的上限）在任何修改之前检查，超出时抛出 ValueError，不会改到一半失败。
+
+    Args:
+        columns: (表名, 向量列, 签名列)
+    Returns:
+        被修改并清空的 (表名, 向量列)。
+    """
+    dimensions = settings.EMBED_DIMENSIONS
+    if not 1 <= dimensions <= MAX_VECTOR_DIMENSIONS:
+        raise ValueError(f"EMBED_DIMENSIONS must be between 1 and {MAX_VECTOR_DIMENSIONS}, got {dimensions}")
+    mode = _check_mode(None)
+    coarse_dimensions = search_dimensions()
+    float_indexes = {(table_name, column_name): float_index for table_name, column_name, float_index in ANN_COLUMNS}
+
+    with engine.begin() as connection:
+        affected = [(table_name, column_name, signature_name) for table_name, column_name, signature_name in columns
+                    if _column_dimensions(connection, table_name, column_name) != dimensions]
+        if not affected:
+            return []
+        existing = sorted(connection.execute(
+            text("SELECT indexname FROM pg_indexes WHERE indexdef ILIKE '%USING hnsw%'")).scalars())
+
+        drops, creates = [], []
+        for table_name, column_name, _ in affected:
+            drops.extend(name for name in existing if name.startswith(f"ix_{table_name}_{column_name}_"))
+            if (table_name, column_name) not in float_indexes:
+                continue  # 不参与 ANN 检索，没有索引
+            float_index = float_indexes[(table_name, column_name)]
+            use_model_index = mode == FLOAT and coarse_dimensions == dimensions and float_index is not None
+            planned = [(mode, coarse_dimensions,
+                        float_index if use_model_index else index_name(table_name, column_name, mode))]
+            if float_index in existing and not use_model_index and not drop_float_indexes:
+                planned.append((FLOAT, dimensions, float_index))
+            for index_mode, index_dimensions, name in planned:
+                limit = HNSW_MAX_DIMENSIONS[index_mode]
+                if index_dimensions > limit:
+                    raise ValueError(f"Index {name}: {index_mode} HNSW indexes support at most {limit} dimensions, "
+                                     f"got {index_dimensions}")
+                creates.append(index_ddl(table_name, column_name, index_mode, index_dimensions, name))
+
+        statements = [f"DROP INDEX IF EXISTS {name}" for name in drops]
+        for table_name, column_name, signature_name in affected:
+            statements.append(
+                f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE vector({dimensions}) USING NULL")
+            statements.append(f"UPDATE {table_name} SET {signature_name} = NULL WHERE {signature_name} IS NOT NULL")
+        for statement in statements:
+            print(statement)
+            connection.execute(text(statement))
+
+    # 列已清空，重建索引很快；CONCURRENTLY 需要在事务外执行
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for statement in creates:
+            print(statement)
+            connection.execute(text(statement))
+    return [(table_name, column_name) for table_name, column_name, _ in affected]
+
+
+def index_sizes(db: Session) -> Dict[str, int]:
+    """各 ANN 列上现有 HNSW 索引的大小（字节）。"""
+    table_names = sorted({table_name for table_name, _, _ in ANN_COLUMNS})
+    rows = db.execute(text("""
+        SELECT indexname, pg_relation_size(quote_ident(indexname)::regclass)
+        FROM pg_indexes
+        WHERE tablename = ANY(:table_names) AND indexdef ILIKE '%USING hnsw%'
+    """), {"table_names": table_names}).all()
+    return {name: size for name, size in rows}
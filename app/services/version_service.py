@@ -0,0 +1,31 @@
+# backend/app/services/version_service.py
+"""读取项目版本号（由 app/db/versioning.py 维护），用于生成 ETag。"""
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Project
+
+
+def get_version_for(db: Session, model, row_id: int) -> Optional[Tuple[int, int]]:
+    """
+    返回 model 中 id 为 row_id 的行所属项目的 (project_id, version)，行不存在时返回 None。
+    model 为 Project 时即项目本身。
+    """
+    if model is Project:
+        query = select(Project.id, Project.version).where(Project.id == row_id)
+    else:
+        query = select(model.project_id, Project.version) \
+            .join(Project, Project.id == model.project_id) \
+            .where(model.id == row_id)
+    row = db.execute(query).first()
+    return (row[0], row[1]) if row else None
+
+
+def get_projects_list_version(db: Session) -> str:
+    """项目列表的版本：项目数量、最大 id 和版本号之和，任何项目增删改都会改变它。"""
+    count, max_id, total = db.execute(
+        select(func.count(Project.id), func.coalesce(func.max(Project.id), 0), func.coalesce(func.sum(Project.version), 0))
+    ).one()
+    return f"{count}-{max_id}-{total}"
@@ -1,29 +1,29 @@
 # backend/app/services/volume_service.py
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import asc  # 用于排序
-from typing import List, Optional
+from typing import Optional
 
 from app.models.structure import Volume, Chapter
 from app.schemas.volume import VolumeCreate, VolumeUpdate
-from app.services.llm_service import get_embedding, prepare_text_for_embedding
+from app.services import position_service, embedding_worker
+from app.services.llm_service import prepare_text_for_embedding
+from app.utils import pagination
+
+
+def embedding_text(volume: Volume) -> str:
+    """卷用于 Embedding 的文本（重建任务也使用这个函数）"""
+    return prepare_text_for_embedding(volume.summary)
 
 
 async def create_volume(db: Session, volume: VolumeCreate) -> Volume:
-    """创建新卷并生成摘要的 Embedding"""
-    embedding_vector = None
-    if volume.summary:  # 只有在提供了摘要时才生成 embedding
-        text_for_embedding = prepare_text_for_embedding(volume.summary)
-        embedding_vector = await get_embedding(text_for_embedding)
-
-    db_volume = Volume(
-        **volume.model_dump(),
-        embedding=embedding_vector  # 添加 embedding (可能为 None)
-    )
+    """创建新卷，摘要的 Embedding 由后台队列生成"""
+    db_volume = Volume(**volume.model_dump())
     db.add(db_volume)
     try:
         db.commit()
         db.refresh(db_volume)
+        if db_volume.summary:  # 只有在提供了摘要时才生成 embedding (否则为 None)
+            embedding_worker.enqueue("volumes", db_volume.id)
         return db_volume
     except IntegrityError as e:
         db.rollback()
@@ -42,17 +42,17 @@ def get_volume(db: Session, volume_id: int) -> Optional[Volume]:
     ).filter(Volume.id == volume_id).first()
 
 
-def get_volumes_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100) -> List[Volume]:
-    """获取指定项目下的卷列表，按 'order' 排序，并预加载章节"""
-    return db.query(Volume).options(
+def get_volumes_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                           cursor: Optional[str] = None) -> pagination.Page:
+    """获取指定项目下的卷列表，按 ('order', id) 游标分页，并预加载章节"""
+    query = db.query(Volume).options(
         selectinload(Volume.chapters)  # 预加载章节列表
-    ).filter(Volume.project_id == project_id).order_by(
-        asc(Volume.order)  # 按 order 字段升序排序
-    ).offset(skip).limit(limit).all()
+    ).filter(Volume.project_id == project_id)
+    return pagination.paginate(query, [Volume.order, Volume.id], limit, cursor, skip)
 
 
 async def update_volume(db: Session, db_volume: Volume, volume_in: VolumeUpdate) -> Volume:
-    """更新卷信息，如果摘要变化则重新生成 Embedding"""
+    """更新卷信息，如果摘要变化则排队重新生成 Embedding"""
     update_data = volume_in.model_dump(exclude_unset=True)
     needs_re_embedding = False
 
@@ -67,19 +67,19 @@ async def update_volume(db: Session, db_volume: Volume, volume_in: VolumeUpdate)
     for key, value in update_data.items():
         setattr(db_volume, key, value)
 
-    # 如果需要，重新生成并更新 embedding
-    if needs_re_embedding:
-        new_summary = db_volume.summary  # 获取更新后的摘要
-        if new_summary:
-            text_for_embedding = prepare_text_for_embedding(new_summary)
-            db_volume.embedding = await get_embedding(text_for_embedding)
-        else:
-            db_volume.embedding = None  # 如果摘要被清空，则 embedding 也设为 None
+    if needs_re_embedding and not db_volume.summary:
+        db_volume.embedding = None  # 如果摘要被清空，则 embedding 也设为 None
+        db_volume.embedding_signature = None
 
     db.add(db_volume)
     try:
+        if "order" in update_data:
+            position_service.renumber_project(db, db_volume.project_id)
         db.commit()
         db.refresh(db_volume)
+        # 如果需要，由后台队列重新生成 embedding（写回前继续使用旧向量）
+        if needs_re_embedding and db_volume.summary:
+            embedding_worker.enqueue("volumes", db_volume.id)
         # 需要重新加载 chapters 关系，因为 refresh 不会加载它们
         db.refresh(db_volume, attribute_names=['chapters'])  # Pydantic 需要这个
         # 或者重新查询一次: db_volume = get_volume(db, db_volume.id)
@@ -103,5 +103,6 @@ def delete_volume(db: Session, volume_id: int) -> Optional[Volume]:
         pass  # get_volume 已经加载了
 
         db.delete(db_volume)
+        position_service.renumber_project(db, db_volume.project_id)
         db.commit()
     return db_volume
@@ -0,0 +1,77 @@
+# backend/app/utils/aho_corasick.py
+"""纯 Python 的 Aho–Corasick 多模式匹配，用于在场景目标/正文中一次扫描找出所有被提及的名称。"""
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Set, Tuple
+
+
+class AhoCorasick:
+    """
+    多模式字符串匹配自动机。
+
+    用法：多次 add() 之后调用 build()，再用 find_all() 扫描文本；
+    扫描耗时只与文本长度和命中数量有关，与模式数量无关。
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Set[Hashable]] = [set()]
+        self._built = True
+
+    def add(self, pattern: str, payload: Hashable) -> None:
+        """添加一个模式；同一模式可以对应多个 payload。"""
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(set())
+            state = next_state
+        self._outputs[state].add(payload)
+        self._built = False
+
+    def build(self) -> None:
+        """按 BFS 计算失败链接，并把失败状态的输出合并到当前状态。"""
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._outputs[next_state] |= self._outputs[self._fail[next_state]]
+        self._built = True
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, Hashable]]:
+        """逐个产出 (匹配结束位置, payload)。"""
+        if not self._built:
+            self.build()
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for payload in self._outputs[state]:
+                yield index, payload
+
+    def find_payloads(self, text: str) -> Set[Hashable]:
+        """返回文本中命中的所有 payload（去重）。"""
+        return {payload for _, payload in self.find_all(text)}
+
+    @classmethod
+    def from_patterns(cls, patterns: Iterable[Tuple[str, Hashable]]) -> "AhoCorasick":
+        automaton = cls()
+        for pattern, payload in patterns:
+            automaton.add(pattern, payload)
+        automaton.build()
+        return automaton
@@ -0,0 +1,99 @@
+# backend/app/utils/chunking.py
+"""
+稳定的内容哈希分块：修改一段文字只影响附近的一两个块，其余块的内容和哈希保持不变。
+
+固定长度窗口的问题是前面插入或删除一个字，后面所有窗口都会错位，哈希全部改变。
+这里的块边界只由内容本身决定：
+- 先按段落（换行）切分，超长段落再按句末标点切成不超过 max_chars 的片段；
+- 片段长度达到 min_chars，或片段内容哈希命中 1/BOUNDARY_MODULUS 的概率时结束当前块，
+  块长度超过 max_chars 时强制结束。
+因此某处修改后，最迟在下一个由内容决定的边界处重新对齐。
+
+相邻块之间的重叠通过把上一块末尾的 overlap 个字符作为前缀实现；
+哈希基于实际用于 embedding 的文本（含前缀），哈希相同即可直接复用原来的向量。
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+SENTENCE_PATTERN = re.compile(r"[^。！？!?…\n]*[。！？!?…]+[”」』\"']?|[^。！？!?…\n]+")
+BOUNDARY_MODULUS = 4
+
+
+@dataclass(frozen=True)
+class Chunk:
+    start_offset: int  # 块文本（含重叠前缀）在原文中的起始位置
+    text: str
+    content_hash: str
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _units(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    """把文本切成段落级的 (start, end) 片段，超长段落按句子再切。"""
+    units = []
+    for paragraph in re.finditer(r"[^\n]+", text):
+        start, end = paragraph.span()
+        if not paragraph.group().strip():
+            continue
+        if end - start <= max_chars:
+            units.append((start, end))
+            continue
+        piece_start = start
+        piece_end = start
+        for sentence in SENTENCE_PATTERN.finditer(text, start, end):
+            if sentence.end() - piece_start > max_chars and piece_end > piece_start:
+                units.append((piece_start, piece_end))
+                piece_start = piece_end
+            piece_end = sentence.end()
+            while piece_end - piece_start > max_chars:  # 单句超长时硬切
+                units.append((piece_start, piece_start + max_chars))
+                piece_start += max_chars
+        if piece_end > piece_start:
+            units.append((piece_start, piece_end))
+    return units
+
+
+def _is_boundary(unit_text: str) -> bool:
+    return int(content_hash(unit_text)[:8], 16) % BOUNDARY_MODULUS == 0
+
+
+def split_stable_chunks(text: str, max_chars: int, min_chars: int, overlap: int = 0) -> List[Chunk]:
+    """
+    按内容决定边界的分块。
+
+    Args:
+        text: 原文。
+        max_chars: 块（不含重叠前缀）的最大长度。
+        min_chars: 单个片段达到该长度时独立成块。
+        overlap: 从上一块末尾取多少字符作为本块前缀。
+    """
+    text = text or ""
+    spans = []
+    chunk_start = chunk_end = None
+    for start, end in _units(text, max_chars):
+        if chunk_start is not None and end - chunk_start > max_chars:
+            spans.append((chunk_start, chunk_end))
+            chunk_start = None
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+        if end - start >= min_chars or _is_boundary(text[start:end]):
+            spans.append((chunk_start, chunk_end))
+            chunk_start = None
+    if chunk_start is not None:
+        spans.append((chunk_start, chunk_end))
+
+    chunks = []
+    previous_end = None
+    for start, end in spans:
+        prefix_start = start
+        if overlap and previous_end is not None:
+            prefix_start = max(previous_end - overlap, 0)
+        chunk_text = text[prefix_start:end].strip()
+        chunks.append(Chunk(start_offset=prefix_start, text=chunk_text, content_hash=content_hash(chunk_text)))
+        previous_end = end
+    return chunks
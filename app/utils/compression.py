@@ -0,0 +1,162 @@
+# backend/app/utils/compression.py
+"""
+按 Accept-Encoding 协商的响应压缩（brotli 优先，其次 gzip）。
+
+正文、章节和卷的响应动辄几 MB 的中文文本，压缩率通常在 3~5 倍。
+- 一次性返回的响应：小于 COMPRESSION_MINIMUM_SIZE 字节时原样返回，否则整体压缩并改写 Content-Length；
+- 流式响应（SSE、导出等，多个 body 分块）：每个分块压缩后立即 flush，
+  客户端不需要等缓冲区攒满就能解出已经发送的内容，代价是小分块的压缩率下降。
+已经带 Content-Encoding 的响应和图片、压缩包等不可压缩的类型不做处理。
+
+与 Starlette 自带的 GZipMiddleware 相比：支持 brotli，流式分块会 flush，不会把 SSE 事件憋在压缩缓冲区里。
+"""
+import zlib
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+BROTLI = "br"
+GZIP = "gzip"
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "application/x-ndjson")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """解析 Accept-Encoding（含 q 值），返回要使用的编码；客户端不接受时返回 None。"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name] = quality
+    wildcard = weights.get("*", 0.0)
+    candidates = [(weights.get(name, wildcard), name) for name in (BROTLI, GZIP)]
+    quality, name = max(candidates, key=lambda candidate: candidate[0])  # 同权重时 max 取第一个，即 brotli
+    return name if quality > 0 else None
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(";")[0].endswith(("+json", "+xml"))
+
+
+class StreamCompressor:
+    """gzip / brotli 流式压缩器的统一接口。"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT, quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+：gzip 格式
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == BROTLI:
+            output = self._brotli.process(data)
+            return output + self._brotli.flush() if flush else output
+        output = self._zlib.compress(data)
+        return output + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+    def finish(self) -> bytes:
+        if self.encoding == BROTLI:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """纯 ASGI 中间件，不会像 BaseHTTPMiddleware 那样把流式响应整体缓冲。"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 1, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """
+    延迟发送 http.response.start，等到第一个 body 分块才决定是否压缩：
+    单个分块且小于阈值时原样发送，否则改写头部并压缩。
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._compressor: Optional[StreamCompressor] = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            self._passthrough = "content-encoding" in headers \
+                or not is_compressible(headers.get("content-type", "")) \
+                or message["status"] in (204, 304)
+            if self._passthrough:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+            self._compressor = StreamCompressor(self.encoding, self.middleware.gzip_level,
+                                                self.middleware.brotli_quality)
+            if not more_body:
+                compressed = self._compressor.compress(body) + self._compressor.finish()
+                await self._send(self._compressed_start(content_length=len(compressed)))
+                await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+                return
+            await self._send(self._compressed_start(content_length=None))
+
+        if more_body:
+            chunk = self._compressor.compress(body, flush=True)
+            if chunk:
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+            return
+        tail = self._compressor.compress(body) + self._compressor.finish()
+        await self._send({"type": "http.response.body", "body": tail, "more_body": False})
+
+    def _compressed_start(self, content_length: Optional[int]) -> Message:
+        headers = MutableHeaders(raw=list(self._start["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers and not headers["etag"].startswith("W/"):
+            headers["ETag"] = f"W/{headers['etag']}"  # 压缩后字节不同，强 ETag 改为弱 ETag
+        if content_length is None:  # 流式响应长度未知，改用分块传输
+            if "content-length" in headers:
+                del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        return {**self._start, "headers": headers.raw}
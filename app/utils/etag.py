@@ -0,0 +1,69 @@
+# backend/app/utils/etag.py
+"""
+读接口的 ETag / 条件请求。
+
+ETag 由项目版本号（app/db/versioning.py）加上请求路径和查询参数的哈希组成，
+同一个项目内任何内容变化都会让该项目下所有读接口的 ETag 失效。
+
+用法：在 GET 路由上加 dependencies=[Depends(etag.for_entity(Chapter, "chapter_id"))]。
+依赖只做一次主键查询：If-None-Match 命中时直接抛出 304，路由本身（以及其中的重查询）不会执行；
+否则把 ETag 放到 request.state，由 ETagMiddleware 写进 200 响应的头部。
+"""
+import hashlib
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.db.session import get_db
+from app.services import version_service
+
+
+def make_etag(request: Request, version: str) -> str:
+    digest = hashlib.md5(f"{request.url.path}?{request.url.query}".encode("utf-8")).hexdigest()[:12]
+    return f'"{version}-{digest}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _check(request: Request, version: Optional[str]) -> None:
+    if version is None:
+        return  # 资源不存在，交给路由返回 404
+    etag = make_etag(request, version)
+    if _matches(request, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    request.state.etag = etag
+
+
+def for_entity(model, path_param: str) -> Callable:
+    """按路径参数 path_param 指定的 model 行所属项目的版本号生成 ETag。"""
+
+    def dependency(request: Request, db: Session = Depends(get_db)) -> None:
+        row_id = int(request.path_params[path_param])
+        found = version_service.get_version_for(db, model, row_id)
+        _check(request, f"{found[0]}.{found[1]}" if found else None)
+
+    return dependency
+
+
+def for_projects_list(request: Request, db: Session = Depends(get_db)) -> None:
+    _check(request, f"projects.{version_service.get_projects_list_version(db)}")
+
+
+class ETagMiddleware(BaseHTTPMiddleware):
+    """把依赖计算好的 ETag 写进成功的响应；no-cache 让浏览器每次都带 If-None-Match 重新验证。"""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        etag = getattr(request.state, "etag", None)
+        if etag and response.status_code == status.HTTP_200_OK:
+            response.headers.setdefault("ETag", etag)
+            response.headers.setdefault("Cache-Control", "no-cache")
+        return response
@@ -0,0 +1,99 @@
+# backend/app/utils/fieldsets.py
+"""
+列表接口的稀疏字段（fields= 查询参数）。
+
+客户端渲染项目树时通常只需要 id/title/order/status，完整对象里的正文和摘要占了绝大部分体积。
+fields 是逗号分隔的字段名，嵌套字段用点号，例如：
+
+    GET /api/projects/1/chapters?fields=title,order,scenes.title,scenes.status
+
+- 字段名按 Read schema 校验，未知字段返回 400；id 总是返回；
+- 只写关系名（如 scenes）表示返回该关系的全部字段；
+- 字段下推到 SQL：列用 load_only 只查询需要的列，未请求的关系不加载，
+  请求的关系用 selectinload 并同样只加载其中请求的列；
+- 响应用 serialization.orm_response(..., fields=...) 只输出请求的字段。
+
+FieldSet 是解析后的结构：{字段名: 子 FieldSet 或 None（该字段全部输出）}。
+"""
+from typing import Callable, Dict, List, Optional, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only, selectinload
+
+from app.utils.serialization import nested_schema
+
+FieldSet = Dict[str, Optional["FieldSet"]]
+
+
+def _new_fieldset(schema: Type[BaseModel]) -> FieldSet:
+    return {"id": None} if "id" in schema.model_fields else {}
+
+
+def _add_path(fieldset: FieldSet, schema: Type[BaseModel], parts: List[str], path: str) -> None:
+    name = parts[0]
+    field = schema.model_fields.get(name)
+    if field is None:
+        raise ValueError(f"Unknown field '{path}'. Available fields: {', '.join(schema.model_fields)}")
+    if len(parts) == 1:
+        fieldset[name] = None
+        return
+    nested, _ = nested_schema(field.annotation)
+    if nested is None:
+        raise ValueError(f"Field '{name}' has no sub-fields (in '{path}')")
+    if name in fieldset and fieldset[name] is None:
+        return  # 已经请求了整个关系
+    _add_path(fieldset.setdefault(name, _new_fieldset(nested)), nested, parts[1:], path)
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[FieldSet]:
+    """解析 fields 参数；为空时返回 None，表示返回全部字段。字段不存在时抛出 ValueError。"""
+    if not fields or not fields.strip():
+        return None
+    fieldset = _new_fieldset(schema)
+    for path in fields.split(","):
+        path = path.strip()
+        if path:
+            _add_path(fieldset, schema, path.split("."), path)
+    return fieldset
+
+
+def scalar_fields(schema: Type[BaseModel], fields: Optional[FieldSet] = None) -> FieldSet:
+    """fields 中（为 None 时为 schema 中）不是嵌套 schema 的字段，用于只输出行本身、不展开关系。"""
+    names = schema.model_fields if fields is None else fields
+    return {name: None for name in names if nested_schema(schema.model_fields[name].annotation)[0] is None}
+
+
+def fields_param(schema: Type[BaseModel]) -> Callable:
+    """路由依赖：读取并校验 fields 查询参数。"""
+
+    def dependency(fields: Optional[str] = Query(
+            None, description="Comma-separated fields to return, nested with dots, e.g. title,order,scenes.status")
+    ) -> Optional[FieldSet]:
+        try:
+            return parse_fields(fields, schema)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return dependency
+
+
+def load_options(model, fieldset: FieldSet) -> list:
+    """
+    把 FieldSet 转成查询的加载选项：列用 load_only，关系用 selectinload（嵌套的 FieldSet 递归处理）。
+    不在 FieldSet 里的关系不会被加载，序列化时也不会访问它们。
+    """
+    mapper = sa_inspect(model)
+    columns, options = [], []
+    for name, nested in fieldset.items():
+        if name in mapper.column_attrs:
+            columns.append(getattr(model, name))
+        elif name in mapper.relationships:
+            loader = selectinload(getattr(model, name))
+            if nested is not None:
+                loader = loader.options(*load_options(mapper.relationships[name].mapper.class_, nested))
+            options.append(loader)
+    if columns:
+        options.insert(0, load_only(*columns))
+    return options
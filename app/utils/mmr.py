@@ -0,0 +1,63 @@
+# backend/app/utils/mmr.py
+"""Maximal Marginal Relevance (MMR) 多样性重排，基于 NumPy 向量化实现。"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mmr_select(
+        query_vector: Sequence[float],
+        candidate_vectors: Sequence[Sequence[float]],
+        k: int,
+        lambda_mult: float = 0.5,
+        relevance: Optional[Sequence[float]] = None,
+) -> List[int]:
+    """
+    从候选集中选出 k 个既相关又彼此不重复的条目。
+
+    每一步选择 argmax[ λ·rel(d) − (1−λ)·max_{s∈S} sim(d, s) ]，
+    其中 sim 为余弦相似度，S 为已选集合。
+
+    Args:
+        query_vector: 查询向量。
+        candidate_vectors: 候选向量，形状 (n, dim)。
+        k: 需要选出的数量。
+        lambda_mult: λ，1 表示只看相关度，0 表示只看多样性。
+        relevance: (可选) 外部计算好的相关度分数；不提供时使用与查询向量的余弦相似度。
+
+    Returns:
+        被选中候选的下标，按选中顺序排列。
+    """
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    candidates = _normalize(candidates)
+
+    if relevance is None:
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        relevance_scores = candidates @ query
+    else:
+        relevance_scores = np.asarray(relevance, dtype=np.float32)
+
+    similarity = candidates @ candidates.T  # (n, n) 两两余弦相似度
+    first = int(np.argmax(relevance_scores))
+    selected = [first]
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+    max_similarity_to_selected = similarity[first].copy()
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance_scores - (1 - lambda_mult) * max_similarity_to_selected
+        scores[~available] = -np.inf
+        index = int(np.argmax(scores))
+        selected.append(index)
+        available[index] = False
+        np.maximum(max_similarity_to_selected, similarity[index], out=max_similarity_to_selected)
+    return selected
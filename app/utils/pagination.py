@@ -0,0 +1,93 @@
+# backend/app/utils/pagination.py
+"""
+列表接口的游标（keyset）分页。
+
+offset 分页要先扫描并丢弃前 skip 行，项目有上万个场景时越往后越慢。
+这里按排序键（如 (order, id) 或 (created_at, id)，最后一列必须唯一）分页：
+下一页的条件是 (排序键) > (上一页最后一行的排序键)，配合 (过滤列, 排序键...) 的复合索引，
+每一页只读取本页的行。
+
+- 游标是排序键取值的 base64 编码，对客户端不透明，通过响应头 X-Next-Cursor 返回，
+  没有下一页时不返回该头；客户端把它原样放到下一次请求的 cursor 参数里；
+- 游标里记录了排序键的列名，用在别的列表上会被拒绝（InvalidCursor，路由返回 400）；
+- 仍然接受 skip 参数（在游标之后再跳过 skip 行），兼容旧客户端，但大 skip 仍然是线性扫描。
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Type
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import DateTime, literal, tuple_
+from sqlalchemy.orm import Query, undefer
+
+from app.utils.serialization import OrjsonResponse, orm_response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CURSOR_DESCRIPTION = "Opaque cursor taken from the X-Next-Cursor header of the previous page"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _key_names(keys: Sequence) -> List[str]:
+    return [f"{key.class_.__tablename__}.{key.key}" for key in keys]
+
+
+def encode_cursor(keys: Sequence, row: Any) -> str:
+    payload = {"k": _key_names(keys), "v": [getattr(row, key.key) for key in keys]}
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).decode("ascii").rstrip("=")
+
+
+def decode_cursor(keys: Sequence, cursor: str) -> List[Any]:
+    """解析游标，返回排序键的取值。格式不对或不属于这组排序键时抛出 InvalidCursor。"""
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        names, values = payload["k"], payload["v"]
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if names != _key_names(keys) or len(values) != len(keys):
+        raise InvalidCursor("Cursor does not belong to this listing")
+    try:
+        return [datetime.fromisoformat(value) if isinstance(key.type, DateTime) and value is not None else value
+                for key, value in zip(keys, values)]
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def paginate(query: Query, keys: Sequence, limit: int, cursor: Optional[str] = None, skip: int = 0) -> Page:
+    """
+    按 keys 升序对 query 做游标分页。query 不要自带 order_by。
+
+    多取一行判断是否还有下一页；排序键总是加载（即使 load_only 没有包含它们），用来生成游标。
+    limit 小于 1 时抛出 ValueError（limit=0 会用一行没有返回的数据生成游标，导致该行被跳过）。
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    query = query.options(*[undefer(key) for key in keys]).order_by(*keys)
+    if cursor:
+        values = decode_cursor(keys, cursor)
+        query = query.filter(tuple_(*keys) > tuple_(*[literal(value, key.type) for key, value in zip(keys, values)]))
+    if skip:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        return Page(rows[:limit], encode_cursor(keys, rows[limit - 1]))
+    return Page(rows, None)
+
+
+def page_response(page: Page, schema: Type[BaseModel], fields: Optional[dict] = None) -> OrjsonResponse:
+    """按 schema 渲染一页数据，有下一页时在响应头里带上游标。"""
+    response = orm_response(page.items, schema, fields=fields)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return response
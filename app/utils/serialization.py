@@ -0,0 +1,81 @@
+# backend/app/utils/serialization.py
+"""
+大响应的快速 JSON 序列化。
+
+- OrjsonResponse：用 orjson 渲染的响应类，作为应用的默认响应类。
+- dump_orm()：按 Read schema 的字段直接从 ORM 对象取值生成 dict，跳过 Pydantic 的
+  from_attributes 校验。只用于我们自己从数据库读出的对象（字段类型由模型保证），
+  因此 Read schema 的字段类型必须与模型一致（可为 NULL 的列对应 Optional 字段）。
+  章节/卷这类嵌套很深的树形响应能省下大部分序列化时间。也用于稀疏字段（fieldsets.py）的输出。
+
+路由返回 orm_response(...) 时 FastAPI 不再按 response_model 校验返回值，
+response_model 仍然保留，用于生成 OpenAPI 文档。
+"""
+import types
+import typing
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z  # UTC 时间输出 Z，与 Pydantic 一致
+
+
+class OrjsonResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def nested_schema(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """
+    解析字段注解，返回 (嵌套的 schema, 是否为列表)。不是嵌套 schema 时 schema 为 None。
+    """
+    origin = typing.get_origin(annotation)
+    if origin in (Union, types.UnionType):  # Optional[X] / X | None
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return nested_schema(args[0]) if len(args) == 1 else (None, False)
+    if origin in (list, List):
+        item_schema, _ = nested_schema(typing.get_args(annotation)[0])
+        return item_schema, True
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _field_plan(schema: Type[BaseModel]) -> Tuple[Tuple[str, Optional[Type[BaseModel]], bool], ...]:
+    return tuple((name, *nested_schema(field.annotation)) for name, field in schema.model_fields.items())
+
+
+def dump_orm(obj: Any, schema: Type[BaseModel], fields: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    把 ORM 对象（或对象列表）按 schema 的字段转成可直接交给 orjson 的 dict。
+
+    Enum、datetime 由 orjson 原生处理；嵌套的 schema 字段递归展开。
+    fields 为 fieldsets.parse_fields() 的结果时只输出其中的字段（不会访问其它属性，避免触发延迟加载）。
+    """
+    if obj is None:
+        return None
+    if isinstance(obj, (list, tuple)):
+        return [dump_orm(item, schema, fields) for item in obj]
+    result = {}
+    for name, nested, is_list in _field_plan(schema):
+        if fields is not None and name not in fields:
+            continue
+        value = getattr(obj, name, None)
+        if nested is not None and value is not None:
+            nested_fields = fields.get(name) if fields is not None else None
+            value = [dump_orm(item, nested, nested_fields) for item in value] if is_list \
+                else dump_orm(value, nested, nested_fields)
+        result[name] = value
+    return result
+
+
+def orm_response(obj: Union[Any, Iterable[Any]], schema: Type[BaseModel], status_code: int = 200,
+                 fields: Optional[Dict[str, Any]] = None) -> OrjsonResponse:
+    """直接把 ORM 对象按 schema 渲染成响应，跳过 response_model 校验。"""
+    return OrjsonResponse(dump_orm(obj, schema, fields), status_code=status_code)
@@ -0,0 +1,213 @@
+# backend/app/utils/singleflight.py
+"""
+生成任务的 single-flight 去重。
+
+同一 (operation, entity_id) 同一时间只执行一次：
+- 进程内：后到的调用方挂到正在执行的 asyncio.Task 上，等待同一个结果。
+- 跨进程：执行方持有 Postgres advisory lock，并把执行结果写入 operation_outcomes；
+  其他 uvicorn worker 拿不到锁时等待锁释放，结果为成功时返回 shared=True，由调用方重新从数据库读取，
+  失败、超时或被取消时抛出 RemoteOperationFailed，而不是再跑一遍生成流程。
+
+advisory lock 持有在 lock_engine 的非池化连接上，不占用请求使用的连接池；所有数据库调用都在线程池中执行，
+不阻塞事件循环。
+
+取消：所有等待方都离开（如客户端断开）或显式调用 cancel() 时，正在执行的任务会被取消。
+"""
+import asyncio
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.db.session import lock_engine
+
+LOCK_POLL_INTERVAL_SECONDS = 1.0
+
+# operation_outcomes.status
+RUNNING, SUCCEEDED, FAILED, CANCELLED = "running", "succeeded", "failed", "cancelled"
+
+_TRY_LOCK = text("SELECT pg_try_advisory_lock(:class_id, :object_id)")
+_UNLOCK = text("SELECT pg_advisory_unlock(:class_id, :object_id)")
+_RECORD_OUTCOME = text("""
+    INSERT INTO operation_outcomes (operation, entity_id, status, status_code, detail, updated_at)
+    VALUES (:operation, :entity_id, :status, :status_code, :detail, now())
+    ON CONFLICT (operation, entity_id) DO UPDATE
+    SET status = EXCLUDED.status, status_code = EXCLUDED.status_code, detail = EXCLUDED.detail,
+        updated_at = EXCLUDED.updated_at
+""")
+_READ_OUTCOME = text("SELECT status, status_code, detail FROM operation_outcomes "
+                     "WHERE operation = :operation AND entity_id = :entity_id")
+
+
+class _Call:
+    """一次正在进行中的调用。"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+_in_flight: Dict[Tuple[str, int], _Call] = {}
+
+
+class OperationCancelled(Exception):
+    """正在等待的调用被其他调用方显式取消。"""
+
+
+class RemoteOperationFailed(Exception):
+    """其他 worker 执行的同一调用没有成功完成。status 为 FAILED 或 CANCELLED。"""
+
+    def __init__(self, status: str, status_code: Optional[int], detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _advisory_lock_key(operation: str, entity_id: int) -> Tuple[int, int]:
+    """把 (operation, entity_id) 映射为 pg_advisory_lock(int4, int4) 的两个参数。"""
+    class_id = zlib.crc32(operation.encode("utf-8")) & 0x7FFFFFFF
+    return class_id, entity_id
+
+
+def _try_lock(connection: Connection, lock_params: dict) -> bool:
+    acquired = connection.execute(_TRY_LOCK, lock_params).scalar()
+    connection.commit()  # 避免连接在生成期间一直处于 idle in transaction
+    return bool(acquired)
+
+
+def _record_outcome(connection: Connection, operation: str, entity_id: int, status: str,
+                    status_code: Optional[int] = None, detail: Optional[str] = None) -> None:
+    connection.execute(_RECORD_OUTCOME, {"operation": operation, "entity_id": entity_id, "status": status,
+                                         "status_code": status_code, "detail": detail})
+    connection.commit()
+
+
+def _outcome_if_finished(connection: Connection, lock_params: dict, operation: str,
+                         entity_id: int) -> Optional[Tuple[str, Optional[int], Optional[str]]]:
+    """锁仍被占用时返回 None；否则在持有锁期间读取最近一次执行的结果后释放锁。"""
+    if not _try_lock(connection, lock_params):
+        return None
+    try:
+        row = connection.execute(_READ_OUTCOME, {"operation": operation, "entity_id": entity_id}).first()
+    finally:
+        connection.execute(_UNLOCK, lock_params)
+        connection.commit()
+    if row is None:
+        return FAILED, None, "finished without recording an outcome"
+    if row.status == RUNNING:
+        # 锁已释放但结果仍是 running：执行方的进程或连接中途退出了
+        return FAILED, None, "the worker running it exited before finishing"
+    return row.status, row.status_code, row.detail
+
+
+async def _run_with_advisory_lock(operation: str, entity_id: int,
+                                  fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    class_id, object_id = _advisory_lock_key(operation, entity_id)
+    lock_params = {"class_id": class_id, "object_id": object_id}
+
+    async def record(status: str, status_code: Optional[int] = None, detail: Optional[str] = None) -> None:
+        try:
+            await run_in_threadpool(_record_outcome, connection, operation, entity_id, status, status_code, detail)
+        except Exception as e:
+            print(f"Failed to record outcome of {operation}:{entity_id}: {e}")
+
+    # advisory lock 是会话级的：关闭这个非池化连接即结束会话，锁随之释放
+    connection = await run_in_threadpool(lock_engine.connect)
+    try:
+        if await run_in_threadpool(_try_lock, connection, lock_params):
+            await record(RUNNING)
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                await record(CANCELLED, detail="Generation was cancelled.")
+                raise
+            except Exception as e:
+                await record(FAILED, getattr(e, "status_code", None), str(getattr(e, "detail", e)))
+                raise
+            await record(SUCCEEDED)
+            return result, False
+
+        # 其他 worker 正在执行：等待其完成，成功时由调用方重新读取结果
+        print(f"{operation}:{entity_id} is running in another worker, waiting for it to finish...")
+        while True:
+            await asyncio.sleep(LOCK_POLL_INTERVAL_SECONDS)
+            outcome = await run_in_threadpool(_outcome_if_finished, connection, lock_params, operation, entity_id)
+            if outcome is not None:
+                break
+        status, status_code, detail = outcome
+        if status != SUCCEEDED:
+            raise RemoteOperationFailed(status, status_code, detail or f"{operation}:{entity_id} {status}")
+        return None, True
+    finally:
+        await run_in_threadpool(connection.close)
+
+
+async def do(operation: str, entity_id: int, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    """
+    以 single-flight 方式执行 fn。
+
+    Args:
+        operation: 操作名，如 "generate_rag"。
+        entity_id: 操作针对的实体 ID。
+        fn: 无参数的协程工厂，只有在没有同 key 的调用正在进行时才会被调用。
+
+    Returns:
+        (result, shared)。shared 为 True 表示结果来自其他调用方的执行：
+        进程内共享时 result 是执行方返回的对象（绑定在执行方的数据库会话上），
+        跨进程共享时 result 为 None。两种情况调用方都应使用自己的会话重新加载实体。
+
+    Raises:
+        OperationCancelled: 进程内的执行被 cancel() 取消。
+        RemoteOperationFailed: 其他 worker 的执行失败、超时或被取消。
+    """
+    key = (operation, entity_id)
+    call = _in_flight.get(key)
+    shared = call is not None
+    if call is None:
+        call = _Call(asyncio.create_task(_run_with_advisory_lock(operation, entity_id, fn)))
+        _in_flight[key] = call
+
+        def _forget(_task: asyncio.Task, _call: _Call = call) -> None:
+            if _in_flight.get(key) is _call:
+                del _in_flight[key]
+
+        call.task.add_done_callback(_forget)
+
+    call.waiters += 1
+    try:
+        # shield: 某个调用方被取消不会直接取消共享的任务
+        result, shared_remotely = await asyncio.shield(call.task)
+    except asyncio.CancelledError:
+        current = asyncio.current_task()
+        if call.task.cancelled() and not (current and current.cancelling()):
+            # 任务是被 cancel() 取消的，而不是当前调用方自己被取消
+            raise OperationCancelled(f"{operation}:{entity_id} was cancelled")
+        if call.waiters == 1 and not call.task.done():
+            # 最后一个等待方也离开了，没有人需要这个结果，停止执行以免继续消耗 token
+            print(f"All callers of {operation}:{entity_id} left, cancelling it.")
+            call.task.cancel()
+        raise
+    finally:
+        call.waiters -= 1
+    return result, shared or shared_remotely
+
+
+def is_in_flight(operation: str, entity_id: int) -> bool:
+    return (operation, entity_id) in _in_flight
+
+
+def cancel(operation: str, entity_id: int) -> bool:
+    """
+    取消当前进程中正在执行的 (operation, entity_id)。
+
+    Returns:
+        找到并取消了任务时返回 True。
+    """
+    call = _in_flight.get((operation, entity_id))
+    if call is None or call.task.done():
+        return False
+    call.task.cancel()
+    return True
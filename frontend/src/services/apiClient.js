@@ -38,4 +38,21 @@ apiClient.interceptors.response.use(
   }
 );
 
-export default apiClient;
\ No newline at end of file
+/**
+ * 跟随响应头 X-Next-Cursor 依次请求所有页，返回合并后的列表
+ * @param {string} url - 列表接口地址
+ * @param {object} params - 查询参数 (不含 cursor)
+ * @returns {Promise<Array<object>>}
+ */
+export const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await apiClient.get(url, { params: cursor ? { ...params, cursor } : params });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'] || null;
+  } while (cursor);
+  return items;
+};
+
+export default apiClient;
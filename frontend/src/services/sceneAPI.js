@@ -1,4 +1,4 @@
-import apiClient from './apiClient';
+import apiClient, {fetchAllPages} from './apiClient';
 
 class SceneAPI {
 
@@ -21,6 +21,15 @@ class SceneAPI {
         return apiClient.get(`/chapters/${chapterId}/scenes`, {params});
     };
 
+    /**
+     * 获取指定章节的全部场景 (按 X-Next-Cursor 自动翻页)
+     * @param {number} chapterId - 章节 ID
+     * @returns {Promise<Array<object>>} - 场景列表 (符合 SceneReadMinimal schema)
+     */
+    getAllScenesByChapter = async (chapterId) => {
+        return fetchAllPages(`/chapters/${chapterId}/scenes`, {limit: 200});
+    };
+
     /**
      * 获取项目中的场景列表
      * @param {number} projectId - 项目 ID
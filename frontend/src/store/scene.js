@@ -97,8 +97,8 @@ export const useSceneStore = defineStore('scene', {
             this._setLoading('fatch', true);
             this._setError('details', null); // Use general error for list fetch
             try {
-                const response = await sceneAPI.getScenesByChapter(chapterId);
-                this.scenes = response.data;
+                // 接口按游标分页，每页最多 200 条，这里取完所有页
+                this.scenes = await sceneAPI.getAllScenesByChapter(chapterId);
             } catch (err) {
                 this._setError('details', err);
                 this.scenes = [];